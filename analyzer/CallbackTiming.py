@@ -0,0 +1,21 @@
+import os
+
+import backtrader as bt
+
+from profiling import counters
+
+
+class CallbackTiming(bt.Analyzer):
+    """
+    记录单次运行期间 next/notify_order/update_order/_load 等回调的调用次数和用时
+    寻优时随 OptReturn 回传主进程汇总, 单次运行在 stop 时直接输出
+    """
+
+    def start(self):
+        self._before = counters.snapshot()
+
+    def stop(self):
+        self.rets['pid'] = os.getpid()
+        self.rets['counters'] = counters.diff(counters.snapshot(), self._before)
+        if not self.strategy.env._dooptimize:
+            print(f"callback timing {self.strategy.__class__.__name__}\n{counters.summary(self.rets['counters'])}")
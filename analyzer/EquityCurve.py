@@ -0,0 +1,13 @@
+import backtrader as bt
+
+
+class EquityCurve(bt.Analyzer):
+    """逐 bar 记录账户总资产, 用于拼接 walk-forward 样本外资金曲线"""
+
+    def start(self):
+        self.rets['datetime'] = []
+        self.rets['value'] = []
+
+    def next(self):
+        self.rets['datetime'].append(self.data.datetime.datetime(0))
+        self.rets['value'].append(self.strategy.broker.getvalue())
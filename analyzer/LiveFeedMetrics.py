@@ -0,0 +1,29 @@
+import backtrader as bt
+from loguru import logger
+
+
+class LiveFeedMetrics(bt.Analyzer):
+    """
+    实盘数据源的取数指标 (broker.FeedMetrics): 队列深度、请求耗时、K 线收盘到送入策略的延迟
+    每 every 根 K 线输出一次日志, get_analysis 返回各数据源最新的快照
+    """
+    params = (
+        ('every', 60),
+    )
+
+    def start(self):
+        self.feeds = [(data._name or f"data{i}", data) for i, data in enumerate(self.datas)
+                      if getattr(data, 'metrics', None) is not None]
+
+    def next(self):
+        for name, data in self.feeds:
+            self.rets[name] = snapshot = data.metrics.snapshot()
+            if self.p.every and snapshot['bars'] % self.p.every == 0:
+                logger.info(f"{name} 队列 {snapshot['queue_depth']} (最大 {snapshot['queue_max']}) "
+                            f"请求 {snapshot['fetches']} 次 失败 {snapshot['fetch_errors']} 次 "
+                            f"平均 {_seconds(snapshot['fetch_mean'])} 最长 {_seconds(snapshot['fetch_max'])} "
+                            f"收盘到策略 {_seconds(snapshot['bar_delay'])} 来源 {snapshot['sources']}")
+
+
+def _seconds(value):
+    return '-' if value is None else f"{value:.2f}s"
@@ -0,0 +1,110 @@
+import math
+
+import backtrader as bt
+import numpy as np
+
+YEAR_SECONDS = 365 * 24 * 3600  # 加密货币 7x24 交易
+# performance_metrics 返回的结果列
+METRICS = ('sharpe', 'sortino', 'max_drawdown', 'max_drawdown_bars', 'exposure', 'trades', 'profit_factor')
+
+
+def performance_metrics(values, exposure, pnl, bar_seconds):
+    """
+    由逐 bar 资金曲线计算风险收益指标
+    :param values: 每根 bar 的账户总资产, float64 数组
+    :param exposure: 每根 bar 是否持仓, bool 数组
+    :param pnl: 每笔已平仓交易的盈亏
+    :param bar_seconds: bar 周期 (秒), 用于年化
+    """
+    values = np.asarray(values, dtype=np.float64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+    annualize = math.sqrt(YEAR_SECONDS / bar_seconds) if bar_seconds > 0 else 1.0
+
+    sharpe = sortino = 0.0
+    if len(values) > 2:
+        returns = np.diff(values) / values[:-1]
+        mean = returns.mean()
+        std = returns.std(ddof=1)
+        if std > 0:
+            sharpe = float(mean / std * annualize)
+        downside = math.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+        if downside > 0:
+            sortino = float(mean / downside * annualize)
+
+    max_drawdown = 0.0
+    max_drawdown_bars = 0
+    if len(values):
+        peak = np.maximum.accumulate(values)
+        max_drawdown = float(np.max(1 - values / peak))
+        # 相邻两次创新高之间的 bar 数即水下持续时间, 末尾未恢复的回撤也计入
+        highs = np.append(np.flatnonzero(values >= peak), len(values))
+        max_drawdown_bars = int(np.max(np.diff(highs)) - 1)
+
+    gross_profit = float(pnl[pnl > 0].sum())
+    gross_loss = float(-pnl[pnl < 0].sum())
+    if gross_loss > 0:
+        profit_factor = gross_profit / gross_loss
+    else:
+        profit_factor = math.inf if gross_profit > 0 else 0.0
+
+    return {
+        'sharpe': sharpe,
+        'sortino': sortino,
+        'max_drawdown': max_drawdown,
+        'max_drawdown_bars': max_drawdown_bars,
+        'exposure': float(np.mean(exposure)) if len(exposure) else 0.0,
+        'trades': len(pnl),
+        'profit_factor': profit_factor,
+    }
+
+
+def bar_seconds(datetimes):
+    """bar 周期取相邻时间差的中位数 (秒), datetimes 为 backtrader 的浮点日期 (天)"""
+    if len(datetimes) < 2:
+        return 0
+    return round(float(np.median(np.diff(datetimes))) * 86400)
+
+
+class Performance(bt.Analyzer):
+    """
+    逐 bar 把现金/资产写入预分配的 float64 数组, 回测结束后向量化计算
+    sharpe/sortino/最大回撤及持续 bar 数/持仓时间占比/交易次数/盈亏比
+    """
+
+    def start(self):
+        # preload 时数据长度已知, 实盘数据按倍增扩容
+        size = self.data.buflen() or 1024
+        self._datetime = np.empty(size)
+        self._cash = np.empty(size)
+        self._value = np.empty(size)
+        self._n = 0
+        self._pnl = []
+
+    def _grow(self):
+        size = len(self._value) * 2
+        for name in ('_datetime', '_cash', '_value'):
+            array = getattr(self, name)
+            grown = np.empty(size, dtype=array.dtype)
+            grown[:self._n] = array[:self._n]
+            setattr(self, name, grown)
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self._pnl.append(trade.pnlcomm)
+
+    def next(self):
+        if self._n == len(self._value):
+            self._grow()
+        i = self._n
+        broker = self.strategy.broker
+        self._datetime[i] = self.data.datetime[0]
+        self._cash[i] = broker.getcash()
+        self._value[i] = broker.getvalue()
+        self._n = i + 1
+
+    def stop(self):
+        n = self._n
+        # 资产与现金不相等即持有仓位
+        exposure = self._value[:n] != self._cash[:n]
+        self.rets.update(performance_metrics(self._value[:n], exposure, self._pnl,
+                                             bar_seconds(self._datetime[:n])))
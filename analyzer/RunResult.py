@@ -0,0 +1,13 @@
+import backtrader as bt
+
+
+class RunResult(bt.Analyzer):
+    """
+    记录单次回测的最终资产和手续费
+    参数寻优使用 optreturn 时子进程只回传参数和分析器结果, 不再回传完整的策略对象
+    """
+    COLUMNS = ('final_value', 'commission')
+
+    def stop(self):
+        self.rets['final_value'] = self.strategy.broker.getvalue()
+        self.rets['commission'] = getattr(self.strategy, 'commission', 0)
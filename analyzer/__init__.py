@@ -1,3 +1,7 @@
-
 from .OKXLiveTradeAnalyzer import OKXLiveTradeAnalyzer
-from .PositionReturn import PositionReturn
\ No newline at end of file
+from .PositionReturn import PositionReturn
+from .RunResult import RunResult
+from .EquityCurve import EquityCurve
+from .CallbackTiming import CallbackTiming
+from .Performance import Performance
+from .LiveFeedMetrics import LiveFeedMetrics
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+实盘数据源 K 线队列基准: 补齐 n 根 K 线后逐根取出 (与 _load 相同, 含 date2num)
+
+before: list 逐行把时间戳改写为 datetime 后 append, _load 中 pop(0), 每次出队移动整个列表, 总计 O(n²)
+after:  CandleQueue 批量写入环形缓冲区, pop 为 O(1), 只在出队时创建 datetime
+
+    python -m benchmark.candlequeue --bars 1000,10000,100000,500000
+"""
+import sys
+import time
+from datetime import datetime
+
+import backtrader as bt
+import click
+
+from benchmark.fakeexchange import candles_from_frame
+from benchmark.synthetic import generate
+from broker.CandleQueue import CandleQueue
+
+
+def before(candles):
+    queue = []
+    for ohlcv in candles:
+        ohlcv = list(ohlcv)
+        ohlcv[0] = datetime.fromtimestamp(ohlcv[0] / 1000)
+        queue.append(ohlcv)
+    closes = 0.0
+    while queue:
+        ohlc = queue.pop(0)
+        bt.date2num(ohlc[0])
+        closes += ohlc[4]
+    return closes
+
+
+def after(candles):
+    queue = CandleQueue(len(candles))
+    queue.extend(candles)
+    closes = 0.0
+    while queue:
+        ohlc = queue.pop()
+        bt.date2num(datetime.fromtimestamp(ohlc[0] / 1000))
+        closes += ohlc[4]
+    return closes
+
+
+@click.command()
+@click.option('--bars', default='1000,10000,100000', help="K 线数量, 逗号分隔")
+def main(bars):
+    for n in [int(x) for x in bars.split(',') if x]:
+        candles = candles_from_frame(generate(n, '1m', 'mixed'))
+        timings = []
+        results = []
+        for func in (before, after):
+            start = time.perf_counter()
+            results.append(func(candles))
+            timings.append(time.perf_counter() - start)
+        print(f"bars:{n:<8} before:{timings[0]:8.3f}s after:{timings[1]:8.3f}s {timings[0] / timings[1]:6.1f}x "
+              f"{'ok' if results[0] == results[1] else 'MISMATCH'}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
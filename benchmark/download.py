@@ -0,0 +1,69 @@
+"""
+历史 K 线下载基准: 逐页顺序拉取 (CCXTData.fetch_data) 与分段并发下载 (CandleDownloader) 对比
+
+数据来自本地模拟交易所 (benchmark.fakeexchange), 中间挖掉一段模拟交易所缺失的 K 线;
+并发结果必须与顺序结果完全相同, 不一致或触发限频时返回非 0.
+
+    python -m benchmark.download --days 7 --latency 0.15 --workers 1,4,8,16
+"""
+import sys
+import time
+
+import click
+
+import logpolicy
+from benchmark.fakeexchange import FakeExchange, candles_from_frame
+from benchmark.synthetic import generate
+from broker import CCXTData
+from broker.CandleDownloader import CandleDownloader
+
+
+def sequential(exchange, since, until):
+    data = CCXTData(exchange_id='okx', sandbox=False)
+    data.exchange = exchange
+    data.fetch_data(since, until, limit=100)
+    # 最后一页可能超出 until
+    return [candle for candle in data.ohlcv.candles() if candle[0] < until]
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+@click.command()
+@click.option('--days', default=7, help="1m K 线天数")
+@click.option('--latency', default=0.15, help="模拟的单次请求延迟 (秒)")
+@click.option('--max_requests', default=20, help="模拟交易所每秒允许的请求数")
+@click.option('--workers', default='1,4,8,16', help="并发数, 逗号分隔")
+@click.option('--fail_every', default=0, help="每 N 次请求注入一次超时, 检验重试")
+def main(days, latency, max_requests, workers, fail_every):
+    logpolicy.configure('WARNING')
+    df = generate(days * 1440, '1m', 'mixed')
+    candles = candles_from_frame(df)
+    # 交易所缺失的一段 K 线 (维护/停牌)
+    gap = len(candles) // 3
+    candles = candles[:gap] + candles[gap + 90:]
+    since, until = candles[0][0], candles[-1][0] + 60_000
+
+    exchange = FakeExchange(candles, latency=latency, max_requests=max_requests)
+    expected, seconds = _timed(lambda: sequential(exchange, since, until))
+    print(f"sequential bars:{len(expected)} requests:{exchange.requests} {seconds:.2f}s", file=sys.stderr)
+
+    failures = 0
+    for n in [int(x) for x in workers.split(',') if x]:
+        exchange = FakeExchange(candles, latency=latency, max_requests=max_requests, fail_every=fail_every)
+        downloader = CandleDownloader(exchange, 'BTC/USDT', '1m', limit=100, workers=n)
+        got, elapsed = _timed(lambda: downloader.download(since, until))
+        same = got == expected
+        failures += not same or exchange.rate_limited > 0
+        print(f"workers:{n:<3} bars:{len(got)} requests:{exchange.requests} retries:{downloader.retries} "
+              f"rate_limited:{exchange.rate_limited} concurrency:{exchange.max_concurrency} {elapsed:6.2f}s "
+              f"{seconds / elapsed:5.1f}x {'ok' if same else 'MISMATCH'}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
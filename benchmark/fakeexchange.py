@@ -0,0 +1,179 @@
+"""
+本地模拟交易所, 实现下载、实盘数据源和 CCXTBroker 用到的 ccxt 接口, 不访问网络
+
+K 线来自内存中的固定数据 (canned pages), 每次请求 sleep latency 秒模拟往返延迟,
+滑动窗口内的请求数超过 max_requests 时与 okx 一样返回限频错误 (ccxt.RateLimitExceeded).
+订单保存在内存中, 由 match(price) 按价格撮合限价单, cancel(id) 模拟在交易所页面撤单.
+"""
+import bisect
+import collections
+import itertools
+import threading
+import time
+
+import ccxt
+
+
+def candles_from_frame(df):
+    """DataFrame (index 为 timestamp) -> ccxt 格式的 K 线 [[ts_ms, open, high, low, close, volume], ...]"""
+    timestamps = df.index.to_numpy().astype('datetime64[ms]').astype('int64').tolist()
+    return [[ts, o, h, l, c, v] for ts, o, h, l, c, v in
+            zip(timestamps, df['open'].tolist(), df['high'].tolist(), df['low'].tolist(), df['close'].tolist(),
+                df['volume'].tolist())]
+
+
+class FakeExchange:
+    id = 'fake'
+
+    def __init__(self, candles, latency=0.05, max_requests=20, window=1.0, max_limit=100, fail_every=0):
+        """
+        :param candles: 按时间排序的 K 线 [[ts_ms, open, high, low, close, volume], ...]
+        :param latency: 每次请求的延迟 (秒)
+        :param max_requests: window 秒内允许的请求数, 0 不限频
+        :param max_limit: 单页最多返回的 K 线数量
+        :param fail_every: 每 N 次请求抛出一次 ccxt.RequestTimeout, 0 不注入错误
+        """
+        self.candles = candles
+        self.timestamps = [candle[0] for candle in candles]
+        self.latency = latency
+        self.max_requests = max_requests
+        self.window = window
+        self.max_limit = max_limit
+        self.fail_every = fail_every
+        # 与 ccxt 一样在交易所的限频上留 10% 余量 (okx 100ms -> rateLimit 110ms)
+        self.rateLimit = 1100 * window / max_requests if max_requests else 0
+        self.enableRateLimit = True
+        # 已经生成的 K 线数量, None 为全部; 模拟实时行情时由 benchmark.fakestream 随推送递增
+        self.available = None
+
+        self.price = candles[-1][4] if candles else 100.0
+        self.cash = 1_000_000.0
+        self.fee_rate = 0.001
+        self.orders = {}
+        self.calls = collections.Counter()  # 各接口的请求次数
+        self._ids = itertools.count(1)
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.max_concurrency = 0
+        self._active = 0
+        self._recent = collections.deque()
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - self.window:
+                self._recent.popleft()
+            if self.max_requests and len(self._recent) >= self.max_requests:
+                self.rate_limited += 1
+                raise ccxt.RateLimitExceeded(f"{self.id} 50011 Too Many Requests")
+            self._recent.append(now)
+            if self.fail_every and self.requests % self.fail_every == 0:
+                self.timeouts += 1
+                raise ccxt.RequestTimeout(f"{self.id} GET /candles timed out")
+            self._active += 1
+            self.max_concurrency = max(self.max_concurrency, self._active)
+
+    def _exit(self):
+        with self._lock:
+            self._active -= 1
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """与 ccxt 相同: 返回 timestamp >= since 的前 limit 根 K 线"""
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            limit = min(limit or self.max_limit, self.max_limit)
+            end = len(self.candles) if self.available is None else self.available
+            if since is None:
+                page = self.candles[max(0, end - limit):end]
+            else:
+                lo = bisect.bisect_left(self.timestamps, since)
+                page = self.candles[lo:min(lo + limit, end)]
+            return [list(candle) for candle in page]
+        finally:
+            self._exit()
+
+    def _request(self, method):
+        self._enter()
+        try:
+            self.calls[method] += 1
+            time.sleep(self.latency)
+        finally:
+            self._exit()
+
+    def load_markets(self):
+        self.markets = {'BTC/USDT': {'id': 'BTC-USDT', 'symbol': 'BTC/USDT', 'precision': {'amount': 1e-08}}}
+        return self.markets
+
+    def market(self, symbol):
+        return self.markets[symbol]
+
+    def fetch_balance(self, params=None):
+        self._request('fetch_balance')
+        return {'free': {'USDT': self.cash}}
+
+    def public_get_public_price_limit(self, params=None):
+        self._request('price_limit')
+        return {'data': [{'buyLmt': str(self.price * 1.05), 'sellLmt': str(self.price * 0.95)}]}
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self._request('create_order')
+        with self._lock:
+            oid = str(next(self._ids))
+            self.orders[oid] = {
+                'id': oid, 'clientOrderId': f"c{oid}", 'symbol': symbol, 'type': type, 'side': side,
+                'price': float(price) if price is not None else None, 'amount': float(amount), 'filled': 0.0,
+                'average': None, 'cost': 0.0, 'fee': None, 'status': 'open', 'timestamp': int(time.time() * 1000),
+            }
+            if type == 'market':
+                self._fill(self.orders[oid], self.price)
+            return dict(self.orders[oid])
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._request('fetch_order')
+        with self._lock:
+            if id not in self.orders:
+                raise ccxt.OrderNotFound(f"{self.id} order {id} not found")
+            return dict(self.orders[id])
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self._request('fetch_open_orders')
+        with self._lock:
+            return [dict(order) for order in self.orders.values()
+                    if order['status'] == 'open' and symbol in (None, order['symbol'])]
+
+    def _fill(self, order, price, amount=None):
+        filled = order['amount'] if amount is None else amount
+        order.update(status='closed', filled=filled, average=price, cost=filled * price)
+        # okx 现货: 买单手续费扣在币上, 卖单扣在 USDT 上
+        if order['side'] == 'buy':
+            order['fee'] = {'currency': 'BTC', 'cost': filled * self.fee_rate}
+        else:
+            order['fee'] = {'currency': 'USDT', 'cost': order['cost'] * self.fee_rate}
+
+    def match(self, price):
+        """行情变为 price, 价格触及的限价单按挂单价全部成交, 返回成交的订单 id"""
+        with self._lock:
+            self.price = price
+            filled = []
+            for order in self.orders.values():
+                if order['status'] != 'open':
+                    continue
+                if (order['side'] == 'buy' and price <= order['price']) or \
+                        (order['side'] == 'sell' and price >= order['price']):
+                    self._fill(order, order['price'])
+                    filled.append(order['id'])
+            return filled
+
+    def cancel(self, id, filled=0.0):
+        """:param filled: 撤单前已按挂单价成交的数量"""
+        with self._lock:
+            order = self.orders[id]
+            if order['status'] == 'open':
+                if filled:
+                    self._fill(order, order['price'], filled)
+                order['status'] = 'canceled'
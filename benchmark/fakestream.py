@@ -0,0 +1,133 @@
+"""
+本地 websocket 行情服务, 协议与 okx 的 candle 频道相同, 用于离线测试 CCXTStreamData 的延迟和断线重连
+
+K 线按 bar_seconds 秒一根的节奏 "生成": 每根先推送 updates 次未收盘 (confirm=0) 的更新, 到点推送收盘 (confirm=1);
+收盘时刻记录在 emitted 中, 并同步推进 FakeExchange.available, REST 只能拿到已经收盘的 K 线.
+drop_every 根后断开所有连接, 之后 refuse_for 秒内拒绝连接, 模拟交易所断线.
+
+    server = FakeCandleStream(candles, exchange=fake_exchange, bar_seconds=0.2, drop_every=50)
+    url = server.start()
+    ...
+    server.stop()
+"""
+import asyncio
+import json
+import threading
+import time
+
+from aiohttp import web, WSMsgType
+
+
+class FakeCandleStream:
+
+    def __init__(self, candles, exchange=None, bar_seconds=0.2, updates=2, drop_every=0, refuse_for=0.0):
+        """
+        :param candles: 按时间排序的 K 线 [[ts_ms, open, high, low, close, volume], ...]
+        :param exchange: benchmark.fakeexchange.FakeExchange, 其 available 随收盘推进
+        :param bar_seconds: 每根 K 线的实际秒数
+        :param updates: 每根 K 线收盘前推送的未收盘更新次数
+        :param drop_every: 每 N 根 K 线收盘后断开所有连接, 0 不断开
+        :param refuse_for: 断开后拒绝连接的秒数
+        """
+        self.candles = candles
+        self.exchange = exchange
+        self.bar_seconds = bar_seconds
+        self.updates = updates
+        self.drop_every = drop_every
+        self.refuse_for = refuse_for
+
+        self.emitted = {}  # ts -> 推送收盘的时刻 (time.perf_counter)
+        self.connections = 0
+        self.refused = 0
+        self.drops = 0
+        self.done = threading.Event()
+        self._clients = set()
+        self._refuse_until = 0.0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.url = None
+
+    def start(self):
+        """在后台线程中启动, 返回 websocket 地址"""
+        if self.exchange is not None:
+            self.exchange.available = 0
+        self._thread = threading.Thread(target=self._run, name='fake-candle-stream', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/ws/v5/business', self._handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}/ws/v5/business"
+        self._loop.create_task(self._produce())
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _handle(self, request):
+        if time.perf_counter() < self._refuse_until:
+            self.refused += 1
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            if msg.data == 'ping':
+                await ws.send_str('pong')
+                continue
+            message = json.loads(msg.data)
+            if message.get('op') == 'subscribe':
+                for arg in message['args']:
+                    await ws.send_json({'event': 'subscribe', 'arg': arg, 'connId': 'fake'})
+                self._clients.add(ws)
+        self._clients.discard(ws)
+        return ws
+
+    async def _broadcast(self, candle, confirm):
+        ts, o, h, l, c, v = candle
+        row = [str(ts), str(o), str(h), str(l), str(c), str(v), '0', '0', confirm]
+        payload = json.dumps({'arg': {'channel': 'candle', 'instId': 'fake'}, 'data': [row]})
+        for ws in list(self._clients):
+            try:
+                await ws.send_str(payload)
+            except ConnectionError:
+                self._clients.discard(ws)
+
+    async def _produce(self):
+        start = time.perf_counter()
+        for i, candle in enumerate(self.candles):
+            close_at = start + (i + 1) * self.bar_seconds
+            for k in range(self.updates):
+                await asyncio.sleep(max(0.0, close_at - self.bar_seconds * (self.updates - k) / (self.updates + 1)
+                                        - time.perf_counter()))
+                await self._broadcast(candle, '0')
+            await asyncio.sleep(max(0.0, close_at - time.perf_counter()))
+            if self.exchange is not None:
+                self.exchange.available = i + 1
+            self.emitted[candle[0]] = time.perf_counter()
+            await self._broadcast(candle, '1')
+            if self.drop_every and (i + 1) % self.drop_every == 0:
+                self.drops += 1
+                self._refuse_until = time.perf_counter() + self.refuse_for
+                for ws in list(self._clients):
+                    await ws.close()
+                self._clients.clear()
+        self.done.set()
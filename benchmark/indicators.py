@@ -0,0 +1,101 @@
+"""
+指标内核与 bt.indicators 的逐位一致性检查及耗时对比
+
+lines.py (纯 Python) 和 kernels.py (numba, 已安装时) 的每条序列都要与 backtrader runonce 算出的序列完全相等,
+任一不一致时返回非 0.
+
+    python -m benchmark.indicators --bars 10000,1000000 --regime mixed,chop
+"""
+import sys
+import time
+
+import backtrader as bt
+import click
+import numpy as np
+
+from benchmark.synthetic import generate, REGIMES
+from indicator import kernels, lines
+
+# (名称, bt 指标构造, 参数)
+SPECS = [
+    ('sma', lambda close, p: bt.indicators.SMA(close, period=p['period']), dict(period=20)),
+    ('sma', lambda close, p: bt.indicators.SMA(close, period=p['period']), dict(period=200)),
+    ('ema', lambda close, p: bt.indicators.EMA(close, period=p['period']), dict(period=7)),
+    ('ema', lambda close, p: bt.indicators.EMA(close, period=p['period']), dict(period=100)),
+    ('rsi', lambda close, p: bt.indicators.RSI(close, period=p['period']), dict(period=14)),
+    ('bbands', lambda close, p: bt.indicators.BollingerBands(close, period=p['period'], devfactor=p['devfactor']),
+     dict(period=20, devfactor=2.0)),
+    ('crossover', lambda close, p: bt.indicators.CrossOver(bt.indicators.EMA(close, period=p['fast']),
+                                                           bt.indicators.EMA(close, period=p['slow'])),
+     dict(fast=7, slow=30)),
+]
+
+
+def _compute(module, kind, close, params):
+    if kind == 'sma':
+        return (module.sma_line(close, params['period']),)
+    if kind == 'ema':
+        return (module.ema_line(close, params['period']),)
+    if kind == 'rsi':
+        return (module.rsi_line(close, params['period']),)
+    if kind == 'bbands':
+        return module.bollinger_lines(close, params['period'], params['devfactor'])
+    fast = module.ema_line(close, params['fast'])
+    slow = module.ema_line(close, params['slow'])
+    return (module.crossover_line(fast, slow),)
+
+
+class _Reference(bt.Strategy):
+    def __init__(self):
+        self.indicators = [build(self.data.close, params) for _, build, params in SPECS]
+
+
+def reference(df):
+    """backtrader runonce 模式下的指标序列"""
+    cerebro = bt.Cerebro(runonce=True, preload=True, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(_Reference)
+    strategy = cerebro.run()[0]
+    return [tuple(np.array(line.array) for line in indicator.lines) for indicator in strategy.indicators]
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _split(value):
+    return [x for x in value.split(',') if x]
+
+
+@click.command()
+@click.option('--bars', default='10000,200000', help="合成 K 线数量, 逗号分隔")
+@click.option('--regime', 'regimes', default='mixed', help=f"逗号分隔, 可选 {','.join(REGIMES)}")
+def main(bars, regimes):
+    print(f"kernel backend: {kernels.BACKEND}", file=sys.stderr)
+    mismatches = 0
+    for n in [int(x) for x in _split(bars)]:
+        for regime in _split(regimes):
+            df = generate(n, '1m', regime)
+            close = df['close'].to_numpy(dtype=np.float64)
+            expected, bt_seconds = _timed(lambda: reference(df))
+            print(f"bars:{n} regime:{regime} backtrader (全部指标) {bt_seconds:.2f}s", file=sys.stderr)
+            # 先各算一次, numba 首次调用的编译时间不计入
+            for kind, _, params in SPECS:
+                _compute(kernels, kind, close, params)
+            for (kind, _, params), want in zip(SPECS, expected):
+                row = []
+                for name, module in (('python', lines), (kernels.BACKEND, kernels)):
+                    got, seconds = _timed(lambda: _compute(module, kind, close, params))
+                    same = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(got, want))
+                    mismatches += not same
+                    row.append(f"{name}:{seconds * 1000:8.1f}ms {'ok' if same else 'MISMATCH'}")
+                print(f"  {kind:<9} {str(params):<32} {'  '.join(row)}", file=sys.stderr)
+    if mismatches:
+        print(f"{mismatches} 条序列与 bt.indicators 不一致", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+热路径日志开销对比
+
+before: 开关全部打开, loguru 输出级别为 ERROR, 与改造前一致 —— 每个 bar 都拼接 f-string 并进入 loguru 分发后才被过滤
+after:  logpolicy.configure('ERROR'), 关闭级别的日志在策略中直接跳过
+
+    python -m benchmark.logging_overhead --bars 200000 --strategy busy
+"""
+import json
+import sys
+import time
+
+import backtrader as bt
+import click
+from loguru import logger
+
+from benchmark.synthetic import generate
+from logpolicy import policy
+from strategy import Busy, EMA_Crossover
+from strategy.Oscillation import Oscillation
+
+STRATEGIES = {
+    'busy': (Busy, dict(short_period=20, long_period=100, below=0.005, net_profit=0.01, stop_loss=0.05)),
+    'ema_crossover': (EMA_Crossover, dict(short_period=7, long_period=30)),
+    'oscillation': (Oscillation, dict(boll_period=20, boll_dev=2.0, rsi_period=14, rsi_buy_signal=30, stop_loss=0.1)),
+}
+
+
+def run_once(df, strategy_cls, params):
+    cerebro = bt.Cerebro(runonce=True, preload=True)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.broker.setcash(10000)
+    cerebro.addstrategy(strategy_cls, **params)
+    start = time.perf_counter()
+    strategy = cerebro.run()[0]
+    return time.perf_counter() - start, strategy.broker.getvalue()
+
+
+def before():
+    policy.configure('ERROR')
+    policy.DEBUG = policy.INFO = policy.WARNING = True
+
+
+def after():
+    policy.configure('ERROR')
+
+
+@click.command()
+@click.option('--bars', default=100000, help="合成 1m K 线数量")
+@click.option('--strategy', 'names', default='busy,ema_crossover,oscillation', help="逗号分隔")
+@click.option('--repeat', default=3, help="每种模式重复次数, 取最短用时")
+@click.option('--output', default=None, help="结果写入 json 文件")
+def main(bars, names, repeat, output):
+    df = generate(bars)
+    results = []
+    for name in names.split(','):
+        strategy_cls, params = STRATEGIES[name]
+        row = {'strategy': name, 'bars': bars}
+        for mode, setup in (('before', before), ('after', after)):
+            timings = []
+            for _ in range(repeat):
+                setup()
+                elapsed, value = run_once(df, strategy_cls, params)
+                timings.append(elapsed)
+            row[f'{mode}_s'] = min(timings)
+            row[f'{mode}_value'] = value
+        assert row['before_value'] == row['after_value'], "日志开关不应改变回测结果"
+        row['speedup'] = row['before_s'] / row['after_s']
+        results.append(row)
+        print(f"{name:<14} bars:{bars} before:{row['before_s']:.3f}s after:{row['after_s']:.3f}s "
+              f"speedup:{row['speedup']:.2f}x", file=sys.stderr)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"save to {output}")
+
+
+if __name__ == '__main__':
+    main()
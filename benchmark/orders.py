@@ -0,0 +1,128 @@
+"""
+订单对账基准: 同一组挂单/成交/撤单过程下, 逐单 fetch_order 轮询 (改造前的 CCXTBroker.next) 与
+每轮一次 fetch_open_orders 后只查询变化的订单对比请求数和耗时; 两种方式的通知和资金/持仓必须完全相同,
+且资金/持仓与交易所所有订单的成交 (含撤单前的部分成交) 一致
+
+模拟交易所 (benchmark.fakeexchange) 每轮按随机游走的价格撮合限价单, 偶尔撤掉一个挂单, 之后补足 --orders 个挂单
+
+    python -m benchmark.orders --orders 10 --cycles 100 --latency 0.05
+"""
+import random
+import sys
+import time
+
+import backtrader as bt
+import click
+import pandas as pd
+
+import logpolicy
+from benchmark.fakeexchange import FakeExchange
+from broker import CCXTBroker
+from broker.CCXTStore import CCXTStore
+
+RECONCILE_CALLS = ('fetch_order', 'fetch_open_orders')
+
+
+def quote():
+    """只有一根 K 线的数据源, CCXTOrder 创建时读取 data.close[0] 和 data.datetime"""
+    df = pd.DataFrame({'open': [0.0], 'high': [0.0], 'low': [0.0], 'close': [0.0], 'volume': [0.0]},
+                      index=pd.DatetimeIndex(['2024-01-01']))
+    data = bt.feeds.PandasData(dataname=df)
+    bt.Cerebro().adddata(data)
+    data._start()
+    data.load()
+    return data
+
+
+def ledger(exchange, cash):
+    """按交易所所有订单的成交数量 (含撤单前的部分成交) 算出的资金和持仓, 与 CCXTBroker.update_asset 的记账方式相同"""
+    position = 0.0
+    for order in exchange.orders.values():
+        if not order['filled']:
+            continue
+        if order['side'] == 'buy':
+            cash -= order['cost']
+            position += order['filled'] - order['fee']['cost']
+        else:
+            cash += order['cost'] - order['fee']['cost']
+            position -= order['filled']
+    return round(cash, 8), round(position, 12)
+
+
+def per_order(broker):
+    for order in list(broker.open_orders):
+        broker.update_order(order)
+
+
+def batched(broker):
+    broker.next()
+
+
+def run(reconcile, orders, cycles, latency, cancel_every, seed):
+    rng = random.Random(seed)
+    exchange = FakeExchange([], latency=latency, max_requests=0)
+    CCXTStore._singleton = None  # 每次使用新的模拟交易所
+    CCXTStore(exchange=exchange)
+    broker = CCXTBroker(exchange_id='okx', cash=10000, poll_interval=0)
+
+    data = quote()
+    notifications = []
+    requests = 0
+    seconds = 0.0
+    for cycle in range(cycles):
+        price = exchange.price * (1 + rng.uniform(-0.003, 0.003))
+        exchange.match(price)
+        data.close[0] = price
+        pending = sorted(oid for oid, order in exchange.orders.items() if order['status'] == 'open')
+        if cancel_every and cycle % cancel_every == 0 and pending:
+            # 一半的撤单之前已部分成交
+            oid = rng.choice(pending)
+            exchange.cancel(oid, exchange.orders[oid]['amount'] * rng.choice((0.0, 0.5)))
+
+        before = sum(exchange.calls[name] for name in RECONCILE_CALLS)
+        start = time.perf_counter()
+        reconcile(broker)
+        seconds += time.perf_counter() - start
+        requests += sum(exchange.calls[name] for name in RECONCILE_CALLS) - before
+        while (order := broker.get_notification()) is not None:
+            notifications.append((cycle, order.tradeid, order.getstatusname()))
+
+        while len(broker.open_orders) < orders:
+            side = rng.choice(('buy', 'sell'))
+            offset = rng.uniform(0.001, 0.01)
+            limit = price * (1 - offset if side == 'buy' else 1 + offset)
+            submit = broker.buy if side == 'buy' else broker.sell
+            submit(None, data, 0.01, price=limit, exectype=bt.Order.Limit, parent=None, transmit=True)
+    # 最后一轮之后挂单状态可能还有变化, 再对账一次再与交易所比较
+    reconcile(broker)
+    state = (notifications, round(broker.cash, 8), round(broker.position.size, 12))
+    return state, requests, seconds, ledger(exchange, 10000)
+
+
+@click.command()
+@click.option('--orders', default=10, help="同时挂着的限价单数量")
+@click.option('--cycles', default=100, help="对账轮数")
+@click.option('--latency', default=0.05, help="模拟的单次请求延迟 (秒)")
+@click.option('--cancel_every', default=10, help="每 N 轮在交易所撤掉一个挂单, 0 不撤单")
+@click.option('--seed', default=0)
+def main(orders, cycles, latency, cancel_every, seed):
+    logpolicy.configure('ERROR')
+    results = {}
+    for name, reconcile in (('per_order', per_order), ('batched', batched)):
+        state, requests, seconds, expected = run(reconcile, orders, cycles, latency, cancel_every, seed)
+        results[name] = state
+        if state[1:] != expected:
+            print(f"{name} 资金/持仓 {state[1:]} 与交易所成交 {expected} 不一致", file=sys.stderr)
+            sys.exit(1)
+        notifications = state[0]
+        print(f"{name:<10} requests:{requests:<5} per cycle:{requests / cycles:5.2f} {seconds:6.2f}s "
+              f"({seconds / cycles * 1000:.0f} ms/cycle) completed:{sum(s == 'Completed' for *_, s in notifications)} "
+              f"canceled:{sum(s == 'Canceled' for *_, s in notifications)}", file=sys.stderr)
+    same = results['per_order'] == results['batched']
+    print('ok' if same else 'MISMATCH', file=sys.stderr)
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
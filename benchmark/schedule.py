@@ -0,0 +1,86 @@
+"""
+REST 实盘模式取数节奏基准: CCXTData 后台取数线程的循环 (BarScheduler.wait + _poll_closed) 在虚拟时钟下运行, 不真实等待
+
+模拟交易所在每根 K 线收盘后 0 ~ --publish_delay 秒才返回这根 K 线 (随机), 统计每根 K 线的请求次数和
+从收盘到放入队列的延迟; 对照为改造前每 2 秒轮询一次, 每根 K 线约 周期/2s 次请求
+
+    python -m benchmark.schedule --bars 500 --interval 1m --publish_delay 1.5
+"""
+import random
+import statistics
+import sys
+
+import click
+
+import logpolicy
+from benchmark.fakeexchange import FakeExchange, candles_from_frame
+from benchmark.synthetic import generate
+from broker import CCXTData
+from broker.BarScheduler import BarScheduler
+
+
+class VirtualClock:
+
+    def __init__(self, start):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class PublishingExchange(FakeExchange):
+    """只返回按虚拟时钟已经发布的 K 线: 收盘时间 + 发布延迟 <= 当前时间"""
+
+    def __init__(self, candles, clock, step, delays):
+        super(PublishingExchange, self).__init__(candles, latency=0, max_requests=0)
+        self.clock = clock
+        self.published = [candle[0] + step + delay * 1000 for candle, delay in zip(candles, delays)]
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        now = self.clock.time() * 1000
+        self.available = next((i for i, at in enumerate(self.published) if at > now), len(self.candles))
+        return super(PublishingExchange, self).fetch_ohlcv(symbol, timeframe, since, limit, params)
+
+
+@click.command()
+@click.option('--bars', default=500, help="K 线数量")
+@click.option('--interval', default='1m', help="周期 1m/5m")
+@click.option('--publish_delay', default=1.5, help="交易所在收盘后最多多少秒才返回这根 K 线")
+@click.option('--seed', default=0)
+def main(bars, interval, publish_delay, seed):
+    logpolicy.configure('WARNING')
+    random.seed(seed)
+    df = generate(bars, interval, 'mixed')
+    candles = candles_from_frame(df)
+    step = candles[1][0] - candles[0][0]
+    delays = [random.uniform(0, publish_delay) for _ in candles]
+    clock = VirtualClock((candles[0][0] + step) / 1000 + 5)
+    exchange = PublishingExchange(candles, clock, step, delays)
+
+    data = CCXTData(exchange_id='okx', sandbox=False, interval=interval)
+    data.exchange = exchange
+    data.scheduler = BarScheduler(interval, clock=clock.time, sleep=clock.sleep)
+    data.last_ts = candles[0][0]
+    latencies = []
+    while data.last_ts < candles[-1][0]:
+        if data.scheduler.wait(data.last_ts, data._poll_closed):
+            latencies.append(data.scheduler.latency)
+    received = [candle[4] for candle in data.ohlcv.candles()]
+
+    expected = [candle[4] for candle in candles[1:]]
+    ok = received == expected
+    baseline = step / 2000
+    print(f"{interval} bars:{len(received)} requests:{exchange.requests} "
+          f"per bar:{exchange.requests / max(1, len(received)):.2f} (2s 轮询约 {baseline:.0f}) "
+          f"misses:{data.scheduler.misses}", file=sys.stderr)
+    print(f"close -> 入队 s  p50:{statistics.median(latencies):.2f} max:{max(latencies):.2f}  "
+          f"{'ok' if ok else 'MISMATCH'}", file=sys.stderr)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
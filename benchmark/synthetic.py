@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+TIMEFRAMES = {'1m': 1, '5m': 5}
+REGIMES = ('trend', 'chop', 'gap', 'mixed')
+
+# 1m K 线的单 bar 波动率, 其它周期按 sqrt(分钟数) 放大
+SIGMA_1M = 0.0008
+
+
+def _trend(rng, n, sigma):
+    """单边趋势, 每段 2k~20k 根, 涨跌交替且每段累计漂移相同, 长序列的价格不会发散"""
+    legs = rng.integers(2000, 20000, n // 2000 + 1)
+    signs = np.where(np.arange(len(legs)) % 2 == 0, 1.0, -1.0) * rng.choice([-1.0, 1.0])
+    drift = np.repeat(signs * 0.3 / legs, legs)[:n]
+    return drift + rng.normal(0.0, sigma, n), np.zeros(n)
+
+
+def _chop(rng, n, sigma, theta=0.02, block=512):
+    """围绕起始价格均值回归 (离散 OU 过程 x[t] = d * x[t-1] + e[t], d = 1 - theta)"""
+    noise = rng.normal(0.0, sigma, n)
+    d = 1 - theta
+    powers = d ** np.arange(block)
+    level = np.empty(n)
+    x = 0.0
+    # 分块展开递推: x[j] = d^j * (d * x0 + cumsum(e[k] / d^k)), 块长有限保证 d^-k 不溢出
+    for lo in range(0, n, block):
+        e = noise[lo:lo + block]
+        p = powers[:len(e)]
+        level[lo:lo + len(e)] = p * (d * x + np.cumsum(e / p))
+        x = level[lo + len(e) - 1]
+    return np.diff(level, prepend=0.0), np.zeros(n)
+
+
+def _gap(rng, n, sigma):
+    """随机游走, 约每 500 根出现一次开盘跳空"""
+    returns = rng.normal(0.0, sigma, n)
+    gaps = np.where(rng.random(n) < 1 / 500, rng.normal(0.0, sigma * 25, n), 0.0)
+    return returns, gaps
+
+
+_GENERATORS = {'trend': _trend, 'chop': _chop, 'gap': _gap}
+
+
+def generate(bars, timeframe='1m', regime='mixed', seed=0, start='2024-01-01', price=100.0):
+    """
+    确定性的合成 OHLCV, 列与 candles history 输出的 csv 一致
+    :param regime: trend 单边趋势 / chop 震荡 / gap 跳空 / mixed 三种行情按段轮换
+    :return: DataFrame, index 为 timestamp
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"不支持的周期 {timeframe}, 可选 {list(TIMEFRAMES)}")
+    if regime not in REGIMES:
+        raise ValueError(f"不支持的行情 {regime}, 可选 {list(REGIMES)}")
+
+    rng = np.random.default_rng(seed)
+    sigma = SIGMA_1M * np.sqrt(TIMEFRAMES[timeframe])
+    if regime == 'mixed':
+        returns = np.empty(bars)
+        gaps = np.empty(bars)
+        segment = 20000
+        for i, lo in enumerate(range(0, bars, segment)):
+            hi = min(bars, lo + segment)
+            kind = ('trend', 'chop', 'gap')[i % 3]
+            returns[lo:hi], gaps[lo:hi] = _GENERATORS[kind](rng, hi - lo, sigma)
+    else:
+        returns, gaps = _GENERATORS[regime](rng, bars, sigma)
+
+    # 跳空体现在开盘价相对上一根收盘价的偏移上
+    log_close = np.cumsum(returns + gaps)
+    close = price * np.exp(log_close)
+    open_ = price * np.exp(np.concatenate([[0.0], log_close[:-1]]) + gaps)
+    wick = np.abs(rng.normal(0.0, sigma * 0.5, (2, bars)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(0.0, 1.0, bars) * (1 + 50 * np.abs(returns + gaps))
+
+    index = pd.date_range(start, periods=bars, freq=f"{TIMEFRAMES[timeframe]}min", name='timestamp')
+    return pd.DataFrame({
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+        'openinterest': np.zeros(bars),
+    }, index=index)
@@ -0,0 +1,301 @@
+"""
+策略吞吐量基准 (bars/s) 与峰值内存
+
+每个用例在独立的子进程中生成合成数据并运行, 峰值 RSS 不受其它用例影响;
+Linux 上峰值从数据生成完成后开始统计 (/proc/self/clear_refs), 只反映回测本身和常驻的数据.
+结果逐行追加到 jsonl 文件, 用 --baseline 与之前某次提交的结果对比, 吞吐量下降超过 --tolerance 时返回非 0.
+
+    python -m benchmark.throughput --bars 10000,100000 --timeframe 1m,5m --output bench.jsonl
+    python -m benchmark.throughput --bars 10000 --baseline bench.jsonl
+    python -m benchmark.throughput --bars 525600 --case single,low_memory --strategy busy,oscillation
+"""
+import datetime
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import backtrader as bt
+import click
+from loguru import logger
+
+import logpolicy
+from analyzer import RunResult
+from benchmark.synthetic import generate, TIMEFRAMES, REGIMES
+from broker import CCXTData
+from broker.OKXData import OKXData
+from datastore import CsvStream
+from engine import run_vector, KERNELS
+from indicator import kernels
+from strategy import Busy, EMA_Crossover, AscendWave
+from strategy.Oscillation import Oscillation
+
+# 策略: (类, 单次回测参数, 网格)
+STRATEGIES = {
+    'busy': (Busy, dict(short_period=20, long_period=100, below=0.005, net_profit=0.01, stop_loss=0.05),
+             dict(short_period=[10, 20], long_period=[100, 200], below=[0.005, 0.01], net_profit=[0.01],
+                  stop_loss=[0.05])),
+    'oscillation': (Oscillation, dict(boll_period=20, boll_dev=2.0, rsi_period=14, rsi_buy_signal=30, stop_loss=0.1),
+                    dict(boll_period=[20, 60], boll_dev=[2.0, 3.0], rsi_period=[14, 50], rsi_buy_signal=[30],
+                         stop_loss=[0.1])),
+    'ascend_wave': (AscendWave, dict(short_period=20, long_period=100),
+                    dict(short_period=[20, 50], long_period=[100, 200], rsi_period=[14, 28])),
+    'ema_crossover': (EMA_Crossover, dict(short_period=7, long_period=30),
+                      dict(short_period=[5, 7, 10, 15], long_period=[30, 60])),
+}
+CASES = ('single', 'low_memory', 'grid', 'vector', 'live')
+FEEDS = ('ccxt', 'okx')
+
+
+class ReplayCCXTData(CCXTData):
+    """CCXTData 的实盘 _load 路径, K 线来自内存, 队列取空时结束"""
+
+    def _produce(self):
+        pass  # 不请求交易所
+
+    def _load(self):
+        if not self.ohlcv:
+            return False
+        return super(ReplayCCXTData, self)._load()
+
+
+class ReplayOKXData(OKXData):
+    """OKXData 的实盘 _load 路径, K 线来自内存, 队列取空时结束"""
+
+    def start(self):
+        # OKXData.start 没有调用基类, 缺少 _laststatus 等 cerebro 需要的状态
+        bt.DataBase.start(self)
+
+    def _load(self):
+        if not self.haslivedata():
+            return False
+        return super(ReplayOKXData, self)._load()
+
+
+def _candles(df):
+    timestamps = df.index.asi8 // 1_000_000
+    return [[int(ts), o, h, l, c, v] for ts, o, h, l, c, v in
+            zip(timestamps, df['open'], df['high'], df['low'], df['close'], df['volume'])]
+
+
+def _live_feed(feed, df):
+    if feed == 'ccxt':
+        data = ReplayCCXTData(exchange_id='okx', sandbox=False, queue_size=len(df))
+    else:
+        data = ReplayOKXData(network='main-net', queue_size=len(df))
+    data.ohlcv.extend(_candles(df))
+    data.has_livedata = bool(data.ohlcv)
+    return data
+
+
+def _cerebro(df, maxcpus=1, **kwargs):
+    cerebro = bt.Cerebro(maxcpus=maxcpus, **kwargs)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.broker.setcash(10000)
+    return cerebro
+
+
+def _reset_peak_rss():
+    """把 VmHWM 重置为当前 RSS (Linux), 其它系统上峰值包含数据生成"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_case(case, strategy, feed, bars, timeframe, regime, maxcpus):
+    """在子进程中执行, 返回计时和最终资产"""
+    logpolicy.configure('ERROR')
+    df = generate(bars, timeframe, regime)
+    strategy_cls, params, grid = STRATEGIES[strategy]
+    if case == 'low_memory':
+        # 数据写成 csv 后释放, 回测时按块读取
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        df.to_csv(path, index_label='timestamp')
+        del df
+        gc.collect()
+    _reset_peak_rss()
+
+    start = time.perf_counter()
+    if case == 'single':
+        cerebro = _cerebro(df, runonce=True, preload=True)
+        cerebro.addstrategy(strategy_cls, **params)
+        runs = 1
+        final_value = cerebro.run()[0].broker.getvalue()
+    elif case == 'low_memory':
+        cerebro = bt.Cerebro(exactbars=1, preload=False, runonce=False)
+        cerebro.adddata(CsvStream(dataname=path))
+        cerebro.broker.setcash(10000)
+        cerebro.addstrategy(strategy_cls, **params)
+        runs = 1
+        try:
+            final_value = cerebro.run()[0].broker.getvalue()
+        finally:
+            os.remove(path)
+    elif case == 'grid':
+        cerebro = _cerebro(df, maxcpus, runonce=True, preload=True, optreturn=True)
+        cerebro.addanalyzer(RunResult)
+        cerebro.optstrategy(strategy_cls, **grid)
+        rows = [result.analyzers.runresult.get_analysis() for results in cerebro.run() for result in results]
+        runs = len(rows)
+        final_value = max(row['final_value'] for row in rows)
+    elif case == 'vector':
+        rows = run_vector(strategy_cls, df, 10000, **grid)
+        runs = len(rows)
+        final_value = max(row['final_value'] for row in rows)
+    else:
+        cerebro = bt.Cerebro()
+        cerebro.adddata(_live_feed(feed, df))
+        cerebro.broker.setcash(10000)
+        cerebro.addstrategy(strategy_cls, **params)
+        runs = 1
+        final_value = cerebro.run()[0].broker.getvalue()
+    seconds = time.perf_counter() - start
+
+    usage = max(_peak_rss_kb(), resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        'runs': runs,
+        'seconds': seconds,
+        'bars_per_s': bars * runs / seconds,
+        'peak_rss_mb': usage / 1024,
+        'final_value': final_value,
+    }
+
+
+def _child(conn, args):
+    try:
+        conn.send(('ok', run_case(*args)))
+    except Exception as e:
+        conn.send(('error', repr(e)))
+    finally:
+        conn.close()
+
+
+def measure(*args):
+    """每个用例使用全新的子进程, 峰值 RSS 互不影响"""
+    ctx = multiprocessing.get_context('fork')
+    parent, child = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(child, args))
+    process.start()
+    child.close()
+    status, result = parent.recv()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError(result)
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(row):
+    return row['case'], row['strategy'], row['feed'], row['bars'], row['timeframe'], row['regime']
+
+
+def compare(rows, baseline_path, tolerance):
+    """与基准文件中同一用例最近一次的结果对比, 返回吞吐量下降超过 tolerance 的用例数"""
+    baseline = {}
+    with open(baseline_path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                baseline[_key(row)] = row
+    regressions = 0
+    for row in rows:
+        old = baseline.get(_key(row))
+        if old is None:
+            continue
+        ratio = row['bars_per_s'] / old['bars_per_s']
+        regressed = ratio < 1 - tolerance
+        regressions += regressed
+        print(f"{'REGRESSION' if regressed else 'ok':<10} {' '.join(str(k) for k in _key(row) if k)} "
+              f"{old['bars_per_s']:.0f} -> {row['bars_per_s']:.0f} bars/s ({ratio:.2f}x, {old.get('commit')})",
+              file=sys.stderr)
+    return regressions
+
+
+def _split(value):
+    return [x for x in value.split(',') if x]
+
+
+@click.command()
+@click.option('--bars', default='10000,100000', help="合成 K 线数量, 逗号分隔, 10k ~ 5M")
+@click.option('--timeframe', 'timeframes', default='1m', help=f"逗号分隔, 可选 {','.join(TIMEFRAMES)}")
+@click.option('--regime', 'regimes', default='mixed', help=f"逗号分隔, 可选 {','.join(REGIMES)}")
+@click.option('--strategy', 'strategies', default=','.join(STRATEGIES), help="逗号分隔")
+@click.option('--case', 'cases', default=','.join(CASES),
+              help="single 单次回测 / low_memory 单次回测, 逐块读取 csv 且只保留回看所需的 bar (exactbars=1) / "
+                   "grid 参数寻优 / vector 数组化引擎寻优 / live 实盘数据源 _load 路径")
+@click.option('--feed', 'feeds', default=','.join(FEEDS), help="live 用例的数据源")
+@click.option('--maxcpus', default=1, help="grid 用例的进程数")
+@click.option('--output', default='benchmark_results.jsonl', help="结果追加写入的 jsonl 文件")
+@click.option('--baseline', default=None, help="对比的历史结果 jsonl")
+@click.option('--tolerance', default=0.15, help="吞吐量允许下降的比例")
+def main(bars, timeframes, regimes, strategies, cases, feeds, maxcpus, output, baseline, tolerance):
+    meta = {
+        'commit': _commit(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'backtrader': bt.__version__,
+        'kernels': kernels.BACKEND,
+        'maxcpus': maxcpus,
+    }
+    plan = []
+    for case in _split(cases):
+        for strategy in _split(strategies):
+            if case == 'vector' and STRATEGIES[strategy][0] not in KERNELS:
+                continue
+            if case == 'live':
+                # 实盘路径与策略无关, 只用 Busy 测数据源
+                if strategy != 'busy':
+                    continue
+                plan += [(case, strategy, feed) for feed in _split(feeds)]
+            else:
+                plan.append((case, strategy, None))
+
+    rows = []
+    for n in [int(x) for x in _split(bars)]:
+        for timeframe in _split(timeframes):
+            for regime in _split(regimes):
+                for case, strategy, feed in plan:
+                    result = measure(case, strategy, feed, n, timeframe, regime, maxcpus)
+                    row = {'case': case, 'strategy': strategy, 'feed': feed, 'bars': n, 'timeframe': timeframe,
+                           'regime': regime, **result, **meta}
+                    rows.append(row)
+                    print(f"{case:<10} {strategy:<14} {feed or '':<5} {timeframe} {regime:<6} bars:{n:<8} "
+                          f"runs:{row['runs']:<3} {row['seconds']:8.2f}s {row['bars_per_s']:>10.0f} bars/s "
+                          f"rss:{row['peak_rss_mb']:.0f}MB", file=sys.stderr)
+                    with open(output, 'a') as f:
+                        f.write(json.dumps(row) + '\n')
+    logger.info(f"save {len(rows)} rows to {output}")
+
+    if baseline and compare(rows, baseline, tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
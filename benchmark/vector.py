@@ -0,0 +1,88 @@
+"""
+数组化引擎 (engine.vector) 与 backtrader 引擎的一致性检查及耗时对比
+
+KERNELS 中的每个策略在各种合成行情上分别用 run_vector 和 run_combos (cerebro 寻优流程) 跑同一组参数网格,
+每组参数的 final_value、commission 和 Performance 分析器的各项指标都要完全相等, 任一不一致时返回非 0.
+
+    python -m benchmark.vector --bars 3000 --regime trend,chop,gap,mixed
+"""
+import sys
+import time
+
+import click
+
+import logpolicy
+from benchmark.synthetic import generate, REGIMES
+from cli.back_strategy import build_cerebro, run_combos
+from cli.utils import result_row
+from engine import run_vector, KERNELS
+from engine.search import grid_combos
+from strategy import Busy, EMA, SMA, EMA_Crossover
+
+GRIDS = {
+    Busy: dict(short_period=[10, 30, 60], long_period=[20, 80], below=[0.002, 0.01], net_profit=[0.005, 0.02],
+               stop_loss=[0.01]),
+    EMA: dict(period=[7, 30], below=[0.002, 0.01], above=[0.002, 0.01]),
+    SMA: dict(period=[7, 30], below=[0.002, 0.01], above=[0.002, 0.01]),
+    EMA_Crossover: dict(short_period=[5, 12], long_period=[21, 50]),
+}
+COLUMNS = ('final_value', 'commission', 'sharpe', 'sortino', 'max_drawdown', 'max_drawdown_bars', 'exposure', 'trades',
+           'profit_factor')
+
+
+def reference(strategy_cls, df, cash, grid):
+    cerebro = build_cerebro(df, cash, 1, slim=True)
+    results = run_combos(cerebro, strategy_cls, grid_combos(grid))
+    return [result_row(strategy) for result in results for strategy in result]
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _split(value):
+    return [x for x in value.split(',') if x]
+
+
+@click.command()
+@click.option('--bars', default='3000', help="合成 K 线数量, 逗号分隔")
+@click.option('--regime', 'regimes', default=','.join(REGIMES), help=f"逗号分隔, 可选 {','.join(REGIMES)}")
+@click.option('--cash', default=10000)
+def main(bars, regimes, cash):
+    logpolicy.configure('ERROR')
+    missing = [cls.__name__ for cls in KERNELS if cls not in GRIDS]
+    if missing:
+        print(f"缺少参数网格: {missing}", file=sys.stderr)
+        sys.exit(1)
+    total = mismatches = 0
+    for n in [int(x) for x in _split(bars)]:
+        for regime in _split(regimes):
+            df = generate(n, '1m', regime)
+            for strategy_cls in KERNELS:
+                grid = GRIDS[strategy_cls]
+                expected, bt_seconds = _timed(lambda: reference(strategy_cls, df, cash, grid))
+                got, vector_seconds = _timed(lambda: run_vector(strategy_cls, df, cash, **grid))
+                bad = 0
+                for want, row in zip(expected, got):
+                    if any(want[column] != row[column] for column in COLUMNS):
+                        bad += 1
+                        print(f"  MISMATCH {strategy_cls.__name__} {regime} "
+                              f"{ {name: row[name] for name in grid} } "
+                              f"backtrader:{[want[c] for c in COLUMNS]} vector:{[row[c] for c in COLUMNS]}",
+                              file=sys.stderr)
+                bad += len(expected) != len(got)
+                total += len(expected)
+                mismatches += bad
+                traded = sum(row['commission'] != 0 for row in expected)
+                print(f"bars:{n} regime:{regime:<6} {strategy_cls.__name__:<14} grid:{len(expected):<3} "
+                      f"traded:{traded:<3} backtrader:{bt_seconds:6.2f}s vector:{vector_seconds:6.3f}s "
+                      f"{'ok' if not bad else 'MISMATCH'}", file=sys.stderr)
+    if mismatches:
+        print(f"{mismatches}/{total} 组参数与 backtrader 引擎不一致", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import time
+
+from datastore.resample import parse_timeframe
+
+
+class BarScheduler:
+    """
+    REST 实盘模式的取数节奏: 由周期算出下一根 K 线的收盘时间, 睡到收盘后 settle 秒再请求;
+    交易所还没给出收盘的 K 线时按指数退避重试, 超过 give_up 秒仍没有则放弃, 等下一根收盘
+
+    1m 周期每根 K 线通常只需 1 次请求 (每 2 秒轮询约 30 次), 收盘到取得的延迟约为 settle 秒
+    """
+
+    def __init__(self, interval, settle=0.3, backoff=0.25, max_backoff=4.0, give_up=None, clock=time.time,
+                 sleep=time.sleep, stop_event=None):
+        """
+        :param settle: 收盘后等待的秒数, 给交易所生成 K 线的时间
+        :param backoff: 第一次重试的间隔 (秒), 之后每次翻倍, 最长 max_backoff
+        :param give_up: 收盘后最多重试的秒数, 默认半个周期且不超过 60 秒
+        :param clock: 当前时间 (秒), 测试时替换为虚拟时钟
+        :param stop_event: threading.Event, 设置后等待立即结束, wait 返回 False
+        """
+        self.step = parse_timeframe(interval) * 1000
+        self.settle = settle
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.give_up = give_up if give_up is not None else min(self.step / 2000, 60)
+        self.clock = clock
+        self.sleep = sleep
+        self.stop_event = stop_event
+        self.bars = 0
+        self.polls = 0
+        self.misses = 0
+        self.latency = None  # 最近一根 K 线从收盘到取得的秒数
+        self._polled = None  # 最近一次请求对应的收盘时间
+
+    def now(self):
+        return int(self.clock() * 1000)
+
+    def next_close(self, last_ts=0, now=None):
+        """
+        当前这根 K 线的收盘时间 (毫秒)
+        :param last_ts: 最后一根已取得的 K 线的开始时间, 用来对齐交易所的 K 线边界 (例如 okx 的 1D 按 UTC+8 划分)
+        """
+        now = self.now() if now is None else now
+        phase = last_ts % self.step if last_ts else 0
+        return ((now - phase) // self.step + 1) * self.step + phase
+
+    def _pause(self, seconds):
+        if self.stop_event is not None:
+            self.stop_event.wait(seconds)
+        else:
+            self.sleep(seconds)
+
+    def stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _sleep_until(self, ms):
+        remaining = (ms - self.now()) / 1000
+        if remaining > 0:
+            self._pause(remaining)
+
+    def wait(self, last_ts, poll):
+        """
+        等到下一根 K 线收盘后调用 poll(close) 直到返回 True;
+        已有收盘但尚未取得的 K 线 (例如预热之后又过了一个周期) 时不等待, 立即请求; 已经放弃过的收盘不再立即请求
+        :param poll: poll(close) -> 收盘时间为 close 的 K 线是否已取得
+        :return: 是否取得
+        """
+        close = self.next_close(last_ts)
+        if last_ts and last_ts + self.step < close - self.step and close - self.step != self._polled:
+            close -= self.step
+        else:
+            self._sleep_until(close + self.settle * 1000)
+        self._polled = close
+        delay = self.backoff
+        while not self.stopped():
+            self.polls += 1
+            if poll(close):
+                self.bars += 1
+                self.latency = self.clock() - close / 1000
+                return True
+            if self.now() >= close + self.give_up * 1000:
+                self.misses += 1
+                return False
+            self._pause(delay)
+            delay = min(delay * 2, self.max_backoff)
+        return False
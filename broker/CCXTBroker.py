@@ -1,6 +1,7 @@
 import sys
 import time
 
+import ccxt
 from loguru import logger
 import backtrader as bt
 from backtrader.utils.py3 import queue, with_metaclass
@@ -39,6 +40,7 @@ class CCXTBroker(with_metaclass(MetaCCXTBroker, bt.BackBroker)):
         ('exchange_id', ''),
         ('sandbox', True),
         ('cash', 0),
+        ('poll_interval', 2.0),  # 两次订单对账的最短间隔 (秒), cerebro 在等待 K 线时也会调用 next
     )
 
     order_types = {bt.Order.Market: 'market',
@@ -68,6 +70,7 @@ class CCXTBroker(with_metaclass(MetaCCXTBroker, bt.BackBroker)):
 
         self.notifs = queue.Queue()
         self.open_orders = list()
+        self._last_poll = None
 
     def start(self):
         logger.info(f"{self.p.symbol} starting...")
@@ -135,11 +138,36 @@ class CCXTBroker(with_metaclass(MetaCCXTBroker, bt.BackBroker)):
             self.position.size -= order_info['filled']
 
     def next(self):
+        """
+        订单对账: 每轮一次 fetch_open_orders 取得所有挂单, 与本地的 open_orders 比较,
+        只有不在挂单列表中 (已成交/撤销) 的订单才单独 fetch_order 查询最终状态
+        """
+        if not self.open_orders:
+            return
+        now = time.monotonic()
+        if self._last_poll is not None and now - self._last_poll < self.p.poll_interval:
+            return
+        self._last_poll = now
+        try:
+            pending = {info['id']: info for info in self.store.fetch_open_orders(self.p.symbol)}
+        except (ccxt.NetworkError, ccxt.ExchangeError) as e:
+            logger.warning(f"查询挂单失败, 下一轮重试: {e}")
+            return
         for order in list(self.open_orders):
-            self.update_order(order)
+            info = pending.get(order.tradeid)
+            if info is None:
+                self.update_order(order)
+            else:
+                order.ccxt_order = info
 
     def update_order(self, order):
-        _order = self.store.fetch_order(order.tradeid, self.p.symbol)
+        try:
+            _order = self.store.fetch_order(order.tradeid, self.p.symbol)
+        except (ccxt.NetworkError, ccxt.ExchangeError) as e:
+            # 刚下单时交易所可能还查不到 (OrderNotFound), 下一轮再查
+            logger.warning(f"查询订单 {order.tradeid} 失败, 下一轮重试: {e}")
+            return
+        order.ccxt_order = _order
         status = _order['status']
         if status == 'closed':
             order.completed()
@@ -152,3 +180,15 @@ class CCXTBroker(with_metaclass(MetaCCXTBroker, bt.BackBroker)):
             self.update_asset(_order)
             self.notify(order)
             self.open_orders.remove(order)
+        elif status in ('canceled', 'expired', 'rejected'):
+            # 撤销/过期/拒绝的订单不再查询, 之前部分成交的数量仍要计入资金和持仓
+            logger.warning(f"订单 {order.tradeid} {status} 已成交 {_order['filled']}")
+            if _order['filled']:
+                order.executed_price = _order['average']
+                order.executed_size = _order['filled']
+                order.cost = _order['cost']
+                order.fee = _order['fee']
+                self.update_asset(_order)
+            {'canceled': order.cancel, 'expired': order.expire, 'rejected': order.reject}[status]()
+            self.notify(order)
+            self.open_orders.remove(order)
@@ -1,5 +1,6 @@
 import sys
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 import time
 import ccxt
 import backtrader as bt
@@ -7,12 +8,28 @@ import pytz
 from loguru import logger
 import pandas as pd
 
+from datastore import candlesync
+from datastore.candlesync import candle_frame
+from datastore.resample import parse_timeframe
+from datastore.warehouse import exchange_key
+from .CandleDownloader import CandleDownloader
+from .CandleQueue import CandleQueue
+from .BarScheduler import BarScheduler
+from .FeedMetrics import FeedMetrics
+
 class CCXTData(bt.DataBase):
+    """
+    REST 实盘数据源: 后台线程按 K 线收盘节奏请求 (BarScheduler), 收盘的 K 线放入有界队列,
+    _load 只从队列取, 策略的 next 和订单状态轮询不会等待网络请求; 指标见 metrics (FeedMetrics)
+    """
     params = (
         ('sandbox', True),
         ('exchange_id', ''),
         ('symbol', 'BTC/USDT'),
         ('interval', '1m'),
+        ('store', None),  # datastore.CandleStore, 预热优先读取本地仓库, 收盘的 K 线写回仓库
+        ('queue_size', 100_000),  # 待消费 K 线队列的容量, 超出时丢弃最旧的
+        ('qcheck', 0.5),  # 队列为空时 _load 最多等待的秒数, 之后交回 cerebro 轮询 broker
     )
 
     def __init__(self):
@@ -26,59 +43,97 @@ class CCXTData(bt.DataBase):
 
         self.exchange = exchange
         self.last_ts = 0
-        self.ohlcv = []
+        self.ohlcv = CandleQueue(self.p.queue_size)
+        self.cond = threading.Condition()  # 保护 ohlcv/last_ts, 入队时唤醒 _load
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.scheduler = BarScheduler(self.p.interval, stop_event=self._stop_event)
+        self.metrics = FeedMetrics()
 
     def start(self):
         super(CCXTData, self).start()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._produce, name=f"candle-feed-{self.p.symbol}", daemon=True)
+        self._thread.start()
 
     def stop(self):
-        pass
+        self._stop_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        self._interrupt()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _interrupt(self):
+        """唤醒阻塞在网络上的后台线程, 子类按需实现"""
 
     def haslivedata(self):
-        if len(self.ohlcv) != 0:
-            return True
-        else:
-            return False
+        with self.cond:
+            return bool(self.ohlcv)
 
     def islive(self):
         return True
 
     def _load(self):
-        try:
+        """
+        队列为空时最多等待 qcheck 秒, 仍没有则返回 None, cerebro 照常轮询 broker (订单状态) 后再来取
+        """
+        with self.cond:
+            if not self.ohlcv and not self._stop_event.is_set():
+                self.cond.wait(timeout=self._qcheck)
             if not self.ohlcv:
-                while not self.ohlcv:
-                    time.sleep(2)
-                    utc_now = datetime.utcnow() + timedelta(hours=8)
-                    to_ = int(utc_now.timestamp() * 1000)
-                    from_ = to_ - self._interval_to_milliseconds(self.p.interval)
-
-                    if self.is_same_minute(to_, self.last_ts):
-                        continue
-                    self.fetch_data(from_, to_)
-
-            if self.ohlcv:
-                ohlc = self.ohlcv.pop(0)
-                ohlc[0] = bt.date2num(ohlc[0])
-                self.lines.datetime[0] = ohlc[0]
-                self.lines.open[0] = ohlc[1]
-                self.lines.high[0] = ohlc[2]
-                self.lines.low[0] = ohlc[3]
-                self.lines.close[0] = ohlc[4]
-                self.lines.volume[0] = ohlc[5]
-
-                return True
-            else:
-                print(111)
-                return False
-        except Exception as e:
-            logger.error(f"Error loading data: {e}")
-            return False
+                return False if self._stop_event.is_set() else None
+            ohlc = self.ohlcv.pop()
+            depth = len(self.ohlcv)
+        self.metrics.dequeued(ohlc[0] + self.scheduler.step, depth)
+        self._fill(ohlc)
+        return True
+
+    def _produce(self):
+        """后台线程: 每根 K 线收盘后请求 REST, 直到 stop"""
+        while not self._stop_event.is_set():
+            try:
+                if self.scheduler.wait(self.last_ts, self._poll_closed):
+                    logger.debug(f"K 线收盘后 {self.scheduler.latency:.2f}s 取得, "
+                                 f"累计 {self.scheduler.bars} 根 请求 {self.scheduler.polls} 次")
+                elif not self._stop_event.is_set():
+                    logger.warning(f"K 线收盘 {self.scheduler.give_up:.0f}s 后仍未取得, 等待下一根")
+            except Exception as e:
+                logger.error(f"Error loading data: {e}")
+                self._stop_event.wait(self.scheduler.max_backoff)
+
+    def _push(self, candles, source):
+        """比最后一根新的 K 线放入队列, 返回入队数量; 可在任意线程调用"""
+        with self.cond:
+            fresh = [candle for candle in candles if candle[0] > self.last_ts]
+            if not fresh:
+                return 0
+            self.ohlcv.extend(fresh)
+            self.last_ts = fresh[-1][0]
+            depth = len(self.ohlcv)
+            self.cond.notify_all()
+        self.metrics.enqueued(source, len(fresh), depth)
+        return len(fresh)
 
-    def is_same_minute(self, timestamp1, timestamp2):
-        dt1 = datetime.utcfromtimestamp(timestamp1 / 1000) + timedelta(hours=8)
-        dt2 = datetime.utcfromtimestamp(timestamp2 / 1000) + timedelta(hours=8)
+    def _fill(self, ohlc):
+        """:param ohlc: (ts_ms, open, high, low, close, volume)"""
+        self.lines.datetime[0] = bt.date2num(datetime.fromtimestamp(ohlc[0] / 1000))
+        self.lines.open[0] = ohlc[1]
+        self.lines.high[0] = ohlc[2]
+        self.lines.low[0] = ohlc[3]
+        self.lines.close[0] = ohlc[4]
+        self.lines.volume[0] = ohlc[5]
 
-        return dt1.strftime('%Y-%m-%d %H:%M') == dt2.strftime('%Y-%m-%d %H:%M')
+    def _poll_closed(self, close):
+        """请求最后一根之后到 close 为止已收盘的 K 线, 返回收盘时间为 close 的 K 线是否已取得"""
+        step = self.scheduler.step
+        since = self.last_ts + step if self.last_ts else close - step
+        try:
+            self.fetch_data(since, close, limit=100)
+        except ccxt.NetworkError as e:
+            logger.warning(f"拉取 K 线失败, 稍后重试: {e}")
+            return False
+        return self.last_ts >= close - step
 
     def _interval_to_milliseconds(self, interval):
         unit = interval[-1]
@@ -103,57 +158,90 @@ class CCXTData(bt.DataBase):
         china_time = utc_time.replace(tzinfo=pytz.utc).astimezone(china_tz)
         return china_time
 
+    def store_key(self):
+        return exchange_key(self.p.exchange_id, self.p.sandbox), self.p.symbol, self.p.interval
+
     def pre_fetch_data(self, limit):
         """预加载数据"""
         logger.info(f"pre fetch data {limit}")
-        utc_now = datetime.utcnow() + timedelta(hours=8)
-        to_ = int(utc_now.timestamp() * 1000)
-        from_ = to_ - self._interval_to_milliseconds(self.p.interval) * limit
+        if self.p.store is not None:
+            return self.pre_fetch_store(limit)
+        # 只取已收盘的 K 线 (开始时间 + 周期 <= 当前时间)
+        step = self._interval_to_milliseconds(self.p.interval)
+        to_ = int(time.time() * 1000) - step + 1
+        from_ = to_ - step * limit
         self.fetch_data(from_, to_, limit=100)
 
+    def pre_fetch_store(self, limit):
+        """最近 limit 根已收盘的 K 线从本地仓库读取, 只向交易所请求仓库中缺失的部分"""
+        step = parse_timeframe(self.p.interval) * 1000
+        until = int(time.time() * 1000) // step * step
+        since = until - step * limit
+        self.p.store.sync(self.downloader(), self.store_key()[0], since, until)
+        self._push(self.p.store.candles(*self.store_key(), since, until), 'store')
+        logger.info(f"从仓库预热 {len(self.ohlcv)} 根 K 线")
+
+    def store_closed(self, ohlcvs):
+        """已收盘的 K 线写入本地仓库, 未收盘的最后一根不写"""
+        step = parse_timeframe(self.p.interval) * 1000
+        now = int(time.time() * 1000)
+        closed = [ohlcv for ohlcv in ohlcvs if ohlcv[0] + step <= now]
+        try:
+            self.p.store.write(*self.store_key(), closed)
+        except Exception as e:
+            logger.warning(f"K 线写入仓库失败: {e}")
+
     def fetch_data(self, from_timestamp, to_timestamp, limit=10):
+        """开始时间在 [from_timestamp, to_timestamp) 内的 K 线放入队列"""
         try:
             current_timestamp = from_timestamp
-            while current_timestamp < to_timestamp:
-                ohlcvs = self.exchange.fetch_ohlcv(self.p.symbol, self.p.interval, since=current_timestamp, limit=limit)
+            while current_timestamp < to_timestamp and not self._stop_event.is_set():
+                with self.metrics.fetch():
+                    ohlcvs = self.exchange.fetch_ohlcv(self.p.symbol, self.p.interval, since=current_timestamp,
+                                                       limit=limit)
                 if ohlcvs:
+                    if self.p.store is not None:
+                        self.store_closed(ohlcvs)
                     back_one = ohlcvs[-1][0]
-                    for ohlcv in ohlcvs:
-                        if ohlcv[0] > self.last_ts:
-                            index_timestamp = ohlcv[0]
-                            ohlcv[0] = datetime.fromtimestamp(ohlcv[0]/1000)
-                            self.last_ts = index_timestamp
-                            self.ohlcv.append(ohlcv)
+                    self._push([ohlcv for ohlcv in ohlcvs if ohlcv[0] < to_timestamp], 'rest')
                     logger.debug(
-                        f"Fetched data point: {datetime.fromtimestamp(index_timestamp/1000).strftime('%Y-%m-%d %H:%M:%S')} limit {len(ohlcvs)}")
+                        f"Fetched data point: {datetime.fromtimestamp(self.last_ts/1000).strftime('%Y-%m-%d %H:%M:%S')} limit {len(ohlcvs)}")
                     current_timestamp = back_one + 1  # 更新当前时间戳为最后一个数据点的时间戳+1
+                    if back_one + self.scheduler.step >= to_timestamp:
+                        break  # 下一根已不在区间内, 不再多请求一页
                 else:
                     break
         except Exception as e:
             logger.error(f"Error fetching historical data: {e}")
             raise e
 
-    def save_to_csv(self, fromdate, todate, path):
+    def downloader(self, workers=8, rate=None):
+        return CandleDownloader(self.exchange, self.p.symbol, self.p.interval, limit=100, workers=workers, rate=rate)
+
+    def save_to_csv(self, fromdate, todate, path, workers=8, rate=None):
+        """
+        下载 [fromdate, todate) 的 K 线写入 csv, 区间按时间分段并发拉取, 按时间顺序逐段追加写入
+        :param workers: 并发请求数
+        :param rate: 每秒请求数, 默认取交易所的 rateLimit
+        """
         if fromdate and todate:
             from_timestamp = int(fromdate.timestamp() * 1000)
             to_timestamp = int(todate.timestamp() * 1000)
             if to_timestamp < from_timestamp:
                 logger.warning("开始时间小于结束时间")
                 sys.exit(1)
-
-            self.fetch_data(from_timestamp, to_timestamp, limit=100)
-
         else:
             logger.error("时间区间不能为空")
             sys.exit(1)
 
-        columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
-        df = pd.DataFrame(self.ohlcv, columns=columns)
-        # df['datetime'] = pd.to_datetime(df['datetime'])
-        df['openinterest'] = 0 # 新增一列，并且数据都为0
-        df = df[columns + ['openinterest']]
         path = f"{path}_{self.p.exchange_id}_{'testnet' if self.p.sandbox else 'mainnet'}.csv"
-        df.to_csv(path, index=False)
+        downloader = self.downloader(workers, rate)
+        header = True
+        for candles in downloader.iter_chunks(from_timestamp, to_timestamp):
+            candle_frame(candles).to_csv(path, mode='w' if header else 'a', header=header, index=False)
+            header = False
+        if header:
+            pd.DataFrame(columns=candlesync.COLUMNS).to_csv(path, index=False)
         logger.info(f"save to {path}")
 
 def main():
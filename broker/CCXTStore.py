@@ -30,12 +30,18 @@ class CCXTStore(with_metaclass(MetaSingleton, object)):
         ('password', ''),
         ('exchange_id', ''),
         ('sandbox', True),
+        ('exchange', None),  # 已创建的交易所对象, 离线测试时为 benchmark.fakeexchange, 默认按 exchange_id 创建
     )
 
     BrokerCls = None  # broker class will auto register
     DataCls = None  # data class will auto register
 
     def __init__(self):
+        if self.p.exchange is not None:
+            self.exchange = self.p.exchange
+            self.markets = self.exchange.load_markets()
+            return
+
         exchange_class = getattr(ccxt, self.p.exchange_id)
 
         exchange = exchange_class({
@@ -105,13 +111,19 @@ class CCXTStore(with_metaclass(MetaSingleton, object)):
         else:
             return float(response['data'][0]['sellLmt'])
 
-    @retry(wait=wait_fixed(2))
+    @retry(wait=wait_fixed(2), stop=stop_after_attempt(3), reraise=True)
     def fetch_order(self, oid, symbol):
         logger.debug(f"Fetch_order: {oid}")
         order_info = self.exchange.fetch_order(oid, symbol)
         logger.debug(f"Fetch_order result: {order_info}")
         return order_info
 
+    def fetch_open_orders(self, symbol):
+        """symbol 当前所有未完成的订单, 一次请求; 失败时由调用方在下一轮重试"""
+        orders = self.exchange.fetch_open_orders(symbol)
+        logger.debug(f"Fetch_open_orders: {[order['id'] for order in orders]}")
+        return orders
+
     def handler_precision(self, symbol, value):
         amount_precision = int(abs(Decimal(str(self.markets[symbol]['precision']['amount'])).as_tuple().exponent))
         value = truncate_to_decimal_places(value, amount_precision)
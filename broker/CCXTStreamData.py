@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+
+import aiohttp
+from loguru import logger
+
+from datastore.resample import parse_timeframe
+from .CCXTData import CCXTData
+
+OKX_WS_URL = 'wss://ws.okx.com:8443/ws/v5/business'
+OKX_WS_SANDBOX_URL = 'wss://wspap.okx.com:8443/ws/v5/business'
+STREAM_EXCHANGES = ('okx',)  # 只实现了 okx 的 candle 频道协议
+
+
+def inst_id(symbol):
+    """BTC/USDT -> BTC-USDT, BTC/USDT:USDT (永续) -> BTC-USDT-SWAP"""
+    pair, _, settle = symbol.partition(':')
+    return pair.replace('/', '-') + ('-SWAP' if settle else '')
+
+
+class CCXTStreamData(CCXTData):
+    """
+    websocket 推送的实盘数据源, 协议为 okx 的 candle 频道: 只有已收盘 (confirm=1) 的 K 线放入队列,
+    收盘后即可送入策略, 不再每 2 秒轮询 REST
+
+    连接在后台线程的 asyncio 事件循环中维护:
+    - 连接/订阅成功后先用 REST 补齐上次收到的 K 线之后已收盘的部分
+    - 推送的 K 线与上一根不连续时 (丢包), 同样先用 REST 补齐
+    - 断线期间每次重连之前用 REST 补齐, 重连按指数退避, 最长 reconnect 秒
+    """
+    params = (
+        ('ws_url', None),  # 默认为 okx 的 business 地址, 离线测试时指向 benchmark.fakestream
+        ('reconnect', 30),  # 重连的最长退避秒数
+        ('ping_interval', 25),  # 超过该秒数没有消息时发送 ping, okx 30 秒无消息即断开
+    )
+
+    def __init__(self):
+        if self.p.exchange_id not in STREAM_EXCHANGES:
+            raise ValueError(f"websocket 行情只支持 {', '.join(STREAM_EXCHANGES)}, 不支持 {self.p.exchange_id}")
+        super(CCXTStreamData, self).__init__()
+        self.step = parse_timeframe(self.p.interval) * 1000
+        self.url = self.p.ws_url or (OKX_WS_SANDBOX_URL if self.p.sandbox else OKX_WS_URL)
+        timeframes = getattr(self.exchange, 'timeframes', None) or {}
+        self.channel = f"candle{timeframes.get(self.p.interval, self.p.interval)}"
+        self.connected = False
+        self.reconnects = 0
+        self._loop = None
+        self._task = None
+
+    def _interrupt(self):
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass  # 事件循环已经退出
+
+    def pre_fetch_data(self, limit):
+        """预热只取已收盘的 K 线, 之后由推送接续"""
+        if self.p.store is not None:
+            return super(CCXTStreamData, self).pre_fetch_data(limit)
+        logger.info(f"pre fetch data {limit}")
+        self.backfill(int(time.time() * 1000) // self.step * self.step - self.step * limit)
+
+    def _queue(self, candles, source):
+        added = self._push(candles, source)
+        if added and self.p.store is not None:
+            self.store_closed(candles[-added:])
+        return added
+
+    def backfill(self, since=None):
+        """
+        用 REST 补齐 since (默认为最后一根之后) 到当前时间之间已收盘的 K 线
+        :return: 补齐的数量
+        """
+        if since is None:
+            since = self.last_ts + self.step
+        closed = int(time.time() * 1000) // self.step * self.step
+        added = 0
+        while since < closed:
+            with self.metrics.fetch():
+                page = self.exchange.fetch_ohlcv(self.p.symbol, self.p.interval, since=since, limit=100)
+            page = [candle for candle in page if since <= candle[0] < closed]
+            if not page:
+                break
+            added += self._queue(page, 'rest')
+            since = page[-1][0] + self.step
+        if added:
+            logger.info(f"REST 补齐 {added} 根 K 线")
+        return added
+
+    def _produce(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        self._task = loop.create_task(self._stream())
+        try:
+            loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+
+    async def _backfill(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.backfill)
+        except Exception as e:
+            logger.warning(f"REST 补齐失败: {e}")
+
+    async def _stream(self):
+        subscribe = {'op': 'subscribe', 'args': [{'channel': self.channel, 'instId': inst_id(self.p.symbol)}]}
+        backoff = 1
+        async with aiohttp.ClientSession() as session:
+            while not self._stop_event.is_set():
+                try:
+                    async with session.ws_connect(self.url) as ws:
+                        await ws.send_json(subscribe)
+                        self.connected = True
+                        backoff = 1
+                        logger.info(f"已订阅 {self.url} {self.channel} {inst_id(self.p.symbol)}")
+                        await self._backfill()
+                        await self._receive(ws)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    logger.warning(f"websocket 连接失败: {e!r}")
+                if self._stop_event.is_set():
+                    break
+                if self.connected:
+                    self.connected = False
+                    self.reconnects += 1
+                    logger.warning(f"websocket 断开, {backoff}s 后重连, 期间使用 REST 补齐")
+                await self._backfill()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.p.reconnect)
+
+    async def _receive(self, ws):
+        waiting_pong = False
+        while True:
+            try:
+                msg = await ws.receive(timeout=self.p.ping_interval)
+            except asyncio.TimeoutError:
+                if waiting_pong:
+                    logger.warning("websocket 心跳超时")
+                    return
+                await ws.send_str('ping')
+                waiting_pong = True
+                continue
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                return
+            waiting_pong = False
+            if msg.data == 'pong':
+                continue
+            await self._on_message(json.loads(msg.data))
+
+    async def _on_message(self, message):
+        if message.get('event') == 'error':
+            logger.error(f"订阅失败: {message.get('code')} {message.get('msg')}")
+            return
+        for row in message.get('data', ()):
+            # [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
+            if row[8] != '1':
+                continue
+            candle = [int(row[0]), *map(float, row[1:6])]
+            if self.last_ts and candle[0] > self.last_ts + self.step:
+                await self._backfill()
+            self._queue([candle], 'stream')
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+from loguru import logger
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from datastore.resample import parse_timeframe
+
+
+class RateLimiter:
+    """
+    线程安全的限速器, 所有下载线程共享同一份请求预算
+    令牌桶让请求均匀间隔: 令牌不足时预约下一个令牌并在锁外等待, 请求按到达顺序放行;
+    另外记录实际放行的时间, 任意 window 秒内最多放行 int(rate * window) 个请求.
+    线程唤醒延迟会让令牌桶的请求挤在一起, 滑动窗口保证交易所按实际到达时间计数时也不超限
+    :param rate: 每秒请求数
+    :param burst: 桶容量, 允许连续发出的请求数
+    :param window: 滑动窗口的秒数
+    """
+
+    def __init__(self, rate, burst=1, window=1.0):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self.limit = max(1, int(rate * window))
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._sends = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sends and self._sends[0] <= now - self.window:
+                    self._sends.popleft()
+                if len(self._sends) < self.limit:
+                    self._sends.append(now)
+                    return
+                wait = self._sends[0] + self.window - now
+            time.sleep(wait)
+
+
+class CandleDownloader:
+    """
+    历史 K 线并发下载: [since, until) 按 K 线时间切成互不重叠的分段, 在线程池中拉取,
+    所有请求共享一个 RateLimiter, 结果按时间戳去重后按时间顺序返回
+
+        downloader = CandleDownloader(exchange, 'BTC/USDT', '1m')
+        for candles in downloader.iter_chunks(since, until):
+            ...
+    """
+
+    def __init__(self, exchange, symbol, interval, limit=100, workers=8, rate=None, chunk_pages=1):
+        """
+        :param exchange: ccxt 交易所实例 (或实现 fetch_ohlcv 的对象)
+        :param limit: 单次请求的 K 线数量
+        :param workers: 并发线程数
+        :param rate: 每秒请求数, 默认取交易所的 rateLimit (毫秒/请求)
+        :param chunk_pages: 每个分段覆盖的页数, 分段内部按页顺序拉取
+        """
+        self.exchange = exchange
+        self.symbol = symbol
+        self.interval = interval
+        self.limit = limit
+        self.workers = max(1, workers)
+        self.step = parse_timeframe(interval) * 1000
+        self.chunk_ms = self.step * limit * max(1, chunk_pages)
+        rate = rate or 1000 / (getattr(exchange, 'rateLimit', 0) or 100)
+        # 与 ccxt 的 rateLimit 相同, 请求之间均匀间隔; 并发只是让多个请求的往返延迟重叠
+        self.limiter = RateLimiter(rate)
+        self.requests = 0
+        self.retries = 0
+        self._stats_lock = threading.Lock()
+
+    def chunks(self, since, until):
+        """把 [since, until) 切成 [(lo, hi), ...], 边界对齐到 K 线周期"""
+        lo = since - since % self.step
+        if lo < since:
+            lo += self.step
+        return [(start, min(start + self.chunk_ms, until)) for start in range(lo, until, self.chunk_ms)]
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _before_retry(self, state):
+        self._count('retries')
+        logger.warning(f"拉取 K 线失败, 第 {state.attempt_number} 次重试: {state.outcome.exception()}")
+
+    def _fetch_page(self, since):
+        # 超时/限频等网络错误按指数退避重试, 每次重试同样消耗限速预算
+        @retry(retry=retry_if_exception_type(ccxt.NetworkError), wait=wait_exponential(multiplier=0.5, max=10),
+               stop=stop_after_attempt(6), before_sleep=self._before_retry, reraise=True)
+        def fetch():
+            self.limiter.acquire()
+            self._count('requests')
+            return self.exchange.fetch_ohlcv(self.symbol, self.interval, since=since, limit=self.limit)
+
+        return fetch()
+
+    def fetch_chunk(self, lo, hi):
+        """单个分段内按页顺序拉取, 返回 [lo, hi) 内的 K 线 [ts, open, high, low, close, volume]"""
+        candles = []
+        since = lo
+        while since < hi:
+            page = [candle for candle in self._fetch_page(since) if candle[0] >= since]
+            if not page:
+                break
+            candles.extend(candle for candle in page if candle[0] < hi)
+            since = page[-1][0] + self.step
+        return candles
+
+    def iter_chunks(self, since, until):
+        """按时间顺序逐段返回 [since, until) 的 K 线, 见 iter_ranges"""
+        return self.iter_ranges([(since, until)])
+
+    def iter_ranges(self, ranges):
+        """
+        多个互不重叠的区间 [(since, until), ...] 的分段一起并发拉取, 按时间顺序逐段返回 K 线, 已按时间戳去重;
+        分段乱序完成时先完成的结果在内存中等待. 下载期间关闭 ccxt 自带的限速, 由共享的 RateLimiter 控制
+        """
+        chunks = [chunk for since, until in sorted(ranges) for chunk in self.chunks(since, until)]
+        logger.info(f"下载 {self.symbol} {self.interval} {len(ranges)} 个区间 {len(chunks)} 个分段 "
+                    f"workers:{self.workers} rate:{self.limiter.rate:.1f}/s")
+        start = time.perf_counter()
+        throttled = getattr(self.exchange, 'enableRateLimit', False)
+        self.exchange.enableRateLimit = False
+        last_ts = None
+        count = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for candles in pool.map(lambda chunk: self.fetch_chunk(*chunk), chunks):
+                    candles = sorted({candle[0]: candle for candle in candles}.values(), key=lambda c: c[0])
+                    if last_ts is not None:
+                        candles = [candle for candle in candles if candle[0] > last_ts]
+                    if candles:
+                        last_ts = candles[-1][0]
+                        count += len(candles)
+                        yield candles
+        finally:
+            self.exchange.enableRateLimit = throttled
+        logger.info(f"下载完成 {count} 根 K 线 请求:{self.requests} 重试:{self.retries} "
+                    f"用时:{time.perf_counter() - start:.1f}s")
+
+    def download(self, since, until):
+        """[since, until) 内的全部 K 线, 按时间戳排序且不重复"""
+        return [candle for candles in self.iter_chunks(since, until) for candle in candles]
@@ -0,0 +1,95 @@
+import numpy as np
+from loguru import logger
+
+
+class CandleQueue:
+    """
+    实盘数据源的 K 线队列: 预分配的环形缓冲区, 时间戳为 int64 毫秒, OHLCV 为 float64,
+    push/pop 均为 O(1), 不为每根 K 线创建 list/datetime
+
+    容量固定, 队列满时丢弃最旧的 K 线并计入 dropped. 本身不加锁, 多线程读写由调用方加锁
+    """
+
+    def __init__(self, capacity=100_000):
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于 0")
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, 5), dtype=np.float64)
+        self._head = 0
+        self._size = 0
+        self.pushed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def _overflow(self, count):
+        self.dropped += count
+        logger.warning(f"K 线队列已满 (容量 {self.capacity}), 丢弃最旧的 {count} 根, 累计丢弃 {self.dropped}")
+
+    def push(self, candle):
+        """:param candle: [ts_ms, open, high, low, close, volume]"""
+        if self._size == self.capacity:
+            self._head = (self._head + 1) % self.capacity
+            self._size -= 1
+            self._overflow(1)
+        tail = (self._head + self._size) % self.capacity
+        self.timestamps[tail] = candle[0]
+        self.values[tail] = candle[1:6]
+        self._size += 1
+        self.pushed += 1
+
+    def extend(self, candles):
+        """批量写入, 按整块复制到环形缓冲区的尾部 (最多两段)"""
+        count = len(candles)
+        if not count:
+            return
+        array = np.asarray(candles, dtype=np.float64).reshape(count, -1)
+        timestamps = np.asarray([candle[0] for candle in candles], dtype=np.int64)
+        values = array[:, 1:6]
+        self.pushed += count
+        overflow = self._size + count - self.capacity
+        if overflow > 0:
+            if count >= self.capacity:
+                timestamps, values = timestamps[-self.capacity:], values[-self.capacity:]
+                count = self.capacity
+                self._head, self._size = 0, 0
+            else:
+                self._head = (self._head + overflow) % self.capacity
+                self._size -= overflow
+            self._overflow(overflow)
+        tail = (self._head + self._size) % self.capacity
+        first = min(count, self.capacity - tail)
+        self.timestamps[tail:tail + first] = timestamps[:first]
+        self.values[tail:tail + first] = values[:first]
+        self.timestamps[:count - first] = timestamps[first:]
+        self.values[:count - first] = values[first:]
+        self._size += count
+
+    def pop(self):
+        """取出最旧的一根, 返回 (ts_ms, open, high, low, close, volume)"""
+        if not self._size:
+            raise IndexError("pop from empty CandleQueue")
+        head = self._head
+        self._head = (head + 1) % self.capacity
+        self._size -= 1
+        return (int(self.timestamps[head]), *self.values[head].tolist())
+
+    def last_timestamp(self):
+        """最新一根的时间戳, 队列为空时为 None"""
+        if not self._size:
+            return None
+        return int(self.timestamps[(self._head + self._size - 1) % self.capacity])
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def candles(self):
+        """队列中的 K 线 [[ts_ms, open, high, low, close, volume], ...], 按写入顺序, 不出队"""
+        index = (self._head + np.arange(self._size)) % self.capacity
+        return [[ts, *row] for ts, row in zip(self.timestamps[index].tolist(), self.values[index].tolist())]
@@ -0,0 +1,74 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class FeedMetrics:
+    """
+    实盘数据源的指标, 由后台取数线程和 _load 共同更新:
+    队列深度 (当前/最大), 请求次数/失败次数/耗时, K 线收盘到送入策略的延迟, 各来源入队的 K 线数量
+    """
+
+    def __init__(self, clock=time.time):
+        """:param clock: 当前时间 (秒), 与 BarScheduler 相同, 测试时替换为虚拟时钟"""
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.fetch_seconds = 0.0
+        self.fetch_max = 0.0
+        self.fetch_last = None
+        self.queue_depth = 0
+        self.queue_max = 0
+        self.bars = 0
+        self.bar_delay = None
+        self.bar_delay_max = 0.0
+        self.sources = {}
+
+    @contextmanager
+    def fetch(self):
+        """统计一次请求的耗时, 抛出异常时计为失败"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.fetches += 1
+                self.fetch_errors += not ok
+                self.fetch_seconds += seconds
+                self.fetch_max = max(self.fetch_max, seconds)
+                self.fetch_last = seconds
+
+    def enqueued(self, source, count, depth):
+        with self._lock:
+            self.sources[source] = self.sources.get(source, 0) + count
+            self.queue_depth = depth
+            self.queue_max = max(self.queue_max, depth)
+
+    def dequeued(self, close_ms, depth):
+        """:param close_ms: 送入策略的 K 线的收盘时间"""
+        delay = self.clock() - close_ms / 1000
+        with self._lock:
+            self.bars += 1
+            self.queue_depth = depth
+            self.bar_delay = delay
+            self.bar_delay_max = max(self.bar_delay_max, delay)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'queue_max': self.queue_max,
+                'fetches': self.fetches,
+                'fetch_errors': self.fetch_errors,
+                'fetch_mean': self.fetch_seconds / self.fetches if self.fetches else None,
+                'fetch_max': self.fetch_max,
+                'fetch_last': self.fetch_last,
+                'bars': self.bars,
+                'bar_delay': self.bar_delay,
+                'bar_delay_max': self.bar_delay_max,
+                'sources': dict(self.sources),
+            }
@@ -9,6 +9,8 @@ import pytz
 from loguru import logger
 from threading import Lock
 
+from .CandleQueue import CandleQueue
+
 
 class OKXData(bt.DataBase):
     params = (
@@ -19,6 +21,7 @@ class OKXData(bt.DataBase):
         ('debug', False),
         ('fromdate', None),  # 回测开始时间，默认为None
         ('todate', None),    # 回测结束时间，默认为None
+        ('queue_size', 100_000),  # 待消费 K 线队列的容量, 超出时丢弃最旧的
     )
 
     def __init__(self):
@@ -38,7 +41,7 @@ class OKXData(bt.DataBase):
 
         self.data_lock = Lock()  # 锁对象，用于线程安全
         self.has_livedata = False
-        self.ohlcv = []
+        self.ohlcv = CandleQueue(self.p.queue_size)
         self.last_ts = 0
         self.stop_signal = False
         if self.p.online_data:
@@ -58,13 +61,12 @@ class OKXData(bt.DataBase):
             })
             if ohlcvs:
                 with self.data_lock:
-                    for ohlcv in ohlcvs:
-                        tstamp, open_, high, low, close, volume = ohlcv
-                        if tstamp > self.last_ts:
-                            self.ohlcv.append(ohlcv)
-                            self.last_ts = tstamp
-                            self.has_livedata = True
-                            logger.info(f"Fetched new data: {datetime.fromtimestamp(tstamp / 1000).strftime('%Y-%m-%d %H:%M:%S')} ")
+                    fresh = [ohlcv for ohlcv in ohlcvs if ohlcv[0] > self.last_ts]
+                    if fresh:
+                        self.ohlcv.extend(fresh)
+                        self.last_ts = fresh[-1][0]
+                        self.has_livedata = True
+                        logger.info(f"Fetched new data: {datetime.fromtimestamp(self.last_ts / 1000).strftime('%Y-%m-%d %H:%M:%S')} ")
 
         except Exception as e:
             logger.error(f"Error fetching data: {e}")
@@ -102,12 +104,12 @@ class OKXData(bt.DataBase):
                 while current_timestamp < to_timestamp:
                     ohlcvs = self.exchange.fetch_ohlcv(self.p.symbol, self.interval, since=current_timestamp, limit=limit)
                     if ohlcvs:
-                        for ohlcv in ohlcvs:
-                            if ohlcv[0] > self.last_ts:  # 去重
-                                self.ohlcv.append(ohlcv)
-                                self.last_ts = ohlcv[0]
+                        fresh = [ohlcv for ohlcv in ohlcvs if ohlcv[0] > self.last_ts]  # 去重
+                        if fresh:
+                            self.ohlcv.extend(fresh)
+                            self.last_ts = fresh[-1][0]
 
-                        logger.info(f"Fetched historical data point: {datetime.fromtimestamp(ohlcv[0] / 1000).strftime('%Y-%m-%d %H:%M:%S')} limit {len(ohlcvs)}")
+                        logger.info(f"Fetched historical data point: {datetime.fromtimestamp(ohlcvs[-1][0] / 1000).strftime('%Y-%m-%d %H:%M:%S')} limit {len(ohlcvs)}")
                         current_timestamp = ohlcvs[-1][0] + 1  # 更新当前时间戳为最后一个数据点的时间戳+1
                     else:
                         break  # 如果没有更多数据，退出循环
@@ -125,7 +127,7 @@ class OKXData(bt.DataBase):
         while not self.stop_signal:
             if self.haslivedata():
                 with self.data_lock:
-                    candle = self.ohlcv.pop(0)
+                    candle = self.ohlcv.pop()
                     if len(self.ohlcv) == 0:
                         self.has_livedata = False
                     self.lines.datetime[0] = bt.date2num(convert_timestamp_to_china_time(candle[0]/1000))
@@ -151,7 +153,7 @@ class OKXData(bt.DataBase):
         # 定义字段名称
         columns = ['datetime', 'open', 'high', 'low', 'close', 'volume']
         # 创建 DataFrame 并指定列名
-        df = pd.DataFrame(self.ohlcv, columns=columns)
+        df = pd.DataFrame(self.ohlcv.candles(), columns=columns)
         # 保存为 CSV 文件并包含列名
         df['datetime'] = pd.to_datetime(df['datetime'], unit='ms')
         df['openinterest'] = 0 # 新增一列，并且数据都为0
@@ -1,65 +1,428 @@
+import glob
+import math
 import os.path
+import time
 
 import click
 from loguru import logger
 import pandas as pd
 import backtrader as bt
-from analyzer import PositionReturn
+from concurrent.futures import ProcessPoolExecutor
+from analyzer import PositionReturn, RunResult, EquityCurve, Performance
 from strategy import EMA_Crossover, EMA, SMA, Busy
-from .utils import result_handler, COMMA_SEPARATED_LIST, COMMA_SEPARATED_LIST_INT
+from strategy.Oscillation import Oscillation
+from datastore import load_csv, load_timeframe, ResultCache, CsvStream
+from datastore import resultcache, resultfile
+from datastore.resample import parse_timeframe, resample_ohlcv
+from datastore.warehouse import CandleStore, parse_uri
+from engine import run_vector_combos, search
+from engine.search import grid_values, grid_combos
+from engine.walkforward import split_windows, chain_equity, stability_report, warmup_bars
+from indicator import cache as indicator_cache
+import logpolicy
+import profiling
+from .utils import result_row, result_columns, has_run_result, rows_handler, save_rows, stream_result_handler, ResultWriter, \
+    COMMA_SEPARATED_LIST, COMMA_SEPARATED_LIST_INT
 from pathlib import Path
 
-def create_cerebro(filepath, cash, maxcpus):
+def resolve_files(filepath):
+    """--file 可以是单个 csv, 目录 (目录下所有 csv) 或通配符"""
+    if os.path.isdir(filepath):
+        return sorted(glob.glob(os.path.join(filepath, '*.csv')))
+    if glob.has_magic(filepath):
+        return sorted(path for path in glob.glob(filepath) if os.path.isfile(path))
+    return [filepath]
+
+def source_name(filepath):
+    """输出文件名前缀: csv 取文件名, 仓库地址 store:okx:BTC/USDT:1m 为 BTCUSDT_1m_okx"""
+    key = parse_uri(filepath)
+    if key:
+        exchange, symbol, interval = key
+        return f"{symbol.replace('/', '')}_{interval}_{exchange}"
+    return Path(filepath).stem
+
+def load_store(key, timeframe=None):
+    """从本地 K 线仓库读取, 指定 timeframe 时由仓库中的周期合成"""
+    df = CandleStore().read(*key)
+    if timeframe and not df.empty:
+        df = resample_ohlcv(df, parse_timeframe(timeframe))
+    return df, False
+
+def load_dataframe(filepath, data_cache=True, timeframe=None):
+    start = time.perf_counter()
     try:
-        df = pd.read_csv(filepath, index_col='timestamp', parse_dates=True)
+        key = parse_uri(filepath)
+        if key:
+            df, hit = load_store(key, timeframe)
+        elif timeframe:
+            df, hit = load_timeframe(filepath, timeframe, index_col='timestamp', use_cache=data_cache)
+        else:
+            df, hit = load_csv(filepath, index_col='timestamp', use_cache=data_cache)
     except Exception as e:
-        logger.error("f 数据读取出错:{df}")
+        logger.error(f"数据读取出错:{filepath}")
         raise e
+    logger.info(f"load {filepath} {timeframe or ''} rows:{len(df)} cache:{'hit' if hit else 'miss'} "
+                f"用时:{time.perf_counter() - start:.3f}s")
+    return df
+
+def load_frames(filepath, data_cache=True, timeframes=()):
+    """
+    按 --timeframe 的顺序加载各周期数据, 第一个作为主数据 datas[0], 未指定时只有 csv 本身
+    K 线时间戳是周期开始时间, 其它周期的 K 线平移到与它同时收盘的最后一根主数据 K 线上,
+    cerebro 按时间戳同步推进时, 高周期 K 线收盘之后策略才读得到它
+    """
+    if not timeframes:
+        return [load_dataframe(filepath, data_cache)]
+    frames = [load_dataframe(filepath, data_cache, timeframe) for timeframe in timeframes]
+    main = parse_timeframe(timeframes[0])
+    for i, timeframe in enumerate(timeframes[1:], 1):
+        shift = parse_timeframe(timeframe) - main
+        if shift > 0:
+            frames[i] = frames[i].set_axis(frames[i].index + pd.Timedelta(seconds=shift))
+    return frames
 
+def create_cerebro(filepath, cash, maxcpus, data_cache=True, slim=False, timeframes=(), low_memory=False):
+    """:param low_memory: 不预加载, 单一周期时直接按块读取 csv, 各条线只保留策略回看所需的 bar"""
+    if low_memory and not timeframes and parse_uri(filepath) is None:
+        return setup_cerebro([CsvStream(dataname=filepath)], cash, maxcpus, slim, low_memory)
+    df, *extra = load_frames(filepath, data_cache, timeframes)
     if df.empty:
         return
+    return build_cerebro(df, cash, maxcpus, slim, extra, low_memory)
 
-    data = bt.feeds.PandasData(dataname=df)
-    cerebro = bt.Cerebro(runonce=True, preload=True, optreturn=False, maxcpus=maxcpus)
-    cerebro.adddata(data)
+def build_cerebro(df, cash, maxcpus, slim=False, extra=(), low_memory=False):
+    """:param extra: 其它周期的数据, 依次作为 datas[1:]"""
+    feeds = [bt.feeds.PandasData(dataname=frame) for frame in (df, *extra)]
+    return setup_cerebro(feeds, cash, maxcpus, slim, low_memory)
+
+def setup_cerebro(feeds, cash, maxcpus, slim=False, low_memory=False):
+    # slim: 子进程只回传参数和 RunResult, 不再 pickle 完整的策略对象
+    # RunResult 总是添加: maxcpus=1 寻优共用同一个 broker, 结束后读取 broker 只能得到最后一次运行的资产
+    if low_memory:
+        # exactbars=1: 逐 bar 读取数据, 数据和指标的线都是长度为最小周期的环形缓冲区,
+        # 策略 next 中读取更早的 bar 需在 qbuffer 中声明 (data.minbuffer), 见 Oscillation
+        cerebro = bt.Cerebro(exactbars=1, preload=False, runonce=False, optreturn=slim, maxcpus=maxcpus)
+    else:
+        cerebro = bt.Cerebro(runonce=True, preload=True, optreturn=slim, maxcpus=maxcpus)
+    for feed in feeds:
+        cerebro.adddata(feed)
     cerebro.broker.setcash(cash)
-    return cerebro
+    cerebro.addanalyzer(RunResult)
+    cerebro.addanalyzer(Performance)
+    return profiling.attach(cerebro)
+
+def run_combos(cerebro, strategy_cls, combos):
+    """
+    与 optstrategy 相同的寻优流程 (数据只预加载一次, 按 maxcpus 并行),
+    但参数组合由调用方给出, 不做笛卡尔积展开
+    """
+    cerebro.strats = [[(strategy_cls, (), combo) for combo in combos]]
+    cerebro._dooptimize = True
+    return cerebro.run()
+
 
 @click.group()
 @click.pass_context
 @click.option('--cash', default=10000, help='初始投入资金')
 @click.option('--debug', default=True)
-@click.option('--f', '--file', 'filepath', required=True, help="数据文件 csv")
+@click.option('--f', '--file', 'filepath', required=True,
+              help="数据文件 csv, 目录或通配符 (加引号) 时批量回测所有文件; "
+                   "store:交易所:交易对:周期 读取本地 K 线仓库 (candles sync --store)")
 @click.option('-o', '--output', 'output_dir', help="输出目录")
 @click.option('--maxcpus', default=os.cpu_count())
-@click.option('--opt', default=False, is_flag=True, help="参数寻优, 结果输出表格")
-def back_strategy(ctx, cash, debug, filepath, output_dir, maxcpus, opt):
+@click.option('--opt', default=False, is_flag=True, help="参数寻优, 结果按 --format 写入文件")
+@click.option('--format', 'output_format', type=click.Choice(resultfile.FORMATS), default='csv',
+              help="结果文件格式, 按块写入; xlsx 只适合小规模结果 (最多约 100 万行)")
+@click.option('--top', default=10, help="控制台只输出按 --objective 排序的前 N 组结果, 0 不输出")
+@click.option('--engine', type=click.Choice(['backtrader', 'vector']), default='backtrader',
+              help="回测引擎: backtrader 逐 bar 回测 / vector 数组化内核(Busy/EMA/SMA/EMA_Crossover)")
+@click.option('--data_cache/--no-data_cache', default=True, help="csv 首次读取后生成 .npy 列缓存, 之后直接加载")
+@click.option('--timeframe', 'timeframes', multiple=True,
+              help="由 csv 合成的周期 (5m/15m/1h/...), 可重复, 第一个作为策略的主数据, 其余依次作为 datas[1:]; "
+                   "合成结果缓存在 csv 同级的 .cache 目录")
+@click.option('--slim', default=False, is_flag=True, help="寻优结果精简回传并逐行写入 csv, 内存占用不随网格增长")
+@click.option('--low_memory', default=False, is_flag=True,
+              help="低内存模式: 不预加载数据, 按块读取 csv, 只保留策略回看所需的 bar, 结果与默认模式相同; "
+                   "一年 1m 数据单次回测峰值 RSS 约 380MB -> 220MB 且不随数据长度增长; vector 引擎忽略该选项")
+@click.option('--result_cache/--no-result_cache', default=True,
+              help="按 (数据哈希, 策略源码, 参数, 资金) 缓存每组参数的结果, 再次寻优只回测缺失的组合")
+@click.option('--purge_result_cache', default=False, is_flag=True, help="运行前清空结果缓存")
+@click.option('--log_level', '--log-level', 'log_level', default='DEBUG',
+              type=click.Choice(['TRACE', 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], case_sensitive=False),
+              help="日志级别, 关闭的级别在策略热路径中不拼接消息; 寻优子进程沿用该级别")
+@click.option('--quiet', default=False, is_flag=True, help="只输出 ERROR 日志, 等同 --log_level ERROR")
+@click.option('--search', 'search_mode', type=click.Choice(['grid', 'random', 'tpe']), default='grid',
+              help="寻优方式: grid 网格穷举 / random 随机搜索 / tpe 贝叶斯优化, random/tpe 参数可写作区间 lo:hi")
+@click.option('--budget', default=50, help="random/tpe 评估次数")
+@click.option('--seed', default=None, type=int, help="random/tpe 随机种子")
+@click.option('--objective', default='final_value', help="random/tpe 最大化/结果排序的列: final_value, commission, Performance 指标或策略参数")
+def back_strategy(ctx, cash, debug, filepath, output_dir, maxcpus, opt, output_format, top, engine, data_cache,
+                  timeframes, slim, low_memory, result_cache, purge_result_cache, log_level, quiet, search_mode, budget, seed,
+                  objective):
     """策略回测"""
-    ctx.obj = {'cash': cash, 'debug': debug, 'filepath': filepath, 'output_dir': output_dir, 'maxcpus': maxcpus,
-               'opt': opt}
+    # 在创建任何进程池之前设置, fork 出的寻优子进程直接继承
+    logpolicy.configure('ERROR' if quiet else log_level)
+    try:
+        parse_uri(filepath)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--file')
+    files = resolve_files(filepath)
+    if not files:
+        raise click.BadParameter(f"没有找到数据文件: {filepath}", param_hint='--file')
+    for timeframe in timeframes:
+        try:
+            parse_timeframe(timeframe)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--timeframe')
+    if engine == 'vector' and len(timeframes) > 1:
+        raise click.UsageError("vector 引擎只支持单一周期")
+    ctx.obj = {'files': files, 'cash': cash, 'debug': debug, 'filepath': filepath, 'output_dir': output_dir, 'maxcpus': maxcpus,
+               'opt': opt, 'format': output_format, 'top': top, 'engine': engine, 'data_cache': data_cache, 'timeframes': timeframes, 'slim': slim, 'low_memory': low_memory, 'result_cache': result_cache,
+               'search': search_mode,
+               'budget': budget, 'seed': seed, 'objective': objective}
 
+    if purge_result_cache:
+        resultcache.purge()
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
     logger.info(
-        f"params cash:{cash} filepath:{filepath} output_dir:{output_dir} cpus:{maxcpus} opt:{opt} debug:{debug}")
+        f"params cash:{cash} filepath:{filepath} output_dir:{output_dir} cpus:{maxcpus} opt:{opt} format:{output_format} debug:{debug} "
+        f"engine:{engine} data_cache:{data_cache} timeframe:{','.join(timeframes)} slim:{slim} low_memory:{low_memory} result_cache:{result_cache} search:{search_mode} budget:{budget}")
+
+
+def output_options(opts, n_rows):
+    """ResultWriter 的输出参数, 回测开始前检查格式依赖和 xlsx 行数上限"""
+    if opts['opt'] or opts['slim']:
+        try:
+            resultfile.check_format(opts['format'])
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        if opts['format'] == 'xlsx' and n_rows > resultfile.EXCEL_MAX_ROWS:
+            raise click.UsageError(f"{n_rows} 组结果超过 xlsx 上限 {resultfile.EXCEL_MAX_ROWS} 行, "
+                                   f"请使用 --format csv.gz/parquet/sqlite")
+    return {'fmt': opts['format'], 'top': opts['top'], 'objective': opts['objective']}
+
+
+def check_objective(opts, strategy_cls):
+    """回测开始前检查 --objective 是结果行中的列, 避免全部跑完后才在排序时出错"""
+    columns = result_columns(strategy_cls)
+    if opts['objective'] not in columns:
+        raise click.BadParameter(f"{opts['objective']} 不是结果列, 可选 {', '.join(columns)}",
+                                 param_hint='--objective')
+
+
+def run_backtest(ctx, strategy_cls, space, name, warm_specs=()):
+    """
+    按 engine/search 选项运行回测并输出结果
+    :param space: {参数名: 取值列表 或 Range}
+    :param warm_specs: 网格寻优前预热的指标 [(kind, params), ...]
+    """
+    cash = ctx.obj['cash']
+    filepath = ctx.obj['filepath']
+    output_dir = ctx.obj['output_dir']
+    maxcpus = ctx.obj['maxcpus']
+    opt = ctx.obj['opt']
+    engine = ctx.obj['engine']
+    data_cache = ctx.obj['data_cache']
+    slim = ctx.obj['slim']
+    search_mode = ctx.obj['search']
+    timeframes = ctx.obj['timeframes']
+    low_memory = ctx.obj['low_memory']
+    check_objective(ctx.obj, strategy_cls)
+
+    if len(ctx.obj['files']) > 1 or filepath not in ctx.obj['files']:
+        run_batch(ctx, strategy_cls, space, name)
+        return
+
+    data_source = source_name(filepath)
+    filename = f"{data_source}_{name}"
+    if output_dir:
+        filename = os.path.join(output_dir, filename)
+
+    try:
+        if search_mode != 'grid':
+            output = output_options(ctx.obj, ctx.obj['budget'])
+            rows = search_params(ctx, strategy_cls, space)
+            save_rows(rows, f"{filename}_{search_mode}", opt, slim, **output)
+            return
+
+        combos = grid_combos(space)
+        output = output_options(ctx.obj, len(combos))
+        cache = ResultCache(filepath, strategy_cls, cash, timeframes=timeframes, engine=engine) if ctx.obj['result_cache'] else None
+        if engine == 'vector':
+            df, = load_frames(filepath, data_cache, timeframes)
+            evaluate = make_evaluator(strategy_cls, df, cash, maxcpus, engine)
+            rows = cache.wrap(evaluate)(combos) if cache else evaluate(combos)
+            save_rows(rows, filename, opt, slim, **output)
+            return
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    # 缓存中已有的网格点直接合并, 只回测缺失的参数组合
+    cached = cache.get_many(combos) if cache else [None] * len(combos)
+    missing = [combo for combo, row in zip(combos, cached) if row is None]
+    if cache:
+        logger.info(f"result cache hit:{len(combos) - len(missing)} miss:{len(missing)}")
+
+    cerebro = None
+    if missing:
+        cerebro = create_cerebro(filepath, cash, maxcpus, data_cache, slim, timeframes, low_memory)
+        # 子进程 fork 之前预热指标, 所有网格点共享同一份序列; 低内存模式不使用指标缓存
+        if warm_specs and not low_memory:
+            indicator_cache.warm(cerebro.datas[0].p.dataname['close'].to_numpy(), warm_specs)
+
+    if slim:
+        if cerebro:
+            writer = stream_result_handler(cerebro, filename, cache, **output)
+        else:
+            writer = ResultWriter(filename, **output)
+        for row in cached:
+            if row is not None:
+                writer.write(row)
+        if cerebro:
+            run_combos(cerebro, strategy_cls, missing)
+        writer.close()
+        return
+
+    # 运行策略
+    rows = []
+    if cerebro:
+        results = run_combos(cerebro, strategy_cls, missing)
+        strategies = [strategy for result in results for strategy in result]
+        rows = [result_row(strategy) for strategy in strategies]
+        if cache:
+            cache.put_many([row for row, strategy in zip(rows, strategies) if has_run_result(strategy)])
+    fresh = iter(rows)
+    rows_handler([row if row is not None else next(fresh) for row in cached], filename, opt, **output)
+
+
+# 批量回测子进程最近加载的数据, 同一文件的后续任务直接复用
+_batch_frames = {}
+
+
+def batch_job(job):
+    """批量回测的单个任务: 一个文件上的一段参数网格"""
+    strategy_cls, filepath, combos, opts = job
+    if filepath not in _batch_frames:
+        _batch_frames.clear()
+        indicator_cache.clear()
+        _batch_frames[filepath] = load_frames(filepath, opts['data_cache'], opts['timeframes'])
+    df, *extra = _batch_frames[filepath]
+    if df.empty:
+        logger.warning(f"数据为空, 跳过: {filepath}")
+        return []
+    evaluate = make_evaluator(strategy_cls, df, opts['cash'], 1, opts['engine'], extra, opts['low_memory'])
+    if opts['result_cache']:
+        evaluate = ResultCache(filepath, strategy_cls, opts['cash'], timeframes=opts['timeframes'],
+                                   engine=opts['engine']).wrap(evaluate)
+    rows = evaluate(combos)
+    # candles history 输出的文件名为 {symbol}_{interval}_{start}_{end}
+    symbol = Path(filepath).stem.split('_')[0]
+    return [{'file': Path(filepath).name, 'symbol': symbol, **row} for row in rows]
+
+
+def run_batch(ctx, strategy_cls, space, name):
+    """
+    多文件批量回测, (文件 x 参数网格分段) 作为任务提交到同一个进程池, 大文件优先
+    结果汇总为一张表, 带 file/symbol 列
+    """
+    opts = ctx.obj
+    files = opts['files']
+    if opts['search'] != 'grid':
+        raise click.UsageError("批量回测只支持 --search grid")
+    try:
+        combos = grid_combos(space)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    output = output_options(opts, len(files) * len(combos))
+    files = sorted(files, key=os.path.getsize, reverse=True)
+    workers = max(1, min(opts['maxcpus'] or 1, len(files) * len(combos)))
+    # 每个文件的网格切成最多 workers 段, 单个文件也能占满进程池
+    chunk = max(1, math.ceil(len(combos) / workers))
+    jobs = [(strategy_cls, filepath, combos[i:i + chunk], opts) for filepath in files
+            for i in range(0, len(combos), chunk)]
+    logger.info(f"批量回测 {len(files)} 个文件 x {len(combos)} 组参数, {len(jobs)} 个任务 workers:{workers}")
+
+    filename = f"batch_{name}"
+    if opts['output_dir']:
+        filename = os.path.join(opts['output_dir'], filename)
+    if not (opts['opt'] or opts['slim']):
+        output['fmt'] = None
+    writer = ResultWriter(filename, **output)
+
+    start = time.perf_counter()
+    # 每个任务的结果返回后立即按块写盘, 不在内存中汇总整张表
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for job_rows in profiling.pool_map(pool, batch_job, jobs):
+            writer.write_many(job_rows)
+    logger.info(f"批量回测完成 {writer.count} 行 用时:{time.perf_counter() - start:.1f}s")
+    writer.close()
+
+
+def make_evaluator(strategy_cls, df, cash, maxcpus, engine, extra=(), low_memory=False):
+    """evaluate([params, ...]) -> 结果行列表, 供 search 和 walk-forward 寻优使用"""
+    if engine == 'vector':
+        def evaluate(batch):
+            return run_vector_combos(strategy_cls, df, cash, batch)
+    else:
+        cerebro = build_cerebro(df, cash, maxcpus, slim=True, extra=extra, low_memory=low_memory)
+
+        def evaluate(batch):
+            results = run_combos(cerebro, strategy_cls, batch)
+            return [result_row(strategy) for result in results for strategy in result]
+    return evaluate
+
+
+def search_params(ctx, strategy_cls, space):
+    """random/tpe 搜索, 每批 maxcpus 组参数并行评估"""
+    cash = ctx.obj['cash']
+    filepath = ctx.obj['filepath']
+    maxcpus = ctx.obj['maxcpus']
+    data_cache = ctx.obj['data_cache']
+
+    df, *extra = load_frames(filepath, data_cache, ctx.obj['timeframes'])
+    evaluate = make_evaluator(strategy_cls, df, cash, maxcpus, ctx.obj['engine'], extra, ctx.obj['low_memory'])
+    if ctx.obj['result_cache']:
+        evaluate = ResultCache(filepath, strategy_cls, cash, timeframes=ctx.obj['timeframes'],
+                                   engine=ctx.obj['engine']).wrap(evaluate)
+    return search(space, evaluate, ctx.obj['search'], ctx.obj['budget'], batch_size=maxcpus or 1,
+                  objective=ctx.obj['objective'], seed=ctx.obj['seed'])
+
+
+def sma_busy_options(func):
+    for option in reversed([
+        click.option('--short_period', type=COMMA_SEPARATED_LIST_INT, required=True, help="短周期"),
+        click.option('--long_period', type=COMMA_SEPARATED_LIST_INT, required=True, help="长周期"),
+        click.option('--below', type=COMMA_SEPARATED_LIST, required=True, help="低于周期的百分比买入"),
+        click.option("--net_profit", type=COMMA_SEPARATED_LIST, required=True, help="固定收益百分比"),
+        click.option("--stop_loss", type=COMMA_SEPARATED_LIST, required=True, help="风险控制百分比"),
+    ]):
+        func = option(func)
+    return func
+
+
+def oscillation_options(func):
+    for option in reversed([
+        click.option('--boll_period', type=COMMA_SEPARATED_LIST_INT, required=True, help="布林带的周期长度"),
+        click.option('--boll_dev', type=COMMA_SEPARATED_LIST, required=True, help="布林带的标准差倍数"),
+        click.option('--rsi_period', type=COMMA_SEPARATED_LIST_INT, required=True, help="RSI周期"),
+        click.option('--rsi_buy_signal', type=COMMA_SEPARATED_LIST, required=True, help="买入信号"),
+        click.option('--stop_loss', type=COMMA_SEPARATED_LIST, required=True, help="止损百分比"),
+    ]):
+        func = option(func)
+    return func
+
 
 @back_strategy.command()
 @click.pass_context
-@click.option('--short_period', type=COMMA_SEPARATED_LIST_INT, required=True, help="短周期")
-@click.option('--long_period', type=COMMA_SEPARATED_LIST_INT, required=True, help="长周期")
-@click.option('--below', type=COMMA_SEPARATED_LIST, required=True, help="低于周期的百分比买入")
-@click.option("--net_profit", type=COMMA_SEPARATED_LIST, required=True, help="固定收益百分比")
-@click.option("--stop_loss", type=COMMA_SEPARATED_LIST, required=True, help="风险控制百分比")
+@sma_busy_options
 def sma_busy(ctx, short_period, long_period, below, net_profit, stop_loss):
     """
         均线
         上升通道
     """
-    cash = ctx.obj['cash']
-    filepath = ctx.obj['filepath']
-    output_dir = ctx.obj['output_dir']
     maxcpus = ctx.obj['maxcpus']
-    opt = ctx.obj['opt']
 
     logger.info(f"short_period:{short_period}")
     logger.info(f"long_period:{long_period}")
@@ -68,20 +431,198 @@ def sma_busy(ctx, short_period, long_period, below, net_profit, stop_loss):
     logger.info(f"stop_loss:{stop_loss}")
     logger.info(f"maxcpus:{maxcpus}")
 
-    cerebro = create_cerebro(filepath, cash, maxcpus)
-    cerebro.optstrategy(
-        Busy,
+    space = dict(
         short_period=short_period,
         long_period=long_period,
         below=below,
         net_profit=net_profit,
         stop_loss=stop_loss,
     )
-    # 运行策略
-    results = cerebro.run()
-    data_source = Path(filepath).stem
-    filename = f"{data_source}_ema_busy"
+    warm_specs = []
+    if isinstance(short_period, list) and isinstance(long_period, list):
+        warm_specs = [('ema', dict(period=p)) for p in sorted(set(short_period + long_period))]
+    run_backtest(ctx, Busy, space, "ema_busy", warm_specs)
+
+
+@back_strategy.command()
+@click.pass_context
+@oscillation_options
+def oscillation(ctx, boll_period, boll_dev, rsi_period, rsi_buy_signal, stop_loss):
+    """
+        根据RSI买入信号进行买入，在超过布林带上限卖出
+    """
+    logger.info(f"boll_period:{boll_period} boll_dev:{boll_dev} rsi_period:{rsi_period} "
+                f"rsi_buy_signal:{rsi_buy_signal} stop_loss:{stop_loss}")
+
+    space = dict(
+        boll_period=boll_period,
+        boll_dev=boll_dev,
+        rsi_period=rsi_period,
+        rsi_buy_signal=rsi_buy_signal,
+        stop_loss=stop_loss,
+    )
+    warm_specs = []
+    if all(isinstance(v, list) for v in (boll_period, boll_dev, rsi_period)):
+        warm_specs = [('rsi', dict(period=p)) for p in sorted(set(rsi_period))]
+        warm_specs += [('bbands', dict(period=p, devfactor=d)) for p in sorted(set(boll_period))
+                       for d in sorted(set(boll_dev))]
+    run_backtest(ctx, Oscillation, space, "oscillation", warm_specs)
+
+
+def skip_warmup(strategy_cls, warmup):
+    """前 warmup 根只计算指标, 不调用策略的 next (不下单)"""
+    class Warmup(strategy_cls):
+        def next(self):
+            if len(self.data) > warmup:
+                super(Warmup, self).next()
+
+    Warmup.__name__ = Warmup.__qualname__ = strategy_cls.__name__
+    return Warmup
+
+
+def walk_forward_window(job):
+    """
+    单个 walk-forward 窗口: 在样本内寻优, 最优参数在紧随其后的样本外数据上回测
+    样本外数据前补了 warmup 根样本内末尾的 bar 用于指标预热, 从样本外第一根开始交易和记录资金曲线
+    在进程池中运行, 窗口内部单进程寻优
+    """
+    strategy_cls, space, opts, train_frames, test_frames, warmup = job
+    objective = opts['objective']
+    evaluate = make_evaluator(strategy_cls, train_frames[0], opts['cash'], 1, opts['engine'], train_frames[1:],
+                              opts['low_memory'])
+    if opts['search'] == 'grid':
+        rows = evaluate(grid_combos(space))
+    else:
+        rows = search(space, evaluate, opts['search'], opts['budget'], batch_size=1, objective=objective,
+                      seed=opts['seed'])
+    best = max(rows, key=lambda row: row[objective])
+    params = {name: best[name] for name in space}
+
+    cerebro = build_cerebro(test_frames[0], opts['cash'], 1, extra=test_frames[1:], low_memory=opts['low_memory'])
+    cerebro.addstrategy(skip_warmup(strategy_cls, warmup), **params)
+    cerebro.addanalyzer(EquityCurve)
+    strategy = cerebro.run()[0]
+    equity = strategy.analyzers.equitycurve.get_analysis()
+    start = test_frames[0].index[warmup]
+    first = next((i for i, dt in enumerate(equity['datetime']) if dt >= start), len(equity['datetime']))
+    equity = {'datetime': equity['datetime'][first:], 'value': equity['value'][first:]}
+    # 每个窗口的数据都不同, 指标缓存不会被后续窗口复用
+    indicator_cache.clear()
+    return params, best[objective], strategy.analyzers.runresult.get_analysis(), equity
+
+
+def run_walk_forward(ctx, strategy_cls, space, name):
+    """滚动窗口寻优, 各窗口在进程池中并行, 输出样本外明细/资金曲线/参数稳定性"""
+    opts = ctx.obj
+    cash = opts['cash']
+    output_dir = opts['output_dir']
+    objective = opts['objective']
+
+    if len(opts['files']) > 1 or opts['filepath'] not in opts['files']:
+        raise click.UsageError("walk-forward 只支持单个数据文件")
+    check_objective(opts, strategy_cls)
+    df, *extra = load_frames(opts['filepath'], opts['data_cache'], opts['timeframes'])
+    try:
+        if opts['search'] == 'grid':
+            grid_values(space)
+        warmup = warmup_bars(space)
+        windows = split_windows(len(df), opts['train'], opts['test'], opts['step'], warmup)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    filename = f"{source_name(opts['filepath'])}_{name}_wf"
     if output_dir:
         filename = os.path.join(output_dir, filename)
-    result_handler(results, filename, opt)
 
+    def frames(lo, hi):
+        # 窗口按主数据的行切分, 其它周期按同一时间区间截取
+        return [df.iloc[lo:hi]] + [frame.loc[df.index[lo]:df.index[hi - 1]] for frame in extra]
+
+    jobs = [(strategy_cls, space, opts, frames(train_lo, train_hi), frames(test_lo - warmup, test_hi), warmup)
+            for train_lo, train_hi, test_lo, test_hi in windows]
+    workers = max(1, min(opts['maxcpus'] or 1, len(jobs)))
+    logger.info(f"walk-forward {len(windows)} 个窗口 train:{opts['train']} test:{opts['test']} "
+                f"step:{opts['step'] or opts['test']} warmup:{warmup} workers:{workers}")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(profiling.pool_map(pool, walk_forward_window, jobs))
+
+    rows = []
+    curves = []
+    for i, ((train_lo, train_hi, test_lo, test_hi), (params, score, test, equity)) in enumerate(zip(windows, results)):
+        row = {
+            'window': i,
+            'train_start': df.index[train_lo],
+            'train_end': df.index[train_hi - 1],
+            'test_start': df.index[test_lo],
+            'test_end': df.index[test_hi - 1],
+            **params,
+            f'train_{objective}': score,
+            'final_value': test['final_value'],
+            'commission': test['commission'],
+            'return': test['final_value'] / cash - 1,
+        }
+        logger.info(f"{row}")
+        rows.append(row)
+        curves.append((equity['datetime'], equity['value']))
+
+    datetimes, values = chain_equity(curves, cash)
+    stability = stability_report(list(space), [params for params, *_ in results])
+
+    pd.DataFrame(rows).to_csv(f"{filename}.csv", index=False)
+    pd.DataFrame({'datetime': datetimes, 'value': values}).to_csv(f"{filename}_equity.csv", index=False)
+    pd.DataFrame(stability).to_csv(f"{filename}_stability.csv", index=False)
+    for row in stability:
+        logger.info(f"参数稳定性 {row}")
+
+    final_value = values[-1] if values else cash
+    positive = sum(1 for row in rows if row['return'] > 0)
+    logger.info(f"样本外 final_value:{final_value} return:{final_value / cash - 1:.2%} "
+                f"盈利窗口:{positive}/{len(rows)} 用时:{time.perf_counter() - start:.1f}s")
+    logger.info(f"save to {filename}.csv / {filename}_equity.csv / {filename}_stability.csv")
+
+
+@back_strategy.group()
+@click.pass_context
+@click.option('--train', required=True, type=int, help="样本内 (寻优) bar 数, 不能小于最大指标周期")
+@click.option('--test', required=True, type=int,
+              help="样本外 (验证) bar 数; 回测时向前补最大指标周期根样本内的 bar 预热, 只从样本外第一根开始计分")
+@click.option('--step', default=None, type=click.IntRange(min=1),
+              help="窗口滚动 bar 数, 默认等于 --test; 小于 --test 时窗口重叠, 资金曲线每个窗口只取到下一个窗口开始")
+def walk_forward(ctx, train, test, step):
+    """
+        滚动窗口寻优: 样本内寻优, 样本外验证
+        各窗口在 --maxcpus 个进程中并行
+    """
+    ctx.obj.update(train=train, test=test, step=step)
+
+
+@walk_forward.command('sma-busy')
+@click.pass_context
+@sma_busy_options
+def walk_forward_sma_busy(ctx, short_period, long_period, below, net_profit, stop_loss):
+    """均线 上升通道"""
+    space = dict(
+        short_period=short_period,
+        long_period=long_period,
+        below=below,
+        net_profit=net_profit,
+        stop_loss=stop_loss,
+    )
+    run_walk_forward(ctx, Busy, space, "ema_busy")
+
+
+@walk_forward.command('oscillation')
+@click.pass_context
+@oscillation_options
+def walk_forward_oscillation(ctx, boll_period, boll_dev, rsi_period, rsi_buy_signal, stop_loss):
+    """根据RSI买入信号进行买入，在超过布林带上限卖出"""
+    space = dict(
+        boll_period=boll_period,
+        boll_dev=boll_dev,
+        rsi_period=rsi_period,
+        rsi_buy_signal=rsi_buy_signal,
+        stop_loss=stop_loss,
+    )
+    run_walk_forward(ctx, Oscillation, space, "oscillation")
@@ -1,13 +1,25 @@
 import os.path
 import sys
+import time
 
 import click
 from broker import CCXTData
+from datastore.candlesync import CandleSync, sync_path
+from datastore.resample import parse_timeframe
+from datastore.warehouse import CandleStore, exchange_key
 import pandas as pd
 from loguru import logger
 import re
 
 
+def check_interval(ctx, param, value):
+    try:
+        parse_timeframe(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    return value
+
+
 @click.group()
 @click.pass_context
 def candles(ctx):
@@ -18,12 +30,15 @@ def candles(ctx):
 @click.option('--sandbox', default=True, is_flag=True,  help='模拟盘/实盘')
 @click.option('--exchange_id', required=True, help='交易所ID')
 @click.option('--symbol', default='BTC/USDT', help='交易对 BTC/USDT')
-@click.option('--interval', default='1m', help='交易间隔，查看okx candles参数 1m/3m/5m/....')
+@click.option('--interval', default='1m', callback=check_interval,
+              help='交易间隔，查看okx candles参数 1m/3m/5m/1H/1D/1W...., 不支持月线 1M')
 @click.option('--start', default='2023-01-01 00:00:00', help='2023-01-01 00:00:00')
 @click.option('--end', default='2023-01-02 00:00:00', help='2023-01-02 00:00:00')
 @click.option('--output', default='', help='输出文件存放位置')
-def history(sandbox, exchange_id, symbol, interval, start, end, output):
-    """获取历史数据"""
+@click.option('--workers', default=8, help='并发请求数, 区间按时间分段并发下载')
+@click.option('--rate', default=None, type=float, help='所有并发请求共享的每秒请求数上限, 默认取交易所的限速')
+def history(sandbox, exchange_id, symbol, interval, start, end, output, workers, rate):
+    """获取历史数据 [start, end)"""
     start = pd.to_datetime(start)
     end = pd.to_datetime(end)
     okx_data = CCXTData(
@@ -39,7 +54,41 @@ def history(sandbox, exchange_id, symbol, interval, start, end, output):
     if output:
         os.makedirs(output, exist_ok=True)
         filename = os.path.join(output, filename)
-    okx_data.save_to_csv(fromdate=start, todate=end, path=filename)
+    okx_data.save_to_csv(fromdate=start, todate=end, path=filename, workers=workers, rate=rate)
+
+
+@candles.command()
+@click.option('--sandbox/--mainnet', default=True, help='模拟盘/实盘')
+@click.option('--exchange_id', required=True, help='交易所ID')
+@click.option('--symbol', default='BTC/USDT', help='交易对 BTC/USDT')
+@click.option('--interval', default='1m', callback=check_interval,
+              help='交易间隔，查看okx candles参数 1m/3m/5m/1H/1D/1W...., 不支持月线 1M')
+@click.option('--start', default='2023-01-01 00:00:00', help='2023-01-01 00:00:00')
+@click.option('--end', default=None, help='默认到当前时间')
+@click.option('--output', default='', help='输出文件存放位置')
+@click.option('--workers', default=8, help='并发请求数')
+@click.option('--rate', default=None, type=float, help='所有并发请求共享的每秒请求数上限, 默认取交易所的限速')
+@click.option('--store', default=False, is_flag=True,
+              help='写入本地 K 线仓库而不是 csv, 回测通过 --f store:交易所:交易对:周期 读取 (模拟盘的交易所名为 okx-testnet)')
+def sync(sandbox, exchange_id, symbol, interval, start, end, output, workers, rate, store):
+    """增量同步历史数据: 每个 (交易所, 交易对, 周期) 一个 csv, 只下载缺失的区间 (含文件内部的断档), 中断后可继续"""
+    since = int(pd.to_datetime(start).timestamp() * 1000)
+    until = int(pd.to_datetime(end).timestamp() * 1000) if end else int(time.time() * 1000)
+    if until <= since:
+        raise click.BadParameter("结束时间需大于开始时间", param_hint='--end')
+    data = CCXTData(
+        sandbox=sandbox,
+        symbol=symbol,
+        interval=interval,
+        exchange_id=exchange_id,
+    )
+    if store:
+        CandleStore().sync(data.downloader(workers, rate), exchange_key(exchange_id, sandbox), since, until)
+        return
+    if output:
+        os.makedirs(output, exist_ok=True)
+    path = sync_path(output, exchange_id, symbol, interval, sandbox)
+    CandleSync(path, data.downloader(workers, rate)).run(since, until)
 
 
 def clean_filename(filename):
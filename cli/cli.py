@@ -2,14 +2,22 @@ import os.path
 import sys
 
 import click
+from profiling import ProfileSession
 from .candles import candles
 from .live_trading import live_trading
 from .back_strategy import back_strategy
 
 
 @click.group()
-def cli():
-    pass
+@click.pass_context
+@click.option('--profile', default=False, is_flag=True,
+              help="性能分析: cProfile、调用栈采样 (flamegraph) 和策略/broker/数据源回调计时")
+@click.option('--profile_output', default='profile', help="性能分析输出文件前缀")
+def cli(ctx, profile, profile_output):
+    if profile:
+        session = ProfileSession(profile_output)
+        session.start()
+        ctx.call_on_close(session.stop)
 
 
 cli.add_command(candles, "candles")
@@ -5,12 +5,16 @@ import sys
 import backtrader as bt
 import click
 import toml
-from analyzer import PositionReturn, OKXLiveTradeAnalyzer
+from analyzer import PositionReturn, OKXLiveTradeAnalyzer, LiveFeedMetrics
+import profiling
 from loguru import logger
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from model.TradeModel import Base
 from broker import CCXTBroker, CCXTData
+from broker.CCXTStreamData import CCXTStreamData, STREAM_EXCHANGES
+from datastore import CandleStore
+from datastore.resample import parse_timeframe
 from strategy import Busy
 from strategy.Oscillation import Oscillation
 import signal
@@ -19,9 +23,25 @@ from .utils import COMMA_SEPARATED_LIST, COMMA_SEPARATED_LIST_INT
 @click.group()
 @click.pass_context
 @click.option('--config', "-c", "config", type=click.File('r'), required=True, help='Path to the configuration file.')
-def live_trading(ctx, config):
+@click.option('--store', default=False, is_flag=True,
+              help="预热数据优先读取本地 K 线仓库, 只请求缺失的部分; 运行中收盘的 K 线写回仓库")
+@click.option('--stream', default=False, is_flag=True,
+              help="通过 websocket 订阅 K 线 (okx candle 频道), 收盘即送入策略; 断线期间用 REST 补齐")
+@click.option('--ws_url', default=None, help="websocket 地址, 默认为 okx 的地址; 离线测试时指向 benchmark.fakestream")
+def live_trading(ctx, config, store, stream, ws_url):
     """实盘交易"""
     ctx.obj = toml.load(config)
+    if stream and ctx.obj['API']['id'] not in STREAM_EXCHANGES:
+        # 推送协议、地址和 instId 都是 okx 的, 其它交易所会用 okx 的行情交易
+        raise click.BadParameter(f"websocket 行情只支持 {', '.join(STREAM_EXCHANGES)}, "
+                                 f"当前交易所为 {ctx.obj['API']['id']}", param_hint='--stream')
+    try:
+        parse_timeframe(ctx.obj['TRADE']['interval'])
+    except ValueError as e:
+        raise click.BadParameter(f"[TRADE] interval: {e}", param_hint='--config')
+    ctx.obj['store'] = CandleStore() if store else None
+    ctx.obj['stream'] = stream
+    ctx.obj['ws_url'] = ws_url
     # print(ctx.obj['LOG']['level'])
     logger.add(ctx.obj['LOG']['path'], level='DEBUG', format="{time} {level} {message}")
 
@@ -34,22 +54,23 @@ def init_broker(args, limit):
     symbol = args['TRADE']['symbol']
     interval = args['TRADE']['interval']
     cash = args['TRADE']['cash']
-    cerebro = bt.Cerebro()
-    datasource = create_free_data(symbol, interval, sandbox, exchange_id, limit)
+    cerebro = profiling.attach(bt.Cerebro())
+    datasource = create_free_data(symbol, interval, sandbox, exchange_id, limit, args['store'], args['stream'],
+                                  args['ws_url'])
     broker = create_broker(apikey=apikey, secret=secret, password=password, symbol=symbol, cash=cash, exchange_id=exchange_id,
                            sandbox=sandbox)
 
     cerebro.adddata(datasource)
     cerebro.setbroker(broker)
+    cerebro.addanalyzer(LiveFeedMetrics)
     return cerebro
 
-def create_free_data(symbol, interval, sandbox, exchange_id, limit=0):
-    data = CCXTData(
-        sandbox=sandbox,
-        symbol=symbol,
-        interval=interval,
-        exchange_id=exchange_id,
-    )
+def create_free_data(symbol, interval, sandbox, exchange_id, limit=0, store=None, stream=False, ws_url=None):
+    options = dict(sandbox=sandbox, symbol=symbol, interval=interval, exchange_id=exchange_id, store=store)
+    if stream:
+        data = CCXTStreamData(ws_url=ws_url, **options)
+    else:
+        data = CCXTData(**options)
     if limit != 0:
         data.pre_fetch_data(limit)
     return data
@@ -97,13 +118,15 @@ def sma_busy(ctx, short_period, long_period, below, net_profit, stop_loss):
 
     # db_path = ctx.obj['DATABASE']['path']
     # session = create_database(db_path)
-    data = create_free_data(symbol, interval, sandbox, id, limit=max(short_period, long_period))
+    data = create_free_data(symbol, interval, sandbox, id, limit=max(short_period, long_period), store=ctx.obj['store'],
+                            stream=ctx.obj['stream'], ws_url=ctx.obj['ws_url'])
     broker = create_broker(apikey=apikey, secret=secret, password=password, symbol=symbol, cash=cash, exchange_id=id,
                            sandbox=sandbox)
-    cerebro = bt.Cerebro()
+    cerebro = profiling.attach(bt.Cerebro())
     cerebro.adddata(data)
     cerebro.broker.setcash(cash)
     # cerebro.addanalyzer(OKXLiveTradeAnalyzer, db=session)
+    cerebro.addanalyzer(LiveFeedMetrics)
     cerebro.setbroker(broker)
     cerebro.addstrategy(
         Busy,
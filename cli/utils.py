@@ -1,60 +1,171 @@
+import heapq
 import os.path
 import sys
 
 import click
 from loguru import logger
 import pandas as pd
+from analyzer import RunResult, Performance
+from analyzer.Performance import METRICS
+from datastore.resultfile import open_sink
+from engine.search import Range
 
 
 
-def result_handler(results, strategy_name, opt):
-    # 准备存储结果的列表
-    results_list = []
+def has_run_result(strategy):
+    """
+    结果行是否来自 RunResult; 没有时 result_row 回退读取 broker, maxcpus=1 寻优共用同一个 broker,
+    读到的是最后一次运行的资产, 这样的行不能写入结果缓存
+    """
+    return any(isinstance(analyzer, RunResult) for analyzer in strategy.analyzers)
 
+
+def result_columns(strategy_cls):
+    """结果行中的列: 策略参数, RunResult 和 Performance 的指标, 可作为 --objective"""
+    return [*strategy_cls.params._getkeys(), *RunResult.COLUMNS, *METRICS]
+
+
+def result_row(strategy):
+    """单组参数的结果行, strategy 可以是完整的策略对象, 也可以是 optreturn 返回的 OptReturn"""
+    # 获取策略参数
+    params = {k: v for k, v in strategy.params.__dict__.items() if not k.startswith('_')}
+    analyses = {type(analyzer): analyzer.get_analysis() for analyzer in strategy.analyzers}
+    # 风险收益指标作为额外的列
+    metrics = analyses.get(Performance, {})
+    if RunResult in analyses:
+        return {**params, **analyses[RunResult], **metrics}
+
+    # 获取最终投资组合值
+    final_value = strategy.broker.getvalue()
+    commission = strategy.commission
+    return {
+        **params,
+        'final_value': final_value,
+        "commission": commission,
+        **metrics,
+    }
+
+
+def result_handler(results, strategy_name, opt, **output):
     # 打印优化结果并存储在列表中
-    for result in results:
-        for strategy in result:
-            # 获取策略参数
-            params = {k: v for k, v in strategy.params.__dict__.items() if not k.startswith('_')}
-
-            # 获取最终投资组合值
-            final_value = strategy.broker.getvalue()
-            commission = strategy.commission
-            # 存储结果
-            results_list.append({
-                **params,
-                'final_value': final_value,
-                "commission": commission
-            })
-    for row in results_list:
-        print(f"{row}")
-    results_df = pd.DataFrame(results_list)
-    if opt:
-        strategy_name = str.replace(strategy_name, " ", "_")
-        save_path = f"{strategy_name}.xlsx"
-        results_df.to_excel(save_path, index=False)
-        logger.info(f"save to {save_path}")
+    results_list = [result_row(strategy) for result in results for strategy in result]
+    rows_handler(results_list, strategy_name, opt, **output)
+
+
+class ResultWriter:
+    """
+    寻优结果按块写入文件, 每块完成后立即落盘, 控制台只输出按 objective 排序的前 top 行
+    :param fmt: 输出格式, 见 datastore.resultfile.FORMATS, None 时不写文件
+    """
+
+    def __init__(self, strategy_name, cerebro=None, cache=None, fmt='csv', top=10, objective='final_value',
+                 chunk_size=1000):
+        self.prefix = str.replace(strategy_name, " ", "_")
+        self.cerebro = cerebro
+        self.cache = cache
+        self.fmt = fmt
+        self.top = top
+        self.objective = objective
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.path = None
+        self._sink = None
+        self._chunk = []
+        self._best = []
+
+    def __call__(self, result):
+        """作为 cerebro.optcallback, 每个子进程结果返回后调用"""
+        rows = [result_row(strategy) for strategy in result]
+        self.write_many(rows)
+        if self.cache is not None:
+            self.cache.put_many([row for row, strategy in zip(rows, result) if has_run_result(strategy)])
+        # cerebro 会把每个结果追加到 runstrats, 写盘后即丢弃, 内存占用不随网格增长
+        if self.cerebro is not None:
+            self.cerebro.runstrats.clear()
+
+    def __getstate__(self):
+        # optcallback 会随 cerebro 一起 pickle 给子进程, 子进程不需要文件句柄
+        state = self.__dict__.copy()
+        state.update(cerebro=None, _sink=None, _chunk=[], _best=[])
+        return state
+
+    def write(self, row):
+        if self.top:
+            # 小顶堆只保留前 top 行, 取值相同时保留先到的行, 也避免比较 dict
+            item = (row[self.objective], -self.count, row)
+            if len(self._best) < self.top:
+                heapq.heappush(self._best, item)
+            else:
+                heapq.heappushpop(self._best, item)
+        self.count += 1
+        if self.fmt:
+            self._chunk.append(row)
+            if len(self._chunk) >= self.chunk_size:
+                self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self._chunk:
+            return
+        if self._sink is None:
+            self._sink, self.path = open_sink(self.prefix, self.fmt)
+        self._sink.write(self._chunk)
+        self._chunk = []
+
+    def close(self):
+        self.flush()
+        if self._sink:
+            self._sink.close()
+        if self._best:
+            best = [row for _, _, row in sorted(self._best, key=lambda item: item[:2], reverse=True)]
+            print(f"top {len(best)}/{self.count} by {self.objective}:")
+            print(pd.DataFrame(best).to_string(index=False))
+        if self.path:
+            logger.info(f"save {self.count} rows to {self.path}")
+
+
+def stream_result_handler(cerebro, strategy_name, cache=None, **output):
+    """注册 optcallback, 每个子进程结果返回后按块写盘"""
+    writer = ResultWriter(strategy_name, cerebro, cache, **output)
+    cerebro.optcallback(writer)
+    return writer
+
+
+def rows_handler(results_list, strategy_name, opt, fmt='csv', **output):
+    """输出已在内存中的结果行, opt 时写入 fmt 格式的文件"""
+    writer = ResultWriter(strategy_name, fmt=fmt if opt else None, **output)
+    writer.write_many(results_list)
+    writer.close()
+
+
+def save_rows(results_list, strategy_name, opt, slim, **output):
+    """slim 模式总是写文件, 与流式写入保持一致"""
+    rows_handler(results_list, strategy_name, opt or slim, **output)
 
 class CommaSeparatedList(click.ParamType):
     name = "comma_separated_list"
+    cast = float
 
     def convert(self, value, param, ctx):
+        if isinstance(value, (list, Range)):
+            return value
         try:
-            return [float(x) for x in value.split(",")]
+            # lo:hi 表示区间, 用于 random/tpe 搜索
+            if ":" in value:
+                lo, hi = value.split(":")
+                return Range(self.cast(lo), self.cast(hi), integer=self.cast is int)
+            return [self.cast(x) for x in value.split(",")]
         except ValueError:
-            self.fail(f"{value} is not a valid comma-separated list", param, ctx)
+            self.fail(f"{value} is not a valid comma-separated list or lo:hi range", param, ctx)
 
-class CommaSeparatedListInt(click.ParamType):
+class CommaSeparatedListInt(CommaSeparatedList):
     name = "comma_separated_list"
-
-    def convert(self, value, param, ctx):
-        try:
-            return [int(x) for x in value.split(",")]
-        except ValueError:
-            self.fail(f"{value} is not a valid comma-separated list", param, ctx)
+    cast = int
 
 
 
 COMMA_SEPARATED_LIST = CommaSeparatedList()
-COMMA_SEPARATED_LIST_INT = CommaSeparatedListInt()
-
+COMMA_SEPARATED_LIST_INT = CommaSeparatedListInt()
\ No newline at end of file
@@ -0,0 +1,4 @@
+from .csvcache import load_csv, load_timeframe
+from .resultcache import ResultCache
+from .stream import CsvStream
+from .warehouse import CandleStore
@@ -0,0 +1,225 @@
+import io
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+COLUMNS = ['datetime', 'open', 'high', 'low', 'close', 'volume', 'openinterest']
+
+
+def candle_frame(candles):
+    """ccxt K 线 [[ts_ms, open, high, low, close, volume], ...] -> candles history 的 csv 格式 (本地时间)"""
+    df = pd.DataFrame(candles, columns=COLUMNS[:6])
+    df['datetime'] = [datetime.fromtimestamp(ts / 1000) for ts in df['datetime']]
+    df['openinterest'] = 0 # 新增一列，并且数据都为0
+    return df
+
+
+def to_milliseconds(values):
+    """candle_frame 写出的本地时间 -> 毫秒时间戳"""
+    return np.array([round(ts.timestamp() * 1000) for ts in pd.to_datetime(pd.Series(values)).dt.to_pydatetime()],
+                    dtype=np.int64)
+
+
+def sync_path(directory, exchange_id, symbol, interval, sandbox):
+    """(exchange, symbol, interval) 对应的本地文件, 例如 BTCUSDT_1m_okx_mainnet.csv"""
+    name = f"{symbol.replace('/', '')}_{interval}_{exchange_id}_{'testnet' if sandbox else 'mainnet'}.csv"
+    return os.path.join(directory, name) if directory else name
+
+
+def _subtract(ranges, holes):
+    """从升序且互不重叠的 ranges 中去掉 holes 覆盖的部分"""
+    result = []
+    holes = sorted(holes)
+    for lo, hi in ranges:
+        for hole_lo, hole_hi in holes:
+            if hole_hi <= lo or hole_lo >= hi:
+                continue
+            if hole_lo > lo:
+                result.append((lo, hole_lo))
+            lo = max(lo, hole_hi)
+            if lo >= hi:
+                break
+        if lo < hi:
+            result.append((lo, hi))
+    return result
+
+
+def _union(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def missing_ranges(timestamps, since, until, step, known_empty=()):
+    """
+    [since, until) 内缺失 K 线的区间 [(lo, hi), ...]: 已有数据之前/之后的部分以及内部的断档,
+    已确认交易所没有数据的区间 known_empty 除外
+    :param timestamps: 已有 K 线的毫秒时间戳, 升序
+    """
+    lo = -(-since // step) * step
+    if lo >= until:
+        return []
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    inside = timestamps[(timestamps >= lo) & (timestamps < until)]
+    # 相邻两根之间超过一个周期即为断档, 首尾分别与 lo - step 和 until 比较
+    edges = np.concatenate([[lo - step], inside, [until]])
+    gaps = np.flatnonzero(np.diff(edges) > step)
+    ranges = [(int(edges[i]) + step, int(edges[i + 1])) for i in gaps]
+    return _subtract(ranges, known_empty)
+
+
+def closed_candles(candles, step, now):
+    """只保留已收盘的 K 线 (开始时间 + 周期 <= now), 正在生成的最后一根 OHLCV 还会变化, 写入后之后的同步不会再替换"""
+    return [candle for candle in candles if candle[0] + step <= now]
+
+
+def closed_empty_ranges(timestamps, since, until, step, known_empty, now):
+    """
+    下载后仍然缺失且已收盘的区间, 即交易所没有数据的区间 (维护/上线之前)
+    最近一根 K 线可能尚未生成, 不计入
+    """
+    closed = (now // step - 1) * step
+    return [(lo, min(hi, closed)) for lo, hi in missing_ranges(timestamps, since, until, step, known_empty)
+            if lo < closed]
+
+
+class CandleSync:
+    """
+    增量同步本地 K 线文件: 每次只下载 [since, until) 中缺失的区间 (含文件内部的断档)
+
+    下载的分段按时间顺序追加到 {path}.part 并 fsync, 中断后重新运行时 .part 中完整的行视为已下载;
+    全部完成后与原文件合并写入临时文件再 os.replace, 原文件始终是完整的旧版本或新版本.
+    交易所确认没有数据的已收盘区间 (例如维护) 记录在 {path}.sync.json, 之后不再请求.
+    """
+
+    def __init__(self, path, downloader):
+        """
+        :param path: 本地 csv, 格式与 candles history 相同
+        :param downloader: broker.CandleDownloader
+        """
+        self.path = path
+        self.journal = f"{path}.part"
+        self.state_path = f"{path}.sync.json"
+        self.downloader = downloader
+        self.step = downloader.step
+
+    def _read_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'empty': []}
+
+    def _write_state(self, state):
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _read_journal(self):
+        """.part 中完整的行, 中断时写了一半的最后一行丢弃"""
+        try:
+            with open(self.journal) as f:
+                lines = f.readlines()
+        except OSError:
+            return ''
+        if lines and not lines[-1].endswith('\n'):
+            lines.pop()
+        return ''.join(lines)
+
+    @staticmethod
+    def _parse(text):
+        return pd.read_csv(io.StringIO(text), names=COLUMNS, parse_dates=['datetime'], float_precision='round_trip')
+
+    def _existing_timestamps(self):
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=np.int64)
+        return to_milliseconds(pd.read_csv(self.path, usecols=['datetime'])['datetime'])
+
+    def run(self, since, until):
+        """
+        同步 [since, until) (毫秒时间戳), 返回新增的 K 线数量; until 最晚到最后一根已收盘的 K 线
+        """
+        now = int(time.time() * 1000)
+        until = min(until, now // self.step * self.step)
+        existing = self._existing_timestamps()
+        journal = self._read_journal()
+        if os.path.exists(self.journal):
+            # 截掉写了一半的最后一行, 之后在其后追加
+            os.truncate(self.journal, len(journal.encode()))
+        resumed = to_milliseconds(self._parse(journal)['datetime']) if journal else np.empty(0, dtype=np.int64)
+        if len(resumed):
+            logger.info(f"从 {self.journal} 恢复 {len(resumed)} 根已下载的 K 线")
+
+        state = self._read_state()
+        known_empty = [tuple(r) for r in state['empty']]
+        known = np.union1d(existing, resumed)
+        ranges = missing_ranges(known, since, until, self.step, known_empty)
+        logger.info(f"{self.path} 已有 {len(existing)} 根, 缺失 {len(ranges)} 个区间")
+
+        fetched = []
+        with open(self.journal, 'a') as f:
+            for candles in self.downloader.iter_ranges(ranges):
+                # okx 的 1D 等周期按 UTC+8 划分, 按 step 取整后仍可能包含未收盘的一根
+                candles = closed_candles(candles, self.step, now)
+                if not candles:
+                    continue
+                f.write(candle_frame(candles).to_csv(header=False, index=False))
+                f.flush()
+                os.fsync(f.fileno())
+                fetched.append(np.fromiter((candle[0] for candle in candles), dtype=np.int64, count=len(candles)))
+
+        known = np.union1d(known, np.concatenate(fetched)) if fetched else known
+        empty = closed_empty_ranges(known, since, until, self.step, known_empty, now)
+        if empty:
+            logger.warning(f"交易所没有数据的区间 {len(empty)} 个, 之后同步跳过")
+            state['empty'] = [list(r) for r in _union(known_empty + empty)]
+            self._write_state(state)
+
+        added = len(known) - len(existing)
+        self._commit(existing)
+        logger.info(f"同步完成 {self.path} 新增 {added} 根 K 线")
+        return added
+
+    def _commit(self, existing):
+        journal = self._read_journal()
+        if not journal:
+            if os.path.exists(self.journal):
+                os.remove(self.journal)
+            return
+        tmp = f"{self.path}.tmp"
+        added = self._parse(journal)
+        timestamps = to_milliseconds(added['datetime'])
+        ordered = bool(np.all(np.diff(timestamps) > 0))
+        if ordered and not len(existing):
+            with open(tmp, 'w') as f:
+                f.write(','.join(COLUMNS) + '\n' + journal)
+        elif ordered and timestamps[0] > existing.max():
+            # 新数据都在已有数据之后: 复制原文件再追加, 不需要解析整个文件
+            shutil.copyfile(self.path, tmp)
+            with open(tmp, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+                f.write(journal.encode())
+        else:
+            # 补齐文件内部的断档, 或恢复的 .part 与本次下载的区间交错
+            frames = [added]
+            if len(existing):
+                frames.insert(0, pd.read_csv(self.path, parse_dates=['datetime'], float_precision='round_trip'))
+            df = pd.concat(frames).drop_duplicates('datetime').sort_values('datetime', kind='stable')
+            df.to_csv(tmp, index=False)
+        with open(tmp, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        os.remove(self.journal)
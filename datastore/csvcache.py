@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .resample import parse_timeframe, resample_ohlcv
+
+CACHE_VERSION = 2  # 2: 合成周期按开始时间标记, 周线从周一开始, 丢弃首尾不完整的分组
+META_FILE = "meta.json"
+
+
+def sidecar_dir(filepath):
+    """缓存目录与 csv 同级: data.csv -> data.csv.cache/"""
+    return f"{filepath}.cache"
+
+
+def file_hash(filepath, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_hash(filepath):
+    """csv 内容哈希, .npy 缓存仍然有效时直接取 meta 中记录的哈希"""
+    meta = _read_meta(sidecar_dir(filepath))
+    if meta:
+        stat = os.stat(filepath)
+        source = meta['source']
+        if source['size'] == stat.st_size and source['mtime_ns'] == stat.st_mtime_ns:
+            return source['hash']
+    return file_hash(filepath)
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _is_fresh(filepath, meta, cache_dir=None):
+    """mtime 和大小一致直接命中; mtime 变化但内容哈希一致也算命中 (例如文件被复制/touch)"""
+    stat = os.stat(filepath)
+    source = meta['source']
+    if source['size'] != stat.st_size:
+        return False
+    if source['mtime_ns'] == stat.st_mtime_ns:
+        return True
+    if source['hash'] != file_hash(filepath):
+        return False
+
+    source['mtime_ns'] = stat.st_mtime_ns
+    _write_json(os.path.join(cache_dir or sidecar_dir(filepath), META_FILE), meta)
+    return True
+
+
+def _write_json(path, obj):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _load_sidecar(cache_dir, meta):
+    index = np.load(os.path.join(cache_dir, meta['index']['file']))
+    data = {col['name']: np.load(os.path.join(cache_dir, col['file'])) for col in meta['columns']}
+    return pd.DataFrame(data, index=pd.DatetimeIndex(index, name=meta['index']['name']))
+
+
+def _cacheable(df):
+    if not isinstance(df.index, pd.DatetimeIndex) or df.index.tz is not None:
+        return False
+    return all(dtype.kind in 'biuf' for dtype in df.dtypes)
+
+
+def _write_sidecar(filepath, df, cache_dir=None, source=None):
+    cache_dir = cache_dir or sidecar_dir(filepath)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 先删除 meta, 写入过程中断时缓存视为失效
+    meta_path = os.path.join(cache_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    stat = os.stat(filepath)
+    meta = {
+        'version': CACHE_VERSION,
+        'source': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': source or file_hash(filepath)},
+        'index': {'name': df.index.name, 'dtype': str(df.index.dtype), 'file': 'index.npy'},
+        'columns': [],
+    }
+    np.save(os.path.join(cache_dir, 'index.npy'), df.index.to_numpy())
+    for i, name in enumerate(df.columns):
+        column = df[name].to_numpy()
+        filename = f"col{i}.npy"
+        np.save(os.path.join(cache_dir, filename), column)
+        meta['columns'].append({'name': name, 'dtype': str(column.dtype), 'file': filename})
+    _write_json(meta_path, meta)
+
+
+def load_csv(filepath, index_col='timestamp', use_cache=True):
+    """
+    读取行情 csv, 首次读取后在同级目录生成按列存储的 .npy 缓存, 之后直接加载缓存
+    缓存通过源文件的 mtime/大小/内容哈希校验, 源文件变化时自动重建
+    :return: (DataFrame, 是否命中缓存)
+    """
+    cache_dir = sidecar_dir(filepath)
+    if use_cache:
+        meta = _read_meta(cache_dir)
+        if meta and meta['index']['name'] == index_col and _is_fresh(filepath, meta):
+            try:
+                return _load_sidecar(cache_dir, meta), True
+            except (OSError, ValueError) as e:
+                logger.warning(f"缓存读取失败, 重新解析 csv: {cache_dir} {e}")
+
+    df = pd.read_csv(filepath, index_col=index_col, parse_dates=True)
+    if use_cache and _cacheable(df):
+        try:
+            _write_sidecar(filepath, df)
+        except OSError as e:
+            logger.warning(f"缓存写入失败: {cache_dir} {e}")
+    return df, False
+
+
+def load_timeframe(filepath, timeframe, index_col='timestamp', use_cache=True):
+    """
+    读取行情 csv 并合成为 timeframe 周期, 合成结果缓存在 data.csv.cache/{秒数}s/, 与 csv 缓存使用相同的校验
+    timeframe 与 csv 本身的周期相同时直接返回 load_csv 的结果
+    :return: (DataFrame, 是否命中缓存)
+    """
+    seconds = parse_timeframe(timeframe)
+    cache_dir = os.path.join(sidecar_dir(filepath), f"{seconds}s")
+    if use_cache:
+        meta = _read_meta(cache_dir)
+        if meta and meta['index']['name'] == index_col and _is_fresh(filepath, meta, cache_dir):
+            try:
+                return _load_sidecar(cache_dir, meta), True
+            except (OSError, ValueError) as e:
+                logger.warning(f"缓存读取失败, 重新合成: {cache_dir} {e}")
+
+    df, hit = load_csv(filepath, index_col, use_cache)
+    derived = resample_ohlcv(df, seconds)
+    if derived is df:
+        return df, hit
+    if use_cache and _cacheable(derived):
+        try:
+            _write_sidecar(filepath, derived, cache_dir, source=source_hash(filepath))
+        except OSError as e:
+            logger.warning(f"缓存写入失败: {cache_dir} {e}")
+    return derived, False
@@ -0,0 +1,84 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+WEEK_ANCHOR = -3 * 86400  # 1969-12-29 周一
+
+
+def parse_timeframe(timeframe):
+    """
+    1m/5m/15m/1h/4h/1d/1w, h/d/w 大小写均可 (okx 使用 1H/1D), 返回秒数
+    大写 M 是月线 (okx 1M), 长度不固定, 无法按固定步长分页和合成, 直接拒绝而不是当作分钟
+    """
+    match = re.fullmatch(r"(\d+)([mhdwHDWM])", timeframe.strip())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"无法识别的周期 {timeframe}, 例如 5m/15m/1h/4h/1d")
+    if match.group(2) == 'M':
+        raise ValueError(f"不支持月线周期 {timeframe}, 月份长度不固定")
+    return int(match.group(1)) * UNITS[match.group(2).lower()]
+
+
+def _nanoseconds(index):
+    return index.to_numpy().astype('datetime64[ns]').view(np.int64)
+
+
+def base_seconds(df):
+    """基础数据的周期, 取相邻时间差的中位数"""
+    if len(df) < 2:
+        raise ValueError("数据不足两行, 无法判断周期")
+    return int(np.median(np.diff(_nanoseconds(df.index)))) // 10 ** 9
+
+
+def bin_anchor(seconds):
+    """分组起点相对 UTC 1970-01-01 (周四) 的偏移秒数: 周线按周一 00:00 对齐, 其它周期为 0"""
+    return WEEK_ANCHOR if seconds % UNITS['w'] == 0 else 0
+
+
+def resample_ohlcv(df, seconds, partial=False):
+    """
+    把基础 K 线合成为 seconds 周期的 K 线, 分组边界按 UTC 整点对齐 (与交易所一致), 周线从周一 00:00 开始
+    open 取第一根, high/low 取极值, close/openinterest 取最后一根, volume 求和, 其它列取最后一根
+
+    合成 K 线的时间戳与交易所一致, 取该周期的开始时间; 多周期回测时由 cli.back_strategy.load_frames
+    对齐到同一时刻收盘的主数据 K 线, 不会在高周期 K 线收盘之前读到它的收盘价
+    :param partial: 保留首尾不完整的分组 (数据从周期中间开始, 或最后一根还没走完), 默认丢弃
+    """
+    base = base_seconds(df)
+    if base <= 0:
+        raise ValueError("数据时间戳重复或未排序, 无法合成周期")
+    if seconds % base:
+        raise ValueError(f"周期 {seconds}s 不是基础数据周期 {base}s 的整数倍")
+    if seconds == base:
+        return df
+
+    anchor = bin_anchor(seconds) * 10 ** 9
+    step = seconds * 10 ** 9
+    ts = _nanoseconds(df.index)
+    bins = (ts - anchor) // step
+    starts = np.flatnonzero(np.diff(bins, prepend=bins[0] - 1))
+    ends = np.append(starts[1:], len(ts)) - 1
+    opens = bins[starts] * step + anchor
+
+    keep = np.ones(len(starts), dtype=bool)
+    if not partial:
+        keep[0] &= ts[0] == opens[0]
+        keep[-1] &= ts[-1] + base * 10 ** 9 >= opens[-1] + step
+
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        if name == 'open':
+            columns[name] = values[starts]
+        elif name == 'high':
+            columns[name] = np.maximum.reduceat(values, starts)
+        elif name == 'low':
+            columns[name] = np.minimum.reduceat(values, starts)
+        elif name == 'volume':
+            columns[name] = np.add.reduceat(values, starts)
+        else:
+            columns[name] = values[ends]
+        columns[name] = columns[name][keep]
+    index = pd.DatetimeIndex(opens[keep].astype('datetime64[ns]'), name=df.index.name)
+    return pd.DataFrame(columns, index=index)
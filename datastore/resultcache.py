@@ -0,0 +1,135 @@
+import functools
+import glob
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sqlite3
+
+from loguru import logger
+
+from .csvcache import source_hash
+from .warehouse import CandleStore, parse_uri
+
+CACHE_VERSION = 4  # 2: 结果行增加 Performance 指标列; 3: 丢弃 maxcpus=1 时误存的最后一次运行资产; 4: 合成周期对齐方式变化
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'signal_trading', 'results.sqlite')
+
+
+def strategy_hash(strategy_cls):
+    """策略类所在模块的源码哈希, 修改策略代码后旧结果自动失效"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{strategy_cls.__module__}.{strategy_cls.__qualname__}".encode())
+    h.update(inspect.getsource(inspect.getmodule(strategy_cls)).encode())
+    return h.hexdigest()
+
+
+# 策略之外决定结果行的代码: 指标, 结果分析器, 结果行的组装和周期合成; vector 引擎另加数组化内核
+RESULT_MODULES = ('indicator', 'analyzer.RunResult', 'analyzer.Performance', 'cli.utils', 'datastore.resample')
+ENGINE_MODULES = {'vector': ('engine.vector',)}
+
+
+@functools.lru_cache(maxsize=None)
+def source_digest(engine):
+    """RESULT_MODULES 及 engine 对应模块的源码哈希, 修改这些代码后旧结果自动失效, 不必手动修改 CACHE_VERSION"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(engine.encode())
+    for name in (*RESULT_MODULES, *ENGINE_MODULES.get(engine, ())):
+        spec = importlib.util.find_spec(name)
+        if spec.submodule_search_locations:
+            paths = sorted(glob.glob(os.path.join(spec.submodule_search_locations[0], '*.py')))
+        else:
+            paths = [spec.origin]
+        for path in paths:
+            h.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def data_hash(filepath):
+    """csv 取内容哈希, 仓库地址取序列的写入版本号"""
+    key = parse_uri(filepath)
+    if key:
+        return f"{filepath}@{CandleStore().version(*key)}"
+    return source_hash(filepath)
+
+
+def _params_key(params):
+    return json.dumps(sorted(params.items()), default=str)
+
+
+class ResultCache:
+    """
+    单组参数回测结果缓存, 键为 (数据文件哈希, 策略类及源码哈希, 引擎及相关源码哈希, 完整参数, 初始资金, 合成周期)
+    结果存放在 sqlite 中, 批量回测的多个子进程可以同时读写
+    """
+
+    def __init__(self, filepath, strategy_cls, cash, path=DEFAULT_PATH, timeframes=(), engine='backtrader'):
+        self.path = path
+        self.defaults = dict(strategy_cls.params._getitems())
+        namespace = json.dumps([CACHE_VERSION, data_hash(filepath), strategy_hash(strategy_cls), source_digest(engine),
+                                cash, list(timeframes)])
+        self.namespace = hashlib.blake2b(namespace.encode(), digest_size=16).hexdigest()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60)
+        conn.execute("CREATE TABLE IF NOT EXISTS results "
+                     "(namespace TEXT, params TEXT, row TEXT, PRIMARY KEY (namespace, params))")
+        return conn
+
+    def get_many(self, combos):
+        """:return: 与 combos 对齐的结果行, 未命中为 None"""
+        keys = [_params_key({**self.defaults, **combo}) for combo in combos]
+        conn = self._connect()
+        try:
+            found = {}
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                found.update(conn.execute(
+                    f"SELECT params, row FROM results WHERE namespace = ? AND params IN ({','.join('?' * len(chunk))})",
+                    [self.namespace, *chunk]))
+        finally:
+            conn.close()
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def put_many(self, rows):
+        """结果行包含完整的策略参数, 直接按参数列建键"""
+        records = [(self.namespace, _params_key({name: row[name] for name in self.defaults}), json.dumps(row))
+                   for row in rows]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", records)
+        finally:
+            conn.close()
+
+    def wrap(self, evaluate):
+        """包装 evaluate([params, ...]) -> 结果行, 只回测缓存中缺失的参数组合, 结果顺序不变"""
+
+        def cached_evaluate(combos):
+            rows = self.get_many(combos)
+            missing = [combo for combo, row in zip(combos, rows) if row is None]
+            self.hits += len(combos) - len(missing)
+            self.misses += len(missing)
+            logger.info(f"result cache hit:{len(combos) - len(missing)} miss:{len(missing)}")
+            if missing:
+                fresh = iter(evaluate(missing))
+                computed = []
+                for i, row in enumerate(rows):
+                    if row is None:
+                        rows[i] = next(fresh)
+                        computed.append(rows[i])
+                self.put_many(computed)
+            return rows
+
+        return cached_evaluate
+
+
+def purge(path=DEFAULT_PATH):
+    if os.path.exists(path):
+        os.remove(path)
+        logger.info(f"result cache purged: {path}")
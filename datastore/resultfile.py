@@ -0,0 +1,130 @@
+import csv
+import gzip
+import os
+import sqlite3
+
+FORMATS = ('csv', 'csv.gz', 'parquet', 'sqlite', 'xlsx')
+EXCEL_MAX_ROWS = 1048576 - 1  # 工作表行数上限, 减去表头
+
+
+class CsvSink:
+    def __init__(self, path, compress=False):
+        self._file = gzip.open(path, 'wt', newline='') if compress else open(path, 'w', newline='')
+        self._writer = None
+
+    def write(self, rows):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(rows[0]))
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("parquet 输出需要安装 pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def check_format(fmt):
+    """在回测开始前检查输出格式的依赖"""
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的输出格式 {fmt}, 可选 {list(FORMATS)}")
+    if fmt == 'parquet':
+        _pyarrow()
+
+
+class ParquetSink:
+    """每块写成一个 row group, 列类型由第一块推断"""
+
+    # 不同参数组合下可能是 int 0 或 float 的结果列
+    FLOAT_COLUMNS = ('final_value', 'commission')
+
+    def __init__(self, path):
+        self._pa = _pyarrow()
+        self._path = path
+        self._writer = None
+
+    def write(self, rows):
+        pa = self._pa
+        table = pa.Table.from_pylist(rows)
+        if self._writer is None:
+            schema = pa.schema([pa.field(field.name, pa.float64()) if field.name in self.FLOAT_COLUMNS or
+                                pa.types.is_floating(field.type) else field for field in table.schema])
+            self._writer = pa.parquet.ParquetWriter(self._path, schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class SqliteSink:
+    """结果写入 results 表, 每块一个事务"""
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        self._conn = sqlite3.connect(path)
+        self._columns = None
+
+    def write(self, rows):
+        if self._columns is None:
+            self._columns = list(rows[0])
+            names = ', '.join(f'"{name}"' for name in self._columns)
+            self._conn.execute(f"CREATE TABLE results ({names})")
+            self._insert = f"INSERT INTO results VALUES ({', '.join('?' * len(self._columns))})"
+        with self._conn:
+            self._conn.executemany(self._insert, [[row[name] for name in self._columns] for row in rows])
+
+    def close(self):
+        self._conn.close()
+
+
+class ExcelSink:
+    """openpyxl 只写模式逐行写入, 不在内存中保留整张表"""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self._path = path
+        self._book = Workbook(write_only=True)
+        self._sheet = self._book.create_sheet()
+        self._columns = None
+        self._count = 0
+
+    def write(self, rows):
+        if self._count + len(rows) > EXCEL_MAX_ROWS:
+            raise ValueError(f"xlsx 最多 {EXCEL_MAX_ROWS} 行, 请使用 csv.gz/parquet/sqlite 输出")
+        if self._columns is None:
+            self._columns = list(rows[0])
+            self._sheet.append(self._columns)
+        for row in rows:
+            self._sheet.append([row[name] for name in self._columns])
+        self._count += len(rows)
+
+    def close(self):
+        self._book.save(self._path)
+
+
+def open_sink(prefix, fmt):
+    """
+    按格式打开结果文件
+    :param prefix: 不含扩展名的文件路径
+    :return: (sink, path), sink.write(rows) 追加一块结果行, sink.close() 结束写入
+    """
+    path = f"{prefix}.{fmt}"
+    if fmt in ('csv', 'csv.gz'):
+        return CsvSink(path, compress=fmt == 'csv.gz'), path
+    if fmt == 'parquet':
+        return ParquetSink(path), path
+    if fmt == 'sqlite':
+        return SqliteSink(path), path
+    if fmt == 'xlsx':
+        return ExcelSink(path), path
+    raise ValueError(f"不支持的输出格式 {fmt}, 可选 {list(FORMATS)}")
@@ -0,0 +1,53 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'openinterest')
+
+
+class CsvStream(bt.feed.DataBase):
+    """
+    按块读取行情 csv 的数据源, 内存中只保留当前块, 配合 cerebro exactbars=1 (不预加载) 使用
+    时间和价格与 bt.feeds.PandasData(load_csv(...)) 逐位一致, 缺少的列为 NaN
+    """
+    params = (
+        ('index_col', 'timestamp'),
+        ('chunksize', 50000),
+    )
+
+    def start(self):
+        super().start()
+        # 迭代器在 start 中创建, 寻优时 cerebro 可以 pickle 到子进程
+        self._reader = pd.read_csv(self.p.dataname, index_col=self.p.index_col, parse_dates=True,
+                                   chunksize=self.p.chunksize)
+        self._rows = iter(())
+
+    def stop(self):
+        super().stop()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def _next_chunk(self):
+        chunk = next(self._reader, None)
+        if chunk is None:
+            return False
+        columns = [[bt.date2num(ts) for ts in chunk.index.to_pydatetime()]]
+        for name in COLUMNS:
+            if name in chunk:
+                columns.append(chunk[name].to_numpy(dtype=np.float64).tolist())
+            else:
+                columns.append([float('nan')] * len(chunk))
+        self._rows = zip(*columns)
+        return True
+
+    def _load(self):
+        row = next(self._rows, None)
+        while row is None:
+            if self._reader is None or not self._next_chunk():
+                return False
+            row = next(self._rows, None)
+        lines = self.lines
+        (lines.datetime[0], lines.open[0], lines.high[0], lines.low[0], lines.close[0], lines.volume[0],
+         lines.openinterest[0]) = row
+        return True
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .candlesync import missing_ranges, closed_candles, closed_empty_ranges
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.local', 'share', 'signal_trading', 'candles.sqlite')
+URI_PREFIX = 'store:'
+
+
+def parse_uri(uri):
+    """store:okx:BTC/USDT:1m -> ('okx', 'BTC/USDT', '1m'), 不是仓库地址时返回 None"""
+    if not isinstance(uri, str) or not uri.startswith(URI_PREFIX):
+        return None
+    parts = uri[len(URI_PREFIX):].split(':')
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(f"无法识别的仓库地址 {uri}, 格式为 store:交易所:交易对:周期, 例如 store:okx:BTC/USDT:1m")
+    return tuple(parts)
+
+
+def exchange_key(exchange_id, sandbox=False):
+    """仓库中的交易所名, 模拟盘与实盘的数据分开存放: okx / okx-testnet"""
+    return f"{exchange_id}-testnet" if sandbox else exchange_id
+
+
+class CandleStore:
+    """
+    本地 K 线仓库, 单个 sqlite 文件:
+    candles 表以 (exchange, symbol, interval, ts) 为主键且 WITHOUT ROWID, 数据按主键聚簇存放,
+    区间查询是一次 O(log n) 的 B 树定位加顺序扫描; ts 为 K 线开始时间的 UTC 毫秒时间戳
+
+    candles sync --store 和实盘数据源写入, 回测 (--f store:...) 和实盘预热读取
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 子进程中重新连接
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS candles (exchange TEXT, symbol TEXT, interval TEXT, ts INTEGER, "
+                         "open REAL, high REAL, low REAL, close REAL, volume REAL, "
+                         "PRIMARY KEY (exchange, symbol, interval, ts)) WITHOUT ROWID")
+            # version 每次写入加一, 作为回测结果缓存的数据指纹
+            conn.execute("CREATE TABLE IF NOT EXISTS series (exchange TEXT, symbol TEXT, interval TEXT, "
+                         "version INTEGER, PRIMARY KEY (exchange, symbol, interval))")
+            # 交易所确认没有数据的已收盘区间 [lo, hi), 同步时跳过
+            conn.execute("CREATE TABLE IF NOT EXISTS empty_ranges (exchange TEXT, symbol TEXT, interval TEXT, "
+                         "lo INTEGER, hi INTEGER, PRIMARY KEY (exchange, symbol, interval, lo))")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def write(self, exchange, symbol, interval, candles):
+        """
+        写入 K 线 [[ts_ms, open, high, low, close, volume], ...], 已有的时间戳覆盖; 一次调用一个事务
+        :return: 写入的行数
+        """
+        if not len(candles):
+            return 0
+        key = (exchange, symbol, interval)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(*key, int(c[0]), *map(float, c[1:6])) for c in candles])
+                conn.execute("INSERT INTO series VALUES (?, ?, ?, 1) "
+                             "ON CONFLICT (exchange, symbol, interval) DO UPDATE SET version = version + 1", key)
+        return len(candles)
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _range(since, until):
+        return (since if since is not None else -2 ** 63, until if until is not None else 2 ** 63 - 1)
+
+    def candles(self, exchange, symbol, interval, since=None, until=None):
+        """[since, until) 内的 K 线, 按时间升序, 格式同 ccxt fetch_ohlcv"""
+        return [list(row) for row in self._query(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE exchange = ? AND symbol = ? AND interval = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (exchange, symbol, interval, *self._range(since, until)))]
+
+    def tail(self, exchange, symbol, interval, limit):
+        """最近的 limit 根 K 线, 按时间升序"""
+        rows = self._query("SELECT ts, open, high, low, close, volume FROM candles "
+                           "WHERE exchange = ? AND symbol = ? AND interval = ? ORDER BY ts DESC LIMIT ?",
+                           (exchange, symbol, interval, limit))
+        return [list(row) for row in reversed(rows)]
+
+    def timestamps(self, exchange, symbol, interval, since=None, until=None):
+        rows = self._query("SELECT ts FROM candles WHERE exchange = ? AND symbol = ? AND interval = ? "
+                           "AND ts >= ? AND ts < ? ORDER BY ts", (exchange, symbol, interval, *self._range(since, until)))
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def read(self, exchange, symbol, interval, since=None, until=None):
+        """
+        回测用的 DataFrame, 列与 candles history 的 csv 相同, index 为 timestamp (UTC)
+        """
+        candles = self.candles(exchange, symbol, interval, since, until)
+        array = np.array(candles, dtype=np.float64).reshape(-1, 6)
+        index = pd.DatetimeIndex(array[:, 0].astype('int64').astype('datetime64[ms]'), name='timestamp')
+        df = pd.DataFrame(array[:, 1:], index=index, columns=['open', 'high', 'low', 'close', 'volume'])
+        df['openinterest'] = 0.0
+        return df
+
+    def version(self, exchange, symbol, interval):
+        rows = self._query("SELECT version FROM series WHERE exchange = ? AND symbol = ? AND interval = ?",
+                           (exchange, symbol, interval))
+        return rows[0][0] if rows else 0
+
+    def series(self):
+        """仓库中的所有序列 [(exchange, symbol, interval, 行数, 第一根, 最后一根), ...]"""
+        return self._query("SELECT exchange, symbol, interval, COUNT(*), MIN(ts), MAX(ts) FROM candles "
+                           "GROUP BY exchange, symbol, interval ORDER BY exchange, symbol, interval", ())
+
+    def empty_ranges(self, exchange, symbol, interval):
+        return [tuple(row) for row in self._query(
+            "SELECT lo, hi FROM empty_ranges WHERE exchange = ? AND symbol = ? AND interval = ? ORDER BY lo",
+            (exchange, symbol, interval))]
+
+    def mark_empty(self, exchange, symbol, interval, ranges):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO empty_ranges VALUES (?, ?, ?, ?, ?)",
+                                 [(exchange, symbol, interval, lo, hi) for lo, hi in ranges])
+
+    def sync(self, downloader, exchange, since, until):
+        """
+        只下载仓库中 [since, until) 缺失的区间 (含内部断档), 每个分段一个事务写入, 中断后已写入的分段不会丢失;
+        until 最晚到最后一根已收盘的 K 线, 正在生成的一根不写入仓库
+        :param downloader: broker.CandleDownloader
+        :return: 新增的 K 线数量
+        """
+        now = int(time.time() * 1000)
+        until = min(until, now // downloader.step * downloader.step)
+        key = (exchange, downloader.symbol, downloader.interval)
+        known = self.timestamps(*key, since, until)
+        known_empty = self.empty_ranges(*key)
+        ranges = missing_ranges(known, since, until, downloader.step, known_empty)
+        logger.info(f"仓库 {':'.join(key)} 已有 {len(known)} 根, 缺失 {len(ranges)} 个区间")
+        added = 0
+        for candles in downloader.iter_ranges(ranges):
+            added += self.write(*key, closed_candles(candles, downloader.step, now))
+        empty = closed_empty_ranges(self.timestamps(*key, since, until), since, until, downloader.step, known_empty,
+                                    now)
+        if empty:
+            logger.warning(f"交易所没有数据的区间 {len(empty)} 个, 之后同步跳过")
+            self.mark_empty(*key, empty)
+        logger.info(f"同步完成 {URI_PREFIX}{':'.join(key)} 新增 {added} 根 K 线")
+        return added
@@ -0,0 +1,2 @@
+from .vector import run_vector, run_vector_combos, KERNELS
+from .search import search, Range
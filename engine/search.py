@@ -0,0 +1,170 @@
+import itertools
+import math
+import random
+
+from loguru import logger
+
+
+class Range:
+    """参数取值区间 [lo, hi], integer 为 True 时只取整数"""
+
+    def __init__(self, lo, hi, integer=False):
+        if hi < lo:
+            raise ValueError(f"区间上限小于下限: {lo}:{hi}")
+        self.lo = lo
+        self.hi = hi
+        self.integer = integer
+
+    def __repr__(self):
+        return f"{self.lo}:{self.hi}"
+
+    def sample(self, rng):
+        if self.integer:
+            return rng.randint(self.lo, self.hi)
+        return rng.uniform(self.lo, self.hi)
+
+    def clip(self, value):
+        value = min(max(value, self.lo), self.hi)
+        return int(round(value)) if self.integer else value
+
+
+def grid_values(space):
+    """网格模式只接受逗号分隔的列表"""
+    for name, values in space.items():
+        if isinstance(values, Range):
+            raise ValueError(f"grid 模式不支持区间参数 {name}={values}, 请使用逗号分隔的列表")
+    return space
+
+
+def grid_combos(space):
+    """按 cerebro.optstrategy 的顺序展开参数网格"""
+    grid_values(space)
+    keys = list(space)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in space.values()]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+class RandomSampler:
+    """在参数空间内均匀随机采样, 区间参数均匀分布, 列表参数等概率选择"""
+
+    def __init__(self, space, rng):
+        self.space = space
+        self.rng = rng
+
+    def _draw(self):
+        return {name: values.sample(self.rng) if isinstance(values, Range) else self.rng.choice(values)
+                for name, values in self.space.items()}
+
+    def suggest(self, history, n, seen):
+        batch = []
+        for _ in range(n * 20):
+            candidate = self._draw()
+            key = _key(candidate)
+            if key not in seen:
+                seen.add(key)
+                batch.append(candidate)
+            if len(batch) == n:
+                break
+        return batch
+
+
+class TPESampler(RandomSampler):
+    """
+    Tree-structured Parzen Estimator
+    按目标值把历史结果分成好/差两组, 分别对每个参数建立 Parzen 密度 l(x)/g(x),
+    从 l(x) 中采样候选并选取 l(x)/g(x) 最大的一批
+    """
+
+    def __init__(self, space, rng, n_startup=10, gamma=0.25, n_candidates=24):
+        super(TPESampler, self).__init__(space, rng)
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+
+    def suggest(self, history, n, seen):
+        if len(history) < self.n_startup:
+            return super(TPESampler, self).suggest(history, n, seen)
+
+        ranked = sorted(history, key=lambda item: item[1], reverse=True)
+        n_good = max(1, int(math.ceil(self.gamma * len(ranked))))
+        good = [params for params, _ in ranked[:n_good]]
+        bad = [params for params, _ in ranked[n_good:]]
+
+        scored = []
+        for _ in range(self.n_candidates * n):
+            candidate = {name: self._sample_good(values, [p[name] for p in good])
+                         for name, values in self.space.items()}
+            score = sum(self._log_density(values, candidate[name], [p[name] for p in good]) -
+                        self._log_density(values, candidate[name], [p[name] for p in bad])
+                        for name, values in self.space.items())
+            scored.append((score, candidate))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        batch = []
+        for _, candidate in scored:
+            key = _key(candidate)
+            if key not in seen:
+                seen.add(key)
+                batch.append(candidate)
+            if len(batch) == n:
+                return batch
+        # 候选全部重复时退化为随机采样, 保证评估预算被用完
+        return batch + super(TPESampler, self).suggest(history, n - len(batch), seen)
+
+    @staticmethod
+    def _bandwidth(values, n):
+        return (values.hi - values.lo) * max(n, 1) ** -0.2 / 2 or 1.0
+
+    def _sample_good(self, values, observed):
+        if not isinstance(values, Range):
+            weights = [observed.count(v) + 1 for v in values]
+            return self.rng.choices(values, weights=weights)[0]
+        # 以 1/(n+1) 的概率从先验 (均匀分布) 中采样
+        if self.rng.random() < 1.0 / (len(observed) + 1):
+            return values.sample(self.rng)
+        center = self.rng.choice(observed)
+        return values.clip(self.rng.gauss(center, self._bandwidth(values, len(observed))))
+
+    def _log_density(self, values, x, observed):
+        if not isinstance(values, Range):
+            return math.log((observed.count(x) + 1) / (len(observed) + len(values)))
+        width = (values.hi - values.lo) or 1.0
+        prior = 1.0 / width
+        sigma = self._bandwidth(values, len(observed))
+        kernels = sum(math.exp(-0.5 * ((x - mu) / sigma) ** 2) / (sigma * math.sqrt(2 * math.pi)) for mu in observed)
+        return math.log((prior + kernels) / (len(observed) + 1))
+
+
+SAMPLERS = {
+    'random': RandomSampler,
+    'tpe': TPESampler,
+}
+
+
+def _key(params):
+    return tuple(sorted(params.items()))
+
+
+def search(space, evaluate, mode, budget, batch_size, objective='final_value', seed=None):
+    """
+    在评估预算内搜索参数, 每批 batch_size 组参数交给 evaluate 并行评估
+    :param space: {参数名: Range 或取值列表}
+    :param evaluate: evaluate([params, ...]) -> 结果行列表, 每行包含 objective 列
+    :return: 所有评估过的结果行, 按评估顺序排列
+    """
+    sampler = SAMPLERS[mode](space, random.Random(seed))
+    history = []
+    rows = []
+    seen = set()
+    while len(rows) < budget:
+        batch = sampler.suggest(history, min(batch_size, budget - len(rows)), seen)
+        if not batch:
+            logger.warning(f"[{mode}] 参数空间已全部评估, 共 {len(rows)} 组")
+            break
+        for params, row in zip(batch, evaluate(batch)):
+            history.append((params, row[objective]))
+            rows.append(row)
+        best = max(rows, key=lambda row: row[objective])
+        logger.info(f"[{mode}] {len(rows)}/{budget} best {objective}:{best[objective]} "
+                    f"params:{ {name: best[name] for name in space} }")
+    return rows
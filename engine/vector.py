@@ -0,0 +1,218 @@
+import numpy as np
+from loguru import logger
+
+from analyzer.Performance import performance_metrics
+from indicator.cache import fingerprint, get_lines
+from indicator.kernels import crossover_line
+from .search import grid_combos
+from strategy import Busy, EMA, SMA, EMA_Crossover
+
+COMMISSION_RATE = 0.001  # 与策略 notify_order 中的手续费估算保持一致
+
+
+def _find(cond, lo, n):
+    """从 lo 开始按倍增窗口查找第一个满足 cond(lo, hi) 的下标, 找不到返回 -1"""
+    step = 256
+    while lo < n:
+        hi = min(n, lo + step)
+        hits = np.flatnonzero(cond(lo, hi))
+        if hits.size:
+            return lo + int(hits[0])
+        lo = hi
+        step *= 2
+    return -1
+
+
+def simulate(bars, start, cash, entry, exit_):
+    """
+    复刻 BackBroker 的限价单撮合以及策略里 _open_order/op 的状态切换
+
+    策略在第 k 根 bar 以收盘价挂限价单, 从 k+1 根开始撮合:
+    买单在 开盘价<=限价 时以开盘价成交, 否则在 最低价<=限价 时以限价成交, 卖单对称.
+    订单一直有效直到成交; 保证金不足被拒的订单不会触发 Completed,
+    策略的 _open_order 不会复位, 之后不再交易.
+
+    :param bars: dict, open/high/low/close 的 float64 数组
+    :param start: 策略第一次调用 next 的下标 (指标最小周期 - 1)
+    :param entry: entry(lo, hi) -> 空仓时的开仓信号
+    :param exit_: exit_(lo, hi, buy_price) -> 持仓时的平仓信号
+    :return: (final_value, commission, trades), trades 为每次持仓
+             [买入成交下标, 卖出成交下标, 数量, 买入成交价, 持仓期间现金, 卖出盈亏, 交易盈亏 (trade.pnlcomm)],
+             期末未平仓时卖出下标为 n
+    """
+    o, h, l, c = bars['open'], bars['high'], bars['low'], bars['close']
+    n = len(c)
+    commission = 0
+    size = 0.0
+    pprice = 0.0
+    trades = []
+
+    i = start
+    while i < n:
+        k = _find(entry, i, n)
+        if k < 0 or k + 1 >= n:
+            break
+        price = c[k]
+        order_size = cash / price
+        if cash - abs(order_size) * price < 0.0:
+            break
+        j = _find(lambda lo, hi: (price >= o[lo:hi]) | (price >= l[lo:hi]), k + 1, n)
+        if j < 0:
+            break
+        fill = o[j] if price >= o[j] else price
+        cash -= abs(order_size) * fill
+        size, pprice = order_size, fill
+        commission += abs(order_size * price * COMMISSION_RATE)
+        trades.append([j, n, size, pprice, cash, 0.0, 0.0])
+
+        k = _find(lambda lo, hi: exit_(lo, hi, price), j, n)
+        if k < 0 or k + 1 >= n:
+            break
+        sell_price = c[k]
+        j = _find(lambda lo, hi: (sell_price <= o[lo:hi]) | (sell_price <= h[lo:hi]), k + 1, n)
+        if j < 0:
+            break
+        fill = o[j] if sell_price <= o[j] else sell_price
+        cash += abs(-size) * pprice + size * (fill - pprice) * 1.0
+        trades[-1][1] = j
+        trades[-1][5] = size * (fill - pprice)
+        # bt.Trade 的开仓均价按 (0 * 0 + size * price) / size 计算, 盈亏扣除的手续费为 0 (broker 未设置佣金)
+        trade_price = (0.0 * 0.0 + size * pprice) / size
+        trades[-1][6] = (0.0 + size * (fill - trade_price) * 1.0) - 0.0
+        commission += abs(-size * sell_price * COMMISSION_RATE)
+        size, pprice = 0.0, 0.0
+        i = j
+
+    # BackBroker._get_value: 多头仓位按 (市值 - 浮盈) + 浮盈 计入
+    value = 0.0
+    if size > 0:
+        unrealized = size * (c[-1] - pprice) * 1.0
+        value = value + (size * c[-1] - unrealized) + unrealized
+    return float(cash + value), float(commission) if commission else commission, trades
+
+
+def equity_metrics(bars, cash, trades, bar_seconds):
+    """由 simulate 的持仓区间还原逐 bar 资产, 计算与 Performance 分析器相同的指标"""
+    c = bars['close']
+    values = np.full(len(c), float(cash))
+    exposure = np.zeros(len(c), dtype=bool)
+    pnl = []
+    for buy, sell, size, pprice, holding_cash, profit, pnlcomm in trades:
+        held = c[buy:sell]
+        unrealized = size * (held - pprice) * 1.0
+        values[buy:sell] = holding_cash + ((size * held - unrealized) + unrealized)
+        exposure[buy:sell] = True
+        if sell < len(c):
+            values[sell:] = holding_cash + (abs(-size) * pprice + profit * 1.0)
+            pnl.append(pnlcomm)
+    return performance_metrics(values, exposure, pnl, bar_seconds)
+
+
+class Lines:
+    """单次回测的指标序列, 均线取自 indicator.cache, 同一周期在整个参数网格中只计算一次"""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.fingerprint = fingerprint(bars['close'])
+        self._cache = {}
+
+    def get(self, kind, period):
+        return get_lines(self.bars['close'], kind, fp=self.fingerprint, period=period)[0]
+
+    def crossover(self, kind, fast, slow):
+        key = ('crossover', kind, fast, slow)
+        if key not in self._cache:
+            self._cache[key] = crossover_line(self.get(kind, fast), self.get(kind, slow))
+        return self._cache[key]
+
+
+def busy_kernel(lines, cash, p):
+    """Busy: 均线之下 below 买入, 固定 net_profit 止盈, 价格低于长均线时不开新仓"""
+    c = lines.bars['close']
+    short_ma = lines.get('ema', p['short_period'])
+    long_ma = lines.get('ema', p['long_period'])
+    start = max(p['short_period'], p['long_period']) - 1
+
+    def entry(lo, hi):
+        return ~(c[lo:hi] < long_ma[lo:hi]) & (c[lo:hi] <= short_ma[lo:hi] * (1 - p['below']))
+
+    # Busy 挂止盈单时会把 buy_price 置 0, 止损分支 close <= 0 永远不会成立, 这里不再单独建模
+    def exit_(lo, hi, buy_price):
+        return ~(c[lo:hi] < long_ma[lo:hi]) & (c[lo:hi] >= buy_price * (1 + p['net_profit']))
+
+    return simulate(lines.bars, start, cash, entry, exit_)
+
+
+def _band_kernel(kind):
+    """EMA/SMA: 低于均线 below 买入, 高于均线 above 卖出"""
+
+    def kernel(lines, cash, p):
+        c = lines.bars['close']
+        ma = lines.get(kind, p['period'])
+
+        def entry(lo, hi):
+            return c[lo:hi] < ma[lo:hi] * (1 - p['below'])
+
+        def exit_(lo, hi, buy_price):
+            return ~entry(lo, hi) & (c[lo:hi] > ma[lo:hi] * (1 + p['above']))
+
+        return simulate(lines.bars, p['period'] - 1, cash, entry, exit_)
+
+    return kernel
+
+
+def crossover_kernel(lines, cash, p):
+    """EMA_Crossover: 金叉买入, 死叉卖出"""
+    cross = lines.crossover('ema', p['short_period'], p['long_period'])
+    start = max(p['short_period'], p['long_period'])
+
+    def entry(lo, hi):
+        return cross[lo:hi] > 0
+
+    def exit_(lo, hi, buy_price):
+        return cross[lo:hi] < 0
+
+    return simulate(lines.bars, start, cash, entry, exit_)
+
+
+KERNELS = {
+    Busy: busy_kernel,
+    EMA: _band_kernel('ema'),
+    SMA: _band_kernel('sma'),
+    EMA_Crossover: crossover_kernel,
+}
+
+
+def load_bars(df):
+    return {name: df[name].to_numpy(dtype=np.float64) for name in ('open', 'high', 'low', 'close')}
+
+
+def run_vector(strategy_cls, df, cash, **kwargs):
+    """
+    数组化回测, 参数网格的展开顺序与 cerebro.optstrategy 一致
+    :return: 与 result_handler 相同结构的结果行 {**params, final_value, commission}
+    """
+    return run_vector_combos(strategy_cls, df, cash, grid_combos(kwargs))
+
+
+def run_vector_combos(strategy_cls, df, cash, combos):
+    """按给定的参数组合逐组回测, 用于 random/tpe 搜索"""
+    kernel = KERNELS.get(strategy_cls)
+    if kernel is None:
+        raise ValueError(f"vector 引擎不支持策略 {strategy_cls.__name__}")
+
+    defaults = dict(strategy_cls.params._getitems())
+    lines = Lines(load_bars(df))
+    seconds = round(np.median(np.diff(df.index.to_numpy())) / np.timedelta64(1, 's')) if len(df) > 1 else 0
+    rows = []
+    for combo in combos:
+        params = {**defaults, **combo}
+        final_value, commission, trades = kernel(lines, cash, params)
+        rows.append({
+            **params,
+            'final_value': final_value,
+            "commission": commission,
+            **equity_metrics(lines.bars, cash, trades, seconds),
+        })
+    logger.info(f"vector engine {strategy_cls.__name__} 完成 {len(rows)} 组参数")
+    return rows
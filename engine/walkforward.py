@@ -0,0 +1,89 @@
+import bisect
+import statistics
+from collections import Counter
+
+from .search import Range
+
+
+def warmup_bars(space):
+    """样本外窗口前补的指标预热 bar 数: 参数空间中周期参数 (*period) 可能取到的最大值"""
+    periods = [0]
+    for name, values in space.items():
+        if not name.endswith('period'):
+            continue
+        if isinstance(values, Range):
+            periods.append(values.hi)
+        else:
+            periods.extend(values if isinstance(values, (list, tuple)) else [values])
+    return int(max(periods))
+
+
+def split_windows(n, train, test, step=None, warmup=0):
+    """
+    滚动切分样本内/样本外窗口
+    :param n: 数据总行数
+    :param train: 样本内 (寻优) 行数
+    :param test: 样本外 (验证) 行数
+    :param step: 窗口每次向前滚动的行数, 默认等于 test, 样本外窗口首尾相接
+    :param warmup: 样本外窗口回测时向前补的历史行数 (取自样本内窗口的末尾), 不能超过 train
+    :return: [(train_lo, train_hi, test_lo, test_hi), ...] 左闭右开的行下标
+    """
+    if train <= 0 or test <= 0:
+        raise ValueError("train/test 必须大于 0")
+    if step is not None and step <= 0:
+        raise ValueError("step 必须大于 0")
+    if warmup > train:
+        raise ValueError(f"train {train} 小于指标预热所需的 {warmup} 根")
+    step = step or test
+    windows = []
+    lo = 0
+    while lo + train + test <= n:
+        windows.append((lo, lo + train, lo + train, lo + train + test))
+        lo += step
+    if not windows:
+        raise ValueError(f"数据行数 {n} 不足一个窗口 (train {train} + test {test})")
+    return windows
+
+
+def chain_equity(windows, cash):
+    """
+    把各窗口样本外资金曲线按收益率首尾拼接, 每个窗口都从 cash 起步回测,
+    拼接时按上一个窗口的期末资产等比缩放
+    step 小于 test 时样本外窗口相互重叠, 每个窗口只取到下一个窗口开始之前, 同一根 bar 的收益只计一次
+    :param windows: [(datetimes, values), ...] 按时间顺序
+    :return: (datetimes, values)
+    """
+    datetimes, values = [], []
+    scale = 1.0
+    for i, (window_datetimes, window_values) in enumerate(windows):
+        later = [dts[0] for dts, _ in windows[i + 1:] if dts]
+        end = bisect.bisect_left(window_datetimes, later[0]) if later else len(window_datetimes)
+        datetimes.extend(window_datetimes[:end])
+        values.extend(value * scale for value in window_values[:end])
+        if end:
+            scale *= window_values[end - 1] / cash
+    return datetimes, values
+
+
+def stability_report(param_names, winners):
+    """
+    各参数在所有窗口中被选中的取值分布
+    :param winners: 每个窗口的最优参数 [{name: value}, ...]
+    """
+    rows = []
+    for name in param_names:
+        picks = [params[name] for params in winners]
+        mode, count = Counter(picks).most_common(1)[0]
+        row = {
+            'param': name,
+            'windows': len(picks),
+            'distinct': len(set(picks)),
+            'mode': mode,
+            'mode_share': count / len(picks),
+        }
+        if all(isinstance(v, (int, float)) for v in picks):
+            mean = statistics.fmean(picks)
+            std = statistics.pstdev(picks)
+            row.update(mean=mean, std=std, cv=std / abs(mean) if mean else float('nan'))
+        rows.append(row)
+    return rows
@@ -0,0 +1,2 @@
+from .cache import EMA, SMA, RSI, BollingerBands, CrossOver
+from .window import DiffAll
@@ -0,0 +1,160 @@
+import hashlib
+from array import array
+
+import backtrader as bt
+import numpy as np
+from backtrader import metabase
+from loguru import logger
+
+from .kernels import ema_line, sma_line, rsi_line, bollinger_lines, crossover_line
+
+# (数据指纹, 指标类型, 参数) -> 只读指标序列
+# 参数寻优时 cerebro 通过 fork 启动子进程, 主进程预热后的序列在所有网格点和子进程间共享
+_lines = {}
+
+_FUNCS = {
+    'ema': lambda values, period: (ema_line(values, period),),
+    'sma': lambda values, period: (sma_line(values, period),),
+    'rsi': lambda values, period: (rsi_line(values, period),),
+    'bbands': lambda values, period, devfactor: bollinger_lines(values, period, devfactor),
+}
+
+
+def fingerprint(values):
+    """数据指纹, 相同的收盘价序列得到相同的指纹"""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    return f"{len(values)}-{hashlib.blake2b(values.data, digest_size=16).hexdigest()}"
+
+
+def get_lines(values, kind, fp=None, **params):
+    """取指标序列, 未命中时计算并缓存; 返回的数组为只读"""
+    if fp is None:
+        fp = fingerprint(values)
+    key = (fp, kind, tuple(sorted(params.items())))
+    lines = _lines.get(key)
+    if lines is None:
+        lines = _FUNCS[kind](np.asarray(values, dtype=np.float64), **params)
+        for line in lines:
+            line.setflags(write=False)
+        _lines[key] = lines
+        logger.debug(f"indicator cache miss {kind} {params} ({len(_lines)} cached)")
+    return lines
+
+
+def warm(values, specs):
+    """
+    预先计算一组指标, 在 cerebro.run() 之前调用, 子进程即可直接复用
+    :param specs: [(kind, params), ...]
+    """
+    fp = fingerprint(values)
+    for kind, params in specs:
+        get_lines(values, kind, fp=fp, **params)
+    logger.info(f"indicator cache warmed {len(specs)} series")
+
+
+def clear():
+    _lines.clear()
+
+
+def _buffer_fingerprint(buffer):
+    """同一个数据源在一次寻优中被所有网格点复用, 指纹只计算一次"""
+    cached = getattr(buffer, '_memo_fingerprint', None)
+    if cached is None or cached[0] != len(buffer.array):
+        cached = (len(buffer.array), fingerprint(np.frombuffer(buffer.array, dtype=np.float64)))
+        buffer._memo_fingerprint = cached
+    return cached[1]
+
+
+class _MemoIndicator(bt.Indicator):
+    """从缓存中拷贝整段序列的指标, 只用于 runonce + preload 模式"""
+    kind = None
+
+    def _lookback(self):
+        return self.p.period
+
+    def __init__(self):
+        self.addminperiod(self._lookback())
+
+    def once(self, start, end):
+        buffer = self.data.lines[0]
+        values = np.frombuffer(buffer.array, dtype=np.float64)
+        lines = get_lines(values, self.kind, fp=_buffer_fingerprint(buffer), **self.p._getkwargs())
+        for line, series in zip(self.lines, lines):
+            line.array[start:end] = array('d', series[start:end].tobytes())
+
+
+class MemoEMA(_MemoIndicator):
+    kind = 'ema'
+    lines = ('ema',)
+    params = (('period', 30),)
+
+
+class MemoSMA(_MemoIndicator):
+    kind = 'sma'
+    lines = ('sma',)
+    params = (('period', 30),)
+
+
+class MemoRSI(_MemoIndicator):
+    kind = 'rsi'
+    lines = ('rsi',)
+    params = (('period', 14),)
+
+    def _lookback(self):
+        return self.p.period + 1
+
+
+class MemoBollingerBands(_MemoIndicator):
+    kind = 'bbands'
+    lines = ('mid', 'top', 'bot',)
+    params = (('period', 20), ('devfactor', 2.0),)
+
+
+class MemoCrossOver(bt.Indicator):
+    """两条已整段算好的输入线一次算出上穿/下穿, 只用于 runonce + preload 模式"""
+    lines = ('crossover',)
+
+    def __init__(self):
+        # 与 bt.indicators.CrossOver 相同, 比输入线多一根
+        self.addminperiod(2)
+
+    def once(self, start, end):
+        fast = np.frombuffer(self.data0.lines[0].array, dtype=np.float64)[:end]
+        slow = np.frombuffer(self.data1.lines[0].array, dtype=np.float64)[:end]
+        self.lines.crossover.array[start:end] = array('d', crossover_line(fast, slow)[start:end].tobytes())
+
+
+def _memoizable():
+    """策略运行在 runonce 模式 (回测) 时使用缓存, 实盘逐 bar 计算时仍使用 backtrader 指标"""
+    owner = metabase.findowner(None, bt.Strategy)
+    return owner is not None and getattr(owner.env, '_dorunonce', False)
+
+
+def EMA(data, period):
+    if _memoizable():
+        return MemoEMA(data, period=period)
+    return bt.indicators.EMA(data, period=period)
+
+
+def SMA(data, period):
+    if _memoizable():
+        return MemoSMA(data, period=period)
+    return bt.indicators.SimpleMovingAverage(data, period=period)
+
+
+def RSI(data, period):
+    if _memoizable():
+        return MemoRSI(data, period=period)
+    return bt.indicators.RSI(data, period=period)
+
+
+def BollingerBands(data, period, devfactor):
+    if _memoizable():
+        return MemoBollingerBands(data, period=period, devfactor=devfactor)
+    return bt.indicators.BollingerBands(data, period=period, devfactor=devfactor)
+
+
+def CrossOver(fast, slow):
+    if _memoizable():
+        return MemoCrossOver(fast, slow)
+    return bt.indicators.CrossOver(fast, slow)
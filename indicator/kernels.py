@@ -0,0 +1,186 @@
+"""
+可选的 numba 指标内核, 安装 numba 后 indicator.cache 和 vector 引擎自动使用, 未安装时退回 lines.py 的实现
+
+与 lines.py (以及 bt.indicators) 逐位一致:
+递推指标的运算顺序相同; 均线窗口用 Shewchuk 的非重叠分量精确维护窗口和, 再按 math.fsum 的方式舍入;
+平方/开方与 backtrader 一样调用 libm pow, 指数作为参数传入, 避免被编译成 x * x
+"""
+import math
+
+import numpy as np
+
+from . import lines
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKEND = 'numba' if numba is not None else 'python'
+
+if numba is not None:
+    _jit = numba.njit(cache=True, nogil=True)
+
+    @_jit
+    def _add_partial(partials, n, x):
+        """把 x 加入非重叠分量 partials[:n], 返回新的分量个数, 分量之和始终等于精确和"""
+        i = 0
+        for j in range(n):
+            y = partials[j]
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo != 0.0:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i] = x
+        return i + 1
+
+    @_jit
+    def _round_partials(partials, n):
+        """math.fsum 的最后一步: 从最大的分量开始累加, 处理恰好在两个浮点数中间的舍入"""
+        hi = 0.0
+        if n > 0:
+            n -= 1
+            hi = partials[n]
+            lo = 0.0
+            while n > 0:
+                x = hi
+                n -= 1
+                y = partials[n]
+                hi = x + y
+                lo = y - (hi - x)
+                if lo != 0.0:
+                    break
+            if n > 0 and ((lo < 0.0 and partials[n - 1] < 0.0) or (lo > 0.0 and partials[n - 1] > 0.0)):
+                y = lo * 2.0
+                x = hi + y
+                if y == x - hi:
+                    hi = x
+        return hi
+
+    @_jit
+    def _sma(values, period, out):
+        # 双精度的非重叠分量最多约 40 个
+        partials = np.empty(64)
+        n = 0
+        for i in range(len(values)):
+            n = _add_partial(partials, n, values[i])
+            if i >= period:
+                n = _add_partial(partials, n, -values[i - period])
+            if i >= period - 1:
+                out[i] = _round_partials(partials, n) / period
+
+    @_jit
+    def _smooth(values, start, seed, alpha, out):
+        alpha1 = 1.0 - alpha
+        prev = seed
+        out[start] = prev
+        for i in range(start + 1, len(values)):
+            prev = prev * alpha1 + values[i] * alpha
+            out[i] = prev
+
+    @_jit
+    def _pow(values, exponent, out):
+        for i in range(len(values)):
+            out[i] = abs(values[i]) ** exponent
+
+    @_jit
+    def _crossover(fast, slow, out):
+        nzd = np.nan
+        for i in range(len(fast)):
+            diff = fast[i] - slow[i]
+            if math.isnan(nzd):
+                # 第一个有效差值作为种子, 即使为 0
+                nzd = diff
+                continue
+            if nzd < 0.0 and fast[i] > slow[i]:
+                out[i] = 1.0
+            elif nzd > 0.0 and fast[i] < slow[i]:
+                out[i] = -1.0
+            else:
+                out[i] = 0.0
+            if diff != 0.0 and not math.isnan(diff):
+                nzd = diff
+
+
+def _check(values):
+    if not np.isfinite(values).all():
+        raise ValueError("收盘价包含 NaN/inf, 无法计算均线")
+
+
+def sma_line(close, period):
+    if numba is None:
+        return lines.sma_line(close, period)
+    line = np.full(len(close), np.nan)
+    if len(close) >= period:
+        _check(close)
+        _sma(close, period, line)
+    return line
+
+
+def _smoothed(values, period, first, alpha):
+    """以 values[first:first+period] 的算术平均为种子的指数平滑"""
+    line = np.full(len(values), np.nan)
+    seed = first + period - 1
+    if len(values) > seed:
+        start = math.fsum(values[first:seed + 1].tolist()) / period
+        _smooth(values, seed, start, alpha, line)
+    return line
+
+
+def smma_line(values, period, first=0):
+    if numba is None:
+        return lines.smma_line(values, period, first)
+    return _smoothed(values, period, first, 1.0 / period)
+
+
+def ema_line(close, period):
+    if numba is None:
+        return lines.ema_line(close, period)
+    return _smoothed(close, period, 0, 2.0 / (1.0 + period))
+
+
+def rsi_line(close, period):
+    if numba is None:
+        return lines.rsi_line(close, period)
+    n = len(close)
+    up = np.full(n, np.nan)
+    down = np.full(n, np.nan)
+    if n > 1:
+        up[1:] = np.maximum(close[1:] - close[:-1], 0.0)
+        down[1:] = np.maximum(close[:-1] - close[1:], 0.0)
+    maup = smma_line(up, period, first=1)
+    madown = smma_line(down, period, first=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = maup / madown
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def bollinger_lines(close, period, devfactor):
+    if numba is None:
+        return lines.bollinger_lines(close, period, devfactor)
+    n = len(close)
+    mid = sma_line(close, period)
+    if n < period:
+        return mid, mid.copy(), mid.copy()
+
+    squares = np.empty(n)
+    _pow(close, 2.0, squares)
+    meansq = sma_line(squares, period)
+    _pow(mid[period - 1:], 2.0, squares[:n - period + 1])
+    var = meansq[period - 1:] - squares[:n - period + 1]
+    stddev = np.full(n, np.nan)
+    _pow(var, 0.5, stddev[period - 1:])
+    stddev[period - 1:] *= devfactor
+    return mid, mid + stddev, mid - stddev
+
+
+def crossover_line(fast, slow):
+    if numba is None:
+        return lines.crossover_line(fast, slow)
+    cross = np.full(len(fast), np.nan)
+    _crossover(np.ascontiguousarray(fast), np.ascontiguousarray(slow), cross)
+    return cross
@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+
+
+def sma_line(close, period):
+    """
+    与 bt.indicators.SMA 逐位一致的简单均线
+    backtrader 每个窗口用 math.fsum 求和, 这里把收盘价换成同分母的整数做前缀和,
+    整数相除的结果同样是正确舍入的, 不需要逐窗口 fsum
+    """
+    n = len(close)
+    line = np.full(n, np.nan)
+    if n < period:
+        return line
+    if not np.isfinite(close).all():
+        raise ValueError("收盘价包含 NaN/inf, 无法计算均线")
+
+    ratios = [x.as_integer_ratio() for x in close.tolist()]
+    denom = max(d for _, d in ratios)
+    prefix = [0]
+    acc = 0
+    for num, d in ratios:
+        acc += num * (denom // d)
+        prefix.append(acc)
+
+    line[period - 1:] = [(prefix[i + 1] - prefix[i + 1 - period]) / denom / period for i in range(period - 1, n)]
+    return line
+
+
+def ema_line(close, period):
+    """与 bt.indicators.EMA 逐位一致的指数均线, 以前 period 根的算术平均作为种子"""
+    n = len(close)
+    line = np.full(n, np.nan)
+    if n < period:
+        return line
+
+    alpha = 2.0 / (1.0 + period)
+    alpha1 = 1.0 - alpha
+    values = close.tolist()
+    prev = math.fsum(values[:period]) / period
+    out = [prev]
+    for x in values[period:]:
+        prev = prev * alpha1 + x * alpha
+        out.append(prev)
+    line[period - 1:] = out
+    return line
+
+
+def crossover_line(fast, slow):
+    """与 bt.indicators.CrossOver 一致: 上穿为 1, 下穿为 -1, 其他为 0"""
+    diff = fast - slow
+    valid = ~np.isnan(diff)
+    cross = np.full(len(diff), np.nan)
+    if not valid.any():
+        return cross
+
+    # NonZeroDifference: 差值为 0 时沿用上一个非零差值, 第一个有效值作为种子
+    first = int(np.argmax(valid))
+    keep = valid & (diff != 0)
+    keep[first] = True
+    idx = np.maximum.accumulate(np.where(keep, np.arange(len(diff)), 0))
+    nzd = diff[idx]
+
+    up = (nzd[first:-1] < 0.0) & (fast[first + 1:] > slow[first + 1:])
+    down = (nzd[first:-1] > 0.0) & (fast[first + 1:] < slow[first + 1:])
+    cross[first + 1:] = up.astype(np.float64) - down.astype(np.float64)
+    return cross
+
+
+def smma_line(values, period, first=0):
+    """
+    与 bt.indicators.SMMA (Wilder 平滑) 逐位一致
+    :param first: values 中第一个有效值的下标, 种子为 values[first:first+period] 的算术平均
+    """
+    n = len(values)
+    line = np.full(n, np.nan)
+    seed = first + period - 1
+    if n <= seed:
+        return line
+
+    alpha = 1.0 / period
+    alpha1 = 1.0 - alpha
+    data = values.tolist()
+    prev = math.fsum(data[first:seed + 1]) / period
+    out = [prev]
+    for x in data[seed + 1:]:
+        prev = prev * alpha1 + x * alpha
+        out.append(prev)
+    line[seed:] = out
+    return line
+
+
+def rsi_line(close, period):
+    """与 bt.indicators.RSI 默认参数 (lookback=1, SMMA, 不做安全除法) 逐位一致"""
+    n = len(close)
+    up = np.full(n, np.nan)
+    down = np.full(n, np.nan)
+    if n > 1:
+        diff = close[1:] - close[:-1]
+        up[1:] = np.maximum(diff, 0.0)
+        down[1:] = np.maximum(close[:-1] - close[1:], 0.0)
+
+    maup = smma_line(up, period, first=1)
+    madown = smma_line(down, period, first=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = maup / madown
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def bollinger_lines(close, period, devfactor):
+    """与 bt.indicators.BollingerBands 默认参数 (SMA) 逐位一致, 返回 (mid, top, bot)"""
+    n = len(close)
+    mid = sma_line(close, period)
+    if n < period:
+        return mid, mid.copy(), mid.copy()
+
+    meansq = sma_line(np.array([x ** 2 for x in close.tolist()]), period)
+    var = meansq[period - 1:] - np.array([x ** 2 for x in mid[period - 1:].tolist()])
+    stddev = np.full(n, np.nan)
+    # 窗口价格不变时方差可能因舍入成为极小的负数, 按 StdDev(safepow=True) 取绝对值
+    stddev[period - 1:] = [devfactor * abs(v) ** 0.5 for v in var.tolist()]
+    return mid, mid + stddev, mid - stddev
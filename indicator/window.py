@@ -0,0 +1,53 @@
+import operator
+from array import array
+
+import backtrader as bt
+import numpy as np
+
+_OPS = {
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+}
+
+
+class DiffAll(bt.Indicator):
+    """
+    窗口内相邻差分全部满足条件时为 1, 否则为 0
+    窗口按由近到远排列 [x[-lag], x[-lag-1], ..., x[-lag-period+1]],
+    与 np.all(np.diff([x[-i] for i in range(lag, lag + period)]) <op> 0) 等价 (含 NaN 时为 0)
+    runonce 模式下整段向量化计算, 策略 next 中直接读取标量
+    """
+    lines = ('signal',)
+    params = (('period', 4), ('lag', 0), ('op', 'lt'),)
+
+    def qbuffer(self, savemem=0):
+        super().qbuffer(savemem)
+        # exactbars 模式下输入只保留最小周期个值, 窗口读到 x[-lag-period+1], 不改变最小周期
+        self.data.minbuffer(self.p.lag + self.p.period)
+
+    def next(self):
+        if len(self) < self.p.lag + self.p.period:
+            # 与 once 相同, 窗口超出数据起点时为 0
+            self.lines.signal[0] = 0.0
+            return
+        op = _OPS[self.p.op]
+        values = [self.data[-i] for i in range(self.p.lag, self.p.lag + self.p.period)]
+        self.lines.signal[0] = float(all(op(b - a, 0) for a, b in zip(values, values[1:])))
+
+    def once(self, start, end):
+        op = _OPS[self.p.op]
+        x = np.frombuffer(self.data.lines[0].array, dtype=np.float64)[:end]
+        # ok[j]: x[j-1] - x[j] 满足条件, 即窗口中由近到远相邻两点
+        ok = np.zeros(end, dtype=bool)
+        ok[1:] = op(x[:-1] - x[1:], 0)
+        signal = np.zeros(end)
+        first = self.p.lag + self.p.period - 1
+        if end > first:
+            hits = np.ones(end - first, dtype=bool)
+            for k in range(self.p.period - 1):
+                lo = first - self.p.lag - k
+                hits &= ok[lo:lo + end - first]
+            signal[first:] = hits
+        self.lines.signal.array[start:end] = array('d', signal[start:end].tobytes())
@@ -0,0 +1 @@
+from .policy import configure
@@ -0,0 +1,35 @@
+import os
+import sys
+
+from loguru import logger
+
+ENV_LEVEL = 'SIGNAL_TRADING_LOG_LEVEL'
+
+# 热路径日志开关, 调用方先判断再拼接消息:
+#     from logpolicy import policy as log
+#     if log.DEBUG:
+#         logger.debug(f"...")
+# 级别关闭时 f-string 不会被格式化, 也不会进入 loguru 的分发流程
+DEBUG = True
+INFO = True
+WARNING = True
+
+
+def configure(level):
+    """
+    设置全局日志级别, 更新热路径开关并重建 stderr 输出
+    级别写入环境变量, spawn 方式启动的子进程导入本模块时自动沿用; fork 的子进程直接继承开关
+    """
+    global DEBUG, INFO, WARNING
+    level = level.upper()
+    no = logger.level(level).no
+    DEBUG = no <= logger.level('DEBUG').no
+    INFO = no <= logger.level('INFO').no
+    WARNING = no <= logger.level('WARNING').no
+    os.environ[ENV_LEVEL] = level
+    logger.remove()
+    logger.add(sys.stderr, level=level)
+
+
+if os.environ.get(ENV_LEVEL):
+    configure(os.environ[ENV_LEVEL])
@@ -0,0 +1,2 @@
+from .counters import attach, pool_map
+from .session import ProfileSession
@@ -0,0 +1,158 @@
+import functools
+import os
+import time
+
+import backtrader as bt
+
+ENV_PROFILE = 'SIGNAL_TRADING_PROFILE'
+
+# 需要计时的回调: 基类 -> 方法名
+CALLBACKS = (
+    (bt.Strategy, ('next', 'notify_order')),
+    (bt.BrokerBase, ('next', 'update_order')),
+    (bt.feed.AbstractDataBase, ('_load',)),
+)
+
+# 本进程的计时 {"类名.方法": [调用次数, 总用时]}
+_local = {}
+# 从子进程汇总回来的计时
+_remote = {}
+_enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def _subclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        yield from _subclasses(sub)
+
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            counter = _local.get(name)
+            if counter is None:
+                counter = _local[name] = [0, 0.0]
+            counter[0] += 1
+            counter[1] += time.perf_counter() - start
+
+    wrapper._profiled = True
+    return wrapper
+
+
+def instrument():
+    """
+    给已导入的策略/broker/数据源类的回调加上计时, 只包装类自身定义的方法
+    在创建进程池之前调用, fork 出的子进程直接继承; spawn 的子进程通过环境变量在导入时重新包装
+    """
+    global _enabled
+    for base, names in CALLBACKS:
+        for cls in [base, *_subclasses(base)]:
+            for name in names:
+                func = cls.__dict__.get(name)
+                if func is None or getattr(func, '_profiled', False):
+                    continue
+                setattr(cls, name, _timed(f"{cls.__name__}.{name}", func))
+    _enabled = True
+    os.environ[ENV_PROFILE] = '1'
+
+
+def snapshot():
+    """本进程及已汇总子进程的计时总和"""
+    total = {}
+    for counters in (_local, _remote):
+        for name, (calls, seconds) in counters.items():
+            counter = total.setdefault(name, [0, 0.0])
+            counter[0] += calls
+            counter[1] += seconds
+    return total
+
+
+def diff(after, before):
+    delta = {}
+    for name, (calls, seconds) in after.items():
+        prev_calls, prev_seconds = before.get(name, (0, 0.0))
+        if calls != prev_calls:
+            delta[name] = [calls - prev_calls, seconds - prev_seconds]
+    return delta
+
+
+def merge(counters):
+    """合并子进程回传的计时"""
+    for name, (calls, seconds) in counters.items():
+        counter = _remote.setdefault(name, [0, 0.0])
+        counter[0] += calls
+        counter[1] += seconds
+
+
+def summary(counters):
+    lines = [f"{'callback':<40}{'calls':>12}{'total(s)':>12}{'mean(us)':>12}"]
+    for name, (calls, seconds) in sorted(counters.items(), key=lambda item: item[1][1], reverse=True):
+        lines.append(f"{name:<40}{calls:>12}{seconds:>12.3f}{seconds / calls * 1e6:>12.1f}")
+    return '\n'.join(lines)
+
+
+def collect_optreturn(result):
+    """
+    cerebro.optcallback: 汇总寻优子进程中 CallbackTiming 分析器记录的计时
+    maxcpus=1 时策略在本进程运行, 计时已经在 _local 中, 不重复累加
+    """
+    from analyzer.CallbackTiming import CallbackTiming
+    for strategy in result:
+        for analyzer in strategy.analyzers:
+            if isinstance(analyzer, CallbackTiming):
+                rets = analyzer.get_analysis()
+                if rets['pid'] != os.getpid():
+                    merge(rets['counters'])
+
+
+def attach(cerebro):
+    """开启 --profile 时给 cerebro 加上计时分析器, 并在寻优时汇总子进程计时"""
+    if not _enabled:
+        return cerebro
+    from analyzer.CallbackTiming import CallbackTiming
+    cerebro.addanalyzer(CallbackTiming)
+    cerebro.optcallback(collect_optreturn)
+    return cerebro
+
+
+class _Collect:
+    """进程池任务包装, 任务结果和本次任务期间的计时一起回传"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, job):
+        before = snapshot()
+        result = self.func(job)
+        return result, diff(snapshot(), before), os.getpid()
+
+
+def pool_map(pool, func, jobs):
+    """pool.map, 开启 --profile 时汇总各子进程的计时"""
+    if not _enabled:
+        yield from pool.map(func, jobs)
+        return
+    for result, counters, pid in pool.map(_Collect(func), jobs):
+        if pid != os.getpid():
+            merge(counters)
+        yield result
+
+
+def report():
+    counters = snapshot()
+    if counters:
+        # 与结果行一样直接打印, --quiet 时也能看到
+        print(f"callback timing\n{summary(counters)}")
+    return counters
+
+
+if os.environ.get(ENV_PROFILE):
+    instrument()
@@ -0,0 +1,81 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from loguru import logger
+
+from . import counters
+
+
+class StackSampler(threading.Thread):
+    """定时采样主线程调用栈, 输出 flamegraph.pl / speedscope 可直接读取的 collapsed stack 格式"""
+
+    def __init__(self, interval=0.005):
+        super(StackSampler, self).__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.thread_id = threading.main_thread().ident
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    """
+    --profile: cProfile + 调用栈采样 + 回调计时
+    输出 {prefix}.pstats / {prefix}.collapsed / {prefix}.counters.json
+    cProfile 和采样只覆盖主进程, 寻优时用 --maxcpus 1 可以拿到完整的调用栈; 回调计时会汇总所有子进程
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler()
+        self.started = None
+
+    def start(self):
+        directory = os.path.dirname(self.prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        counters.instrument()
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profiler.enable()
+        logger.info(f"profile enabled, output: {self.prefix}.*")
+
+    def stop(self):
+        self.profiler.disable()
+        self.sampler.stop()
+        elapsed = time.perf_counter() - self.started
+
+        self.profiler.dump_stats(f"{self.prefix}.pstats")
+        self.sampler.dump(f"{self.prefix}.collapsed")
+        totals = counters.report()
+        with open(f"{self.prefix}.counters.json", 'w') as f:
+            json.dump({'elapsed': elapsed,
+                       'callbacks': {name: {'calls': calls, 'seconds': seconds}
+                                     for name, (calls, seconds) in totals.items()}}, f, indent=2)
+        logger.info(f"profile saved: {self.prefix}.pstats {self.prefix}.collapsed {self.prefix}.counters.json "
+                    f"用时:{elapsed:.1f}s")
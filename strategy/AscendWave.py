@@ -3,6 +3,9 @@ import sys
 import backtrader as bt
 from loguru import logger
 
+import indicator
+from logpolicy import policy as log
+
 
 class AscendWave(bt.Strategy):
     """
@@ -33,11 +36,11 @@ class AscendWave(bt.Strategy):
         self.dataclose = self.datas[0].close
         self.low = self.data.low
 
-        self.short_ma = bt.indicators.EMA(self.data.close, period=self.params.short_period)
-        self.long_ma = bt.indicators.EMA(self.data.close, period=self.params.long_period)
-        self.rsi = bt.indicators.RelativeStrengthIndex(period=self.params.rsi_period)
-        self.boll = bt.indicators.BollingerBands(period=self.params.bollinger_period,
-                                                 devfactor=self.params.bollinger_dev)
+        self.short_ma = indicator.EMA(self.data.close, period=self.params.short_period)
+        self.long_ma = indicator.EMA(self.data.close, period=self.params.long_period)
+        self.rsi = indicator.RSI(self.data.close, period=self.params.rsi_period)
+        self.boll = indicator.BollingerBands(self.data.close, period=self.params.bollinger_period,
+                                             devfactor=self.params.bollinger_dev)
         self.op = bt.Order.Buy
         self.commission = 0
 
@@ -50,10 +53,12 @@ class AscendWave(bt.Strategy):
     def stop(self):
         size = self.getposition(self.data).size
         cash = self.broker.getcash()
-        logger.info(f"cash:{cash} size:{size} commission:{self.commission}")
+        if log.INFO:
+            logger.info(f"cash:{cash} size:{size} commission:{self.commission}")
 
     def notify_order(self, order):
-        logger.info(order)
+        if log.INFO:
+            logger.info(order)
         if order.status == bt.Order.Completed:
             if order.info[self.AscendWaveType] == self.ASCEND:
                 pass
@@ -74,11 +79,13 @@ class AscendWave(bt.Strategy):
             if commission < 0:
                 commission = commission * -1
             self.commission += commission
-            logger.info(f"position:{position:.8f} cach:{cash:.4f} commission:{commission}")
+            if log.INFO:
+                logger.info(f"position:{position:.8f} cach:{cash:.4f} commission:{commission}")
 
     def next(self):
         if len(self.datas[0]) < max(self.params.short_period, self.params.long_period, self.params.rsi_period):
-            logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
             return
 
         self._buy_interval += 1
@@ -106,23 +113,26 @@ class AscendWave(bt.Strategy):
 
         if self.boll.lines.bot[0] <= current_close < self.boll.lines.mid[0]:
             if current_close < self.boll.lines.mid[0] * (1-self.params.net_profit) :
-                logger.info(f"[布林带底部] {current_close} 买单价:{self._buy_price} 当前价:{current_close}")
+                if log.INFO:
+                    logger.info(f"[布林带底部] {current_close} 买单价:{self._buy_price} 当前价:{current_close}")
                 order = self._buy_order()
                 if order:
                     return
 
         if self._buy_price != 0:
             if current_close < self._buy_price * (1 - self.params.stop_loss):
-                logger.info(
-                    f"[止损] {self.datas[0].datetime.datetime(0)} 买单价:{self._buy_price} 当前价:{current_close}")
+                if log.INFO:
+                    logger.info(
+                        f"[止损] {self.datas[0].datetime.datetime(0)} 买单价:{self._buy_price} 当前价:{current_close}")
                 order = self._sell_order()
                 if order:
                     return
 
 
             if current_close > self._buy_price * (1 + self.params.net_profit):
-                logger.info(
-                    f"[止盈] {self.datas[0].datetime.datetime(0)} 买单价:{self._buy_price} 当前价:{current_close}")
+                if log.INFO:
+                    logger.info(
+                        f"[止盈] {self.datas[0].datetime.datetime(0)} 买单价:{self._buy_price} 当前价:{current_close}")
                 order = self._sell_order()
                 if order:
                     return
@@ -140,7 +150,8 @@ class AscendWave(bt.Strategy):
         order = self.buy(price=current_close, size=size, exectype=bt.Order.Limit, AscendWaveType=self.ASCEND)
         self._open_order = True
         self._buy_price = current_close
-        logger.debug(f"买入订单.{current_time} 价格:{current_close} 数量:{size:.8f} cash:{cash}")
+        if log.DEBUG:
+            logger.debug(f"买入订单.{current_time} 价格:{current_close} 数量:{size:.8f} cash:{cash}")
         self._buy_interval = 0
 
         return order
@@ -156,8 +167,9 @@ class AscendWave(bt.Strategy):
         size = self.getposition(self.data).size
         order = self.sell(price=self.data.close[0], size=size, exectype=bt.Order.Limit, AscendWaveType=self.ASCEND)
         self._open_order = True
-        logger.debug(
-            f"卖出订单. {current_time} 买单价格:{self._buy_price} 当前价格:{current_close} 数量:{size:.8f} 浮盈:{((current_close * size) - (self._buy_price * size)):.4f}")
+        if log.DEBUG:
+            logger.debug(
+                f"卖出订单. {current_time} 买单价格:{self._buy_price} 当前价格:{current_close} 数量:{size:.8f} 浮盈:{((current_close * size) - (self._buy_price * size)):.4f}")
         self._buy_price = 0
         self._buy_interval = 0
 
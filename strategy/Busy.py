@@ -1,6 +1,9 @@
 import backtrader as bt
 from loguru import logger
 
+import indicator
+from logpolicy import policy as log
+
 
 class Busy(bt.Strategy):
     """
@@ -25,19 +28,21 @@ class Busy(bt.Strategy):
         # self.short_ma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.short_period)
         # self.long_ma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.long_period)
 
-        self.short_ma = bt.indicators.EMA(self.data.close, period=self.params.short_period)
-        self.long_ma = bt.indicators.EMA(self.data.close, period=self.params.long_period)
+        self.short_ma = indicator.EMA(self.data.close, period=self.params.short_period)
+        self.long_ma = indicator.EMA(self.data.close, period=self.params.long_period)
 
         self.buy_price = None
         self._open_order = None
         self.op = bt.Order.Buy
         self.commission = 0
-        logger.info(f"Init Busy strategy params: {self.params.__dict__}")
+        if log.INFO:
+            logger.info(f"Init Busy strategy params: {self.params.__dict__}")
 
     def next(self):
         # 获取最近N个Bar的数据
         if len(self.datas[0]) < self.params.long_period:
-            logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
             return
         if self._open_order and self.op == bt.Order.Sell:
             # TODO 达到风险控制，没有完成的买单要及时撤单
@@ -45,22 +50,25 @@ class Busy(bt.Strategy):
             # 检查止损条件
             if self.data.close[0] <= self.buy_price * (1 - self.params.stop_loss):
                 position = self.getposition(self.data).size
-                logger.warning(f"触发止损条件({self.data.close[0] <= self.buy_price * (1 - self.params.stop_loss)})"
-                               f"买单价格:{self.buy_price} 当前价格{self.data.close[0]} time:{self.datas[0].datetime.datetime(0)}")
+                if log.WARNING:
+                    logger.warning(f"触发止损条件({self.data.close[0] <= self.buy_price * (1 - self.params.stop_loss)})"
+                                   f"买单价格:{self.buy_price} 当前价格{self.data.close[0]} time:{self.datas[0].datetime.datetime(0)}")
                 self.buy_price = 0
                 size = position
                 self.sell(price=self.data.close[0], size=size, exectype=bt.Order.Limit)
                 self._open_order = True
                 self.op = bt.Order.Buy
-                logger.warning(f"sell stop loss order price:{self.datas[0].close[0]} size:{size}")
+                if log.WARNING:
+                    logger.warning(f"sell stop loss order price:{self.datas[0].close[0]} size:{size}")
             return
 
         if self._open_order:
             return
         # 风险控制，不开新仓
         if self.data.close[0] < self.long_ma[0]:
-            logger.warning(
-                f"触发风险控制,暂停开单 {self.datas[0].datetime.datetime(0)} 当前价低于长均线:{self.data.close[0]}<{self.long_ma[0]}")
+            if log.WARNING:
+                logger.warning(
+                    f"触发风险控制,暂停开单 {self.datas[0].datetime.datetime(0)} 当前价低于长均线:{self.data.close[0]}<{self.long_ma[0]}")
             return
 
         # 获取当前头寸
@@ -70,32 +78,36 @@ class Busy(bt.Strategy):
         if self.op == bt.Order.Buy:  # 当前无任何订单
             # 检查开仓条件
             if self.data.close[0] <= self.short_ma[0] * (1 - self.params.below):
-                logger.debug(f"触发开仓条件:({self.data.close[0]} <= {self.short_ma[0] * (1 - self.params.below)}) "
-                             f"position:{position} "
-                             f"cash:{cash} "
-                             f"short_ma:{self.short_ma[0]} "
-                             f"time: {self.datas[0].datetime.datetime(0)}")
+                if log.DEBUG:
+                    logger.debug(f"触发开仓条件:({self.data.close[0]} <= {self.short_ma[0] * (1 - self.params.below)}) "
+                                 f"position:{position} "
+                                 f"cash:{cash} "
+                                 f"short_ma:{self.short_ma[0]} "
+                                 f"time: {self.datas[0].datetime.datetime(0)}")
 
                 self.buy_price = self.data.close[0]
                 size = cash / self.buy_price
                 self.buy(price=self.buy_price, size=size, exectype=bt.Order.Limit)
                 self._open_order = True
-                logger.debug(f"buy order price:{self.buy_price} size:{size} exectype:{bt.Order.Limit}")
+                if log.DEBUG:
+                    logger.debug(f"buy order price:{self.buy_price} size:{size} exectype:{bt.Order.Limit}")
 
         else:  # 当前已存在买单，
             # 检查止盈条件
             if self.data.close[0] >= self.buy_price * (1 + self.params.net_profit):
-                logger.debug(f"触发止盈条件:({self.data.close[0]} >= {self.buy_price * (1 + self.params.net_profit)} "
-                             f"position:{position} "
-                             f"cash:{cash} "
-                             f"buy_price:{self.buy_price} "
-                             f"time:{self.datas[0].datetime.datetime(0)} ")
+                if log.DEBUG:
+                    logger.debug(f"触发止盈条件:({self.data.close[0]} >= {self.buy_price * (1 + self.params.net_profit)} "
+                                 f"position:{position} "
+                                 f"cash:{cash} "
+                                 f"buy_price:{self.buy_price} "
+                                 f"time:{self.datas[0].datetime.datetime(0)} ")
                 self.buy_price = 0
                 size = position
                 # TODO 使用最高价卖出
                 self.sell(price=self.data.close[0], size=size, exectype=bt.Order.Limit)
                 self._open_order = True
-                logger.debug(f"sell order price:{self.datas[0].close[0]} size:{size}")
+                if log.DEBUG:
+                    logger.debug(f"sell order price:{self.datas[0].close[0]} size:{size}")
 
     def notify_order(self, order):
         if order.status == bt.Order.Completed:
@@ -109,7 +121,9 @@ class Busy(bt.Strategy):
             if commission <0:
                 commission = commission * -1
             self.commission += commission
-            logger.info(f"position:{position:.8f} cach:{cash:.4f} commission:{commission}")
+            if log.INFO:
+                logger.info(f"position:{position:.8f} cach:{cash:.4f} commission:{commission}")
 
     def stop(self):
-        logger.info(f"commission:{self.commission}")
\ No newline at end of file
+        if log.INFO:
+            logger.info(f"commission:{self.commission}")
\ No newline at end of file
@@ -1,6 +1,9 @@
 import backtrader as bt
 from loguru import logger
 
+import indicator
+from logpolicy import policy as log
+
 class EMA(bt.Strategy):
     params = (
         ('period', 7),
@@ -10,10 +13,12 @@ class EMA(bt.Strategy):
     )
 
     def __init__(self):
-        self.ema_short = bt.indicators.EMA(self.datas[0], period=self.params.period)
+        self.ema_short = indicator.EMA(self.datas[0], period=self.params.period)
         self._open_order = 0
         self.op = bt.Order.Buy
-        logger.info(f"Init EMA strategy params: {self.params.__dict__}")
+        self.commission = 0
+        if log.INFO:
+            logger.info(f"Init EMA strategy params: {self.params.__dict__}")
 
     def next(self):
         # 获取最近N个Bar的数据
@@ -21,7 +26,8 @@ class EMA(bt.Strategy):
             return
 
         if self.p.debug:
-            logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
 
         if self._open_order != 0:
             return
@@ -30,7 +36,8 @@ class EMA(bt.Strategy):
         position = self.getposition(self.data).size
         cash = self.broker.getcash()
         if self.p.debug:
-            logger.debug(f"position:{position} cash:{cash} avg_price:{self.ema_short[0]} close:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"position:{position} cash:{cash} avg_price:{self.ema_short[0]} close:{self.datas[0].close[0]}")
 
         buy_price = self.ema_short[0] * (1 - self.params.below)
         sell_price = self.ema_short[0] * (1 + self.params.above)
@@ -40,7 +47,8 @@ class EMA(bt.Strategy):
                 order = self.buy(price=self.datas[0].close[0], size=size, exectype=bt.Order.Limit)
                 self._open_order += 1
                 if self.p.debug:
-                    logger.debug(f"buy order price:{self.datas[0].close[0]} size:{size} exectype:{bt.Order.Limit}")
+                    if log.DEBUG:
+                        logger.debug(f"buy order price:{self.datas[0].close[0]} size:{size} exectype:{bt.Order.Limit}")
 
         elif self.datas[0].close[0] > sell_price:
             if self.op == bt.Order.Sell:
@@ -48,17 +56,23 @@ class EMA(bt.Strategy):
                 order = self.sell(price=self.datas[0].close[0], size=size, exectype=bt.Order.Limit)
                 self._open_order += 1
                 if self.p.debug:
-                    logger.debug(f"sell order price:{self.datas[0].close[0]} size:{size}")
+                    if log.DEBUG:
+                        logger.debug(f"sell order price:{self.datas[0].close[0]} size:{size}")
 
     def notify_order(self, order):
         if order.status == bt.Order.Completed:
             self._open_order -= 1
             action = bt.Order.Sell if order.isbuy() else bt.Order.Buy
             self.op = action
+            commission = order.size * order.price * 0.001
+            if commission < 0:
+                commission = commission * -1
+            self.commission += commission
 
 
     def stop(self):
-        logger.info(f'参数: {self.params.__dict__} 现金: {self.broker.get_cash():.4f} 持仓: {self.getposition(self.data).size:.4f} 总资产: {self.broker.get_value():.4f}')
+        if log.INFO:
+            logger.info(f'参数: {self.params.__dict__} 现金: {self.broker.get_cash():.4f} 持仓: {self.getposition(self.data).size:.4f} 总资产: {self.broker.get_value():.4f}')
 
     def get_decimal_places(self, number):
         """获取小数点后位数"""
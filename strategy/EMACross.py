@@ -1,6 +1,9 @@
 import backtrader as bt
 from loguru import logger
 
+import indicator
+from logpolicy import policy as log
+
 class EMA_Crossover(bt.Strategy):
     params = (
         ('short_period', 7),  # 短期EMA周期
@@ -9,19 +12,22 @@ class EMA_Crossover(bt.Strategy):
     )
 
     def __init__(self):
-        self.ema_short = bt.indicators.EMA(self.datas[0], period=self.params.short_period)
-        self.ema_long = bt.indicators.EMA(self.datas[0], period=self.params.long_period)
-        self.crossover = bt.indicators.CrossOver(self.ema_short, self.ema_long)
+        self.ema_short = indicator.EMA(self.datas[0], period=self.params.short_period)
+        self.ema_long = indicator.EMA(self.datas[0], period=self.params.long_period)
+        self.crossover = indicator.CrossOver(self.ema_short, self.ema_long)
         self._open_order = 0
         self.op = bt.Order.Buy
-        logger.info(f"Init EMA Crossover strategy params: {self.params.__dict__}")
+        self.commission = 0
+        if log.INFO:
+            logger.info(f"Init EMA Crossover strategy params: {self.params.__dict__}")
 
     def next(self):
         if len(self.datas[0]) < self.params.long_period:
             return
 
         if self.p.debug:
-            logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
 
         if self._open_order != 0:
             return
@@ -29,7 +35,8 @@ class EMA_Crossover(bt.Strategy):
         position = self.getposition(self.data).size
         cash = self.broker.getcash()
         if self.p.debug:
-            logger.debug(f"position:{position} cash:{cash} short_ema:{self.ema_short[0]} long_ema:{self.ema_long[0]} close:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"position:{position} cash:{cash} short_ema:{self.ema_short[0]} long_ema:{self.ema_long[0]} close:{self.datas[0].close[0]}")
 
         if self.crossover > 0:  # 黄金交叉，买入
             if self.op == bt.Order.Buy:
@@ -37,7 +44,8 @@ class EMA_Crossover(bt.Strategy):
                 order = self.buy(price=self.datas[0].close[0], size=size, exectype=bt.Order.Limit)
                 self._open_order += 1
                 if self.p.debug:
-                    logger.debug(f"buy order price:{self.datas[0].close[0]} size:{size} exectype:{bt.Order.Limit}")
+                    if log.DEBUG:
+                        logger.debug(f"buy order price:{self.datas[0].close[0]} size:{size} exectype:{bt.Order.Limit}")
 
         elif self.crossover < 0:  # 死亡交叉，卖出
             if self.op == bt.Order.Sell:
@@ -45,13 +53,19 @@ class EMA_Crossover(bt.Strategy):
                 order = self.sell(price=self.datas[0].close[0], size=size, exectype=bt.Order.Limit)
                 self._open_order += 1
                 if self.p.debug:
-                    logger.debug(f"sell order price:{self.datas[0].close[0]} size:{size}")
+                    if log.DEBUG:
+                        logger.debug(f"sell order price:{self.datas[0].close[0]} size:{size}")
 
     def notify_order(self, order):
         if order.status == bt.Order.Completed:
             self._open_order -= 1
             action = bt.Order.Sell if order.isbuy() else bt.Order.Buy
             self.op = action
+            commission = order.size * order.price * 0.001
+            if commission < 0:
+                commission = commission * -1
+            self.commission += commission
 
     def stop(self):
-        logger.info(f'参数: short_period={self.params.short_period}, long_period={self.params.long_period} 现金: {self.broker.get_cash():.4f} 持仓: {self.getposition(self.data).size:.4f} 总资产: {self.broker.get_value():.4f}')
\ No newline at end of file
+        if log.INFO:
+            logger.info(f'参数: short_period={self.params.short_period}, long_period={self.params.long_period} 现金: {self.broker.get_cash():.4f} 持仓: {self.getposition(self.data).size:.4f} 总资产: {self.broker.get_value():.4f}')
\ No newline at end of file
@@ -2,6 +2,9 @@ import backtrader as bt
 from loguru import logger
 import numpy as np
 
+import indicator
+from logpolicy import policy as log
+
 
 class Oscillation(bt.Strategy):
     params = (
@@ -11,12 +14,16 @@ class Oscillation(bt.Strategy):
         ('rsi_buy_signal', 40),  # 中期RSI周期
         ('stop_loss', 0.1),  # 止损百分比
     )
+    # next 中直接读取的最远历史 bar (volume[-5]), 指标窗口由各指标自己声明
+    lookback = 5
 
     def __init__(self):
         self.dataclose = self.datas[0].close
-        self.rsi = bt.indicators.RSI(self.data.close, period=self.params.rsi_period)
-        self.boll = bt.indicators.BollingerBands(self.data.close, period=self.params.boll_period,
-                                                 devfactor=self.params.boll_dev)
+        self.rsi = indicator.RSI(self.data.close, period=self.params.rsi_period)
+        self.boll = indicator.BollingerBands(self.data.close, period=self.params.boll_period,
+                                            devfactor=self.params.boll_dev)
+        # 与 np.all(np.diff([rsi[-1], rsi[-2], rsi[-3], rsi[-4]]) < 0) 相同, runonce 时整段预先计算
+        self.rsi_downward = indicator.DiffAll(self.rsi, period=4, lag=1, op='lt')
 
         self.buy_signal = False
         self.sell_signal = False
@@ -31,20 +38,28 @@ class Oscillation(bt.Strategy):
         self._buy_price = 0
         self._open_order = None
 
+    def qbuffer(self, savemem=0, replaying=False):
+        super().qbuffer(savemem, replaying)
+        # 低内存模式 (exactbars) 下数据只保留最小周期个 bar
+        self.data.minbuffer(self.lookback + 1)
+
     def start(self):
-        logger.info("策略开始运行, 等待行情数据...")
+        if log.INFO:
+            logger.info("策略开始运行, 等待行情数据...")
 
     def stop(self):
         report = self.generate_combinations_report()
-        logger.info(self.params.__dict__)
-        logger.info(report)
+        if log.INFO:
+            logger.info(self.params.__dict__)
+            logger.info(report)
 
     def notify_order(self, order):
-        order_info = (
-            f"订单参考: {order.ref}, 类型: {'买单' if order.isbuy() else '卖单'}, 状态: {order.getstatusname()}, "
-            f"价格: {order.executed.price}, 数量: {order.executed.size}, 成交均价: {order.executed.price}, 佣金: {order.executed.comm}"
-        )
-        logger.info(order_info)
+        if log.INFO:
+            order_info = (
+                f"订单参考: {order.ref}, 类型: {'买单' if order.isbuy() else '卖单'}, 状态: {order.getstatusname()}, "
+                f"价格: {order.executed.price}, 数量: {order.executed.size}, 成交均价: {order.executed.price}, 佣金: {order.executed.comm}"
+            )
+            logger.info(order_info)
 
         if order.status == bt.Order.Completed:
             self._open_order = False
@@ -63,7 +78,8 @@ class Oscillation(bt.Strategy):
                     self.WinningTrades += 1
                     self.TotalProfit += profit
 
-                logger.info(f"{self.LosingTrades} {self.TotalLoss} {self.WinningTrades} {self.TotalProfit}")
+                if log.INFO:
+                    logger.info(f"{self.LosingTrades} {self.TotalLoss} {self.WinningTrades} {self.TotalProfit}")
                 self._op = bt.Order.Buy
                 self._buy_price = 0
 
@@ -75,21 +91,24 @@ class Oscillation(bt.Strategy):
                 commission = commission * -1
             self.commission += commission
 
-            logger.info(f"position:{position:.8f} cach:{cash:.4f} commission:{commission}")
+            if log.INFO:
+                logger.info(f"position:{position:.8f} cach:{cash:.4f} commission:{commission}")
 
     def next(self):
         if len(self.datas[0]) < max(self.params.boll_period, self.params.rsi_period):
-            logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
+            if log.DEBUG:
+                logger.debug(f"time:{self.datas[0].datetime.datetime(0)} close price:{self.datas[0].close[0]}")
             return
-        logger.debug(f"[{self.data.datetime.datetime(0)}], "
-                     f"收盘价: {self.data.close[0]}, "
-                     f"最高价: {self.data.high[0]}, "
-                     f"最低价: {self.data.low[0]}, "
-                     f"成交量: {self.data.volume[0]:.8f}, "
-                     f"RSI值: {self.rsi[0]}, "
-                     f"布林带上轨: {self.boll.lines.top[0]}, "
-                     f"中轨: {self.boll.lines.mid[0]}, "
-                     f"下轨: {self.boll.lines.bot[0]}")
+        if log.DEBUG:
+            logger.debug(f"[{self.data.datetime.datetime(0)}], "
+                         f"收盘价: {self.data.close[0]}, "
+                         f"最高价: {self.data.high[0]}, "
+                         f"最低价: {self.data.low[0]}, "
+                         f"成交量: {self.data.volume[0]:.8f}, "
+                         f"RSI值: {self.rsi[0]}, "
+                         f"布林带上轨: {self.boll.lines.top[0]}, "
+                         f"中轨: {self.boll.lines.mid[0]}, "
+                         f"下轨: {self.boll.lines.bot[0]}")
         self.risk_management()
         self.handle_oscillating_market()
 
@@ -131,23 +150,23 @@ class Oscillation(bt.Strategy):
             "净利润": float(f"{(self.TotalProfit - self.TotalLoss - self.commission):.2f}"),
         }
 
+    def _recent_volume(self):
+        """最近 5 根 (不含当前) 的成交量, 由近到远, 只在输出日志时读取"""
+        return np.array([self.data.volume[-i] for i in range(1, 6)])
+
     def handle_oscillating_market(self):
         if self._open_order:  # 有未完成订单
             return
         current_close = self.data.close[0]
         current_time = self.datas[0].datetime.datetime(0)
-        recent_rsi_list = np.array([self.rsi[-i] for i in range(1, 5)])
-
-        close_values = np.array([self.data.close[-i] for i in range(3)])
-        close_trend = np.all(np.diff(close_values) >= 0)
-
-        # 计算差分数组，并判断是否所有差值都大于0（即上升趋势）
-        is_rsi_downward = np.all(np.diff(recent_rsi_list) < 0)
-        # 成交量
-        volume = np.array([self.data.volume[-i] for i in range(1, 6)])
+        is_rsi_downward = self.rsi_downward[0] > 0
 
-        logger.debug(f"RSI:{recent_rsi_list} 是否连续下降趋势:{is_rsi_downward}")
-        logger.debug(f"收盘价:{close_values} 连续上升:{close_trend}")
+        if log.DEBUG:
+            recent_rsi_list = np.array([self.rsi[-i] for i in range(1, 5)])
+            close_values = np.array([self.data.close[-i] for i in range(3)])
+            logger.debug(f"RSI:{recent_rsi_list} 是否连续下降趋势:{is_rsi_downward}")
+            # 收盘价趋势只用于日志, 不参与交易判断, 仅在 DEBUG 时计算
+            logger.debug(f"收盘价:{close_values} 连续上升:{np.all(np.diff(close_values) >= 0)}")
 
         if self._op == bt.Order.Buy:
             if self.rsi[0] < self.p.rsi_buy_signal:
@@ -159,8 +178,10 @@ class Oscillation(bt.Strategy):
                         order = self._sumit_buy_order(current_close, size, bt.Order.Limit)
                         if order:
                             self.buy_signal = False
-                            logger.info(
-                                f"买入订单.{current_time} 价格:{current_close} 数量:{size:.8f} cash:{cash} 成交量:{volume}")
+                            if log.INFO:
+                                logger.info(
+                                    f"买入订单.{current_time} 价格:{current_close} 数量:{size:.8f} cash:{cash} "
+                                    f"成交量:{self._recent_volume()}")
                             return
 
             if self.rsi[0] < 10:
@@ -169,8 +190,10 @@ class Oscillation(bt.Strategy):
                 order = self._sumit_buy_order(current_close, size, bt.Order.Limit)
                 if order:
                     self.buy_signal = False
-                    logger.info(
-                        f"买入订单.{current_time} 价格:{current_close} 数量:{size:.8f} cash:{cash} 成交量:{volume}")
+                    if log.INFO:
+                        logger.info(
+                            f"买入订单.{current_time} 价格:{current_close} 数量:{size:.8f} cash:{cash} "
+                            f"成交量:{self._recent_volume()}")
                     return
 
         if self._op == bt.Order.Sell:
@@ -182,8 +205,9 @@ class Oscillation(bt.Strategy):
                 if order:
                     self.sell_signal = False
                     self._open_order = True
-                    logger.info(
-                        f"卖出订单. {current_time} 买单价格:{self._buy_price} 当前价格:{current_close} 数量:{size:.8f} 浮盈:{((current_close * size) - (self._buy_price * size)):.4f} rsi:{self.rsi[0]}")
+                    if log.INFO:
+                        logger.info(
+                            f"卖出订单. {current_time} 买单价格:{self._buy_price} 当前价格:{current_close} 数量:{size:.8f} 浮盈:{((current_close * size) - (self._buy_price * size)):.4f} rsi:{self.rsi[0]}")
                     return
 
     def risk_management(self):
@@ -197,8 +221,9 @@ class Oscillation(bt.Strategy):
                 if order:
                     self.sell_signal = False
                     self._open_order = True
-                    logger.info(
-                        f"止损. {current_time} 买单价格:{self._buy_price} 当前价格:{current_price} 数量:{size:.8f} 浮盈:{((current_price * size) - (self._buy_price * size)):.4f}")
+                    if log.INFO:
+                        logger.info(
+                            f"止损. {current_time} 买单价格:{self._buy_price} 当前价格:{current_price} 数量:{size:.8f} 浮盈:{((current_price * size) - (self._buy_price * size)):.4f}")
 
 
 import pandas as pd